@@ -1,8 +1,12 @@
 import numpy as np
-from PIL import Image, ImageEnhance
+from PIL import Image
 from loguru import logger
 import cv2 as cv
 
+from core.blur import gaussian_blur, unsharp_mask
+from core.noise import DEFAULT_SEED, grain_generator
+from core.vignette import vignette_engine
+
 
 def _ensure_valid_mode(image: Image.Image) -> Image.Image:
     """
@@ -144,6 +148,63 @@ def adjust_contrast(image: Image.Image, contrast_factor: float) -> Image.Image:
     return Image.fromarray(image_array.astype(np.uint8), mode=image.mode)
 
 
+def shift_hue_saturation(buffer: np.ndarray, hue_shift: float, saturation_factor: float) -> np.ndarray:
+    """
+    Shifts the hue and scales the saturation of a float32 buffer in place.
+
+    The colour channels are converted to HSV once, both changes are applied and
+    they are converted back once. An alpha channel is left untouched and
+    grayscale buffers are returned unchanged.
+
+    Args:
+        buffer (np.ndarray): float32 RGB or RGBA array with values in 0-255.
+        hue_shift (float): Hue shift in degrees (-180 to 180).
+        saturation_factor (float): Saturation multiplier (0.0 - grayscale, 1.0 - original).
+
+    Returns:
+        np.ndarray: The same buffer, adjusted.
+    """
+    if buffer.ndim == 2 or (hue_shift == 0 and saturation_factor == 1):
+        return buffer
+
+    rgb = buffer if buffer.shape[2] == 3 else np.ascontiguousarray(buffer[..., :3])
+    rgb /= 255
+    hsv = cv.cvtColor(rgb, cv.COLOR_RGB2HSV)  # H in degrees, S and V in 0-1
+    if hue_shift != 0:
+        hue = hsv[..., 0]
+        hue += hue_shift
+        np.mod(hue, 360, out=hue)
+    if saturation_factor != 1:
+        saturation = hsv[..., 1]
+        saturation *= saturation_factor
+        np.clip(saturation, 0, 1, out=saturation)
+    cv.cvtColor(hsv, cv.COLOR_HSV2RGB, dst=rgb)
+    rgb *= 255
+    np.rint(rgb, out=rgb)
+    if rgb is not buffer:
+        buffer[..., :3] = rgb
+    return buffer
+
+
+def adjust_hue_saturation(image: Image.Image, hue_shift: float, saturation_factor: float) -> Image.Image:
+    """
+    Adjusts hue and saturation together with a single HSV round trip.
+
+    Args:
+        image (PIL.Image.Image): Input image.
+        hue_shift (float): Hue shift in degrees (-180 to 180).
+        saturation_factor (float): Saturation multiplier (0.0 - grayscale, 1.0 - original, >1.0 - more color).
+
+    Returns:
+        PIL.Image.Image: Hue and saturation adjusted image, keeping its alpha channel.
+    """
+    image = _ensure_valid_mode(image)
+    logger.info(f"Adjusting hue by {hue_shift} and saturation by factor {saturation_factor}")
+    image_array = np.array(image, dtype=np.float32)
+    image_array = shift_hue_saturation(image_array, hue_shift, saturation_factor)
+    return Image.fromarray(np.clip(image_array, 0, 255).astype(np.uint8), mode=image.mode)
+
+
 def adjust_saturation(image: Image.Image, saturation_factor: float) -> Image.Image:
     """
     Adjusts the saturation of an image using the HSV color space.
@@ -155,11 +216,7 @@ def adjust_saturation(image: Image.Image, saturation_factor: float) -> Image.Ima
     Returns:
         PIL.Image.Image: Saturation-adjusted image.
     """
-    image = convert_to_hsv(image)
-
-    image_array = np.array(image, dtype=np.float32)
-    image_array[..., 1] = np.clip(image_array[..., 1] * saturation_factor, 0, 255)
-    return Image.fromarray(image_array.astype(np.uint8), mode="HSV").convert("RGB")
+    return adjust_hue_saturation(image, 0, saturation_factor)
 
 
 def adjust_hue(image: Image.Image, hue_shift: float) -> Image.Image:
@@ -168,33 +225,35 @@ def adjust_hue(image: Image.Image, hue_shift: float) -> Image.Image:
 
     Args:
         image (PIL.Image.Image): Input image.
-        hue_shift (float): Hue shift value (-180 to 180).
+        hue_shift (float): Hue shift value in degrees (-180 to 180).
 
     Returns:
         PIL.Image.Image: Hue-adjusted image.
     """
-    image = convert_to_hsv(image)
-    image_array = np.array(image, dtype=np.float32)
-    image_array[..., 0] = (image_array[..., 0] + hue_shift) % 180
-    image = Image.fromarray(image_array.astype(np.uint8), mode="HSV")
-    return image.convert("RGB")
+    return adjust_hue_saturation(image, hue_shift, 1)
 
 
-def adjust_sharpness(image: Image.Image, sharpness_factor: float) -> Image.Image:
+def adjust_sharpness(image: Image.Image, sharpness_factor: float, radius: float = 1.0,
+                     threshold: float = 0.0) -> Image.Image:
     """
-    Adjusts the sharpness using PIL's ImageEnhance.
+    Adjusts the sharpness with an unsharp mask.
 
     Args:
         image (PIL.Image.Image): The input image to adjust.
         sharpness_factor (float): Enhancement factor (>1.0 for sharper, <1.0 for blurrier).
+        radius (float): Sigma of the Gaussian used to extract detail.
+        threshold (float): Detail below this level (0-255) is left alone.
 
     Returns:
         PIL.Image.Image: The image with adjusted sharpness.
     """
     image = _ensure_valid_mode(image)  # Ensure RGB mode for consistency
     logger.info(f"Adjusting sharpness by factor {sharpness_factor}")
-    enhancer = ImageEnhance.Sharpness(image)
-    return enhancer.enhance(sharpness_factor)
+    image_array = np.array(image, dtype=np.float32)
+
+    image_array = unsharp_mask(image_array, sharpness_factor - 1, radius, threshold)
+    image_array = np.clip(np.rint(image_array), 0, 255)
+    return Image.fromarray(image_array.astype(np.uint8), mode=image.mode)
 
 
 def adjust_exposure(image: Image.Image, exposure_factor: float) -> Image.Image:
@@ -235,13 +294,17 @@ def adjust_gamma(image: Image.Image, gamma: float) -> Image.Image:
     return Image.fromarray(image_array.astype(np.uint8))
 
 
-def adjust_vignette(image: Image.Image, vignette_strength: float) -> Image.Image:
+def adjust_vignette(image: Image.Image, vignette_strength: float, center: tuple = (0.0, 0.0),
+                    roundness: float = 0.0, feather: float = 0.0) -> Image.Image:
     """
     Applies a vignette effect, darkening the edges.
 
     Args:
         image (PIL.Image.Image): The input image to adjust.
         vignette_strength (float): Strength of vignette (>=0, higher for stronger effect).
+        center (tuple): Vignette centre in normalized coordinates, (0, 0) being the middle.
+        roundness (float): 0 follows the image aspect ratio, 1 is a perfect circle.
+        feather (float): 0 for a linear falloff, up to 1 for a smooth one.
 
     Returns:
         PIL.Image.Image: The image with vignette effect.
@@ -250,12 +313,7 @@ def adjust_vignette(image: Image.Image, vignette_strength: float) -> Image.Image
     logger.info(f"Adjusting vignette by strength {vignette_strength}")
     image_array = np.array(image, dtype=np.float32)  # Use float32 for precision
 
-    height, width = image_array.shape[:2]
-    x, y = np.meshgrid(np.linspace(-1, 1, width), np.linspace(-1, 1, height))
-    mask = 1 - np.sqrt(x ** 2 + y ** 2) * vignette_strength
-    mask = np.clip(mask, 0, 1)
-
-    image_array *= mask[:, :, np.newaxis]
+    vignette_engine.apply(image_array, vignette_strength, center, roundness, feather)
     image_array = np.clip(image_array, 0, 255)
     return Image.fromarray(image_array.astype(np.uint8))
 
@@ -273,19 +331,20 @@ def adjust_blur(image: Image.Image, blur_radius: float) -> Image.Image:
     """
     image = _ensure_valid_mode(image)  # Ensure RGB mode
     logger.info(f"Adjusting blur by radius {blur_radius}")
-    image_array = np.array(image, dtype=np.uint8)  # OpenCV expects uint8
+    image_array = np.array(image, dtype=np.uint8)
 
-    image_array = cv.GaussianBlur(image_array, (3, 3), blur_radius)
+    image_array = gaussian_blur(image_array, blur_radius)
     return Image.fromarray(image_array)
 
 
-def adjust_noise(image: Image.Image, noise_level: float) -> Image.Image:
+def adjust_noise(image: Image.Image, noise_level: float, seed: int = DEFAULT_SEED) -> Image.Image:
     """
     Adds Gaussian noise to the image.
 
     Args:
         image (PIL.Image.Image): The input image to adjust.
         noise_level (float): Standard deviation of noise (>=0, higher for more noise).
+        seed (int): Seed of the grain. The same seed and image size give the same grain.
 
     Returns:
         PIL.Image.Image: The image with added noise.
@@ -294,8 +353,8 @@ def adjust_noise(image: Image.Image, noise_level: float) -> Image.Image:
     logger.info(f"Adjusting noise by level {noise_level}")
     image_array = np.array(image, dtype=np.float32)  # Use float32 for precision
 
-    noise = np.random.normal(0, noise_level, image_array.shape)
-    image_array = np.clip(image_array + noise, 0, 255)
+    grain_generator.apply(image_array, noise_level, seed)
+    image_array = np.clip(image_array, 0, 255)
     return Image.fromarray(image_array.astype(np.uint8))
 
 
@@ -0,0 +1,59 @@
+import cv2 as cv
+import numpy as np
+
+# Fast mode filters at 1 / FAST_FACTOR of the size in each direction.
+FAST_FACTOR = 2
+# Images smaller than this on either side are always filtered exactly. It is the
+# smallest size that can be reduced, so parts of a strip-rendered image, which may
+# be only a few rows high, take the same path as the whole.
+MIN_FAST_SIZE = FAST_FACTOR
+
+
+def _fast_diameter(diameter: int) -> int:
+    return max(3, round(diameter / FAST_FACTOR) | 1)
+
+
+def bilateral_halo(diameter: int, fast: bool = False) -> int:
+    """
+    Returns how far, in full resolution pixels, ``bilateral_filter`` reads around each output pixel.
+
+    The fast mode reaches over its smaller neighbourhood at the reduced size,
+    plus one reduced pixel for the bilinear upsampling. Parts must then also
+    start on multiples of ``FAST_FACTOR``, so they are reduced like the whole.
+    """
+    if not fast:
+        return diameter // 2
+    return (_fast_diameter(diameter) // 2 + 1) * FAST_FACTOR
+
+
+def bilateral_filter(image: np.ndarray, diameter: int, sigma_color: float, sigma_space: float,
+                     fast: bool = False) -> np.ndarray:
+    """
+    Edge-preserving smoothing with an exact or an approximate bilateral filter.
+
+    The fast mode filters a copy downsampled by ``FAST_FACTOR`` with a matching
+    smaller neighbourhood and brings the result back to full size by bilinear
+    upsampling, so its edges are softened over about ``FAST_FACTOR`` pixels.
+    It is several times faster and meant for previews and thumbnails, exports
+    should use the exact filter. See ``demo/benchmark_cartoon.py`` for its accuracy.
+
+    Args:
+        image (np.ndarray): uint8 image of shape (H, W) or (H, W, 3).
+        diameter (int): Diameter of the pixel neighbourhood at full resolution.
+        sigma_color (float): Filter sigma in the colour space.
+        sigma_space (float): Filter sigma in the coordinate space, in full resolution pixels.
+        fast (bool): Use the downsampled approximation.
+
+    Returns:
+        np.ndarray: The filtered image, same shape as the input.
+    """
+    height, width = image.shape[:2]
+    if not fast or min(height, width) < MIN_FAST_SIZE:
+        return cv.bilateralFilter(image, diameter, sigma_color, sigma_space)
+
+    # Pad to a multiple of the factor, so every part is reduced by exactly the factor, like the whole
+    padded = cv.copyMakeBorder(image, 0, -height % FAST_FACTOR, 0, -width % FAST_FACTOR, cv.BORDER_REPLICATE)
+    padded_height, padded_width = padded.shape[:2]
+    small = cv.resize(padded, (padded_width // FAST_FACTOR, padded_height // FAST_FACTOR), interpolation=cv.INTER_AREA)
+    filtered = cv.bilateralFilter(small, _fast_diameter(diameter), sigma_color, sigma_space / FAST_FACTOR)
+    return cv.resize(filtered, (padded_width, padded_height), interpolation=cv.INTER_LINEAR)[:height, :width]
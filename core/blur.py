@@ -0,0 +1,111 @@
+import math
+
+import cv2 as cv
+import numpy as np
+
+# Largest sigma blurred directly. Above it the image is blurred at reduced size.
+MAX_DIRECT_SIGMA = 6.0
+
+
+def gaussian_kernel_size(sigma: float) -> int:
+    """
+    Returns the odd kernel size covering +/- 3 sigma.
+
+    Args:
+        sigma (float): Standard deviation of the Gaussian.
+
+    Returns:
+        int: Kernel size, at least 3.
+    """
+    return max(3, 2 * math.ceil(3 * sigma) + 1)
+
+
+def gaussian_halo(sigma: float) -> int:
+    """
+    Returns how far, in pixels, ``gaussian_blur`` reads around each output pixel.
+
+    Args:
+        sigma (float): Standard deviation of the blur.
+
+    Returns:
+        int: Rows or columns of context needed to blur part of an image like the whole.
+    """
+    if sigma <= 0:
+        return 0
+    if sigma <= MAX_DIRECT_SIGMA:
+        return gaussian_kernel_size(sigma) // 2
+    # The reduced copy is blurred with the residual sigma, then each pixel interpolates two of its samples
+    factor = 2 ** math.ceil(math.log2(sigma / MAX_DIRECT_SIGMA))
+    return (gaussian_kernel_size(sigma / factor) // 2 + 2) * factor
+
+
+def _separable_blur(array: np.ndarray, sigma: float) -> np.ndarray:
+    kernel = cv.getGaussianKernel(gaussian_kernel_size(sigma), sigma, cv.CV_32F)
+    return cv.sepFilter2D(array, -1, kernel, kernel, borderType=cv.BORDER_REFLECT_101)
+
+
+def gaussian_blur(array: np.ndarray, sigma: float) -> np.ndarray:
+    """
+    Blurs an image with a Gaussian whose kernel size follows sigma.
+
+    Small radii use a separable convolution. Larger radii are blurred on a
+    downsampled copy and scaled back up, which keeps the cost roughly constant
+    however large the radius gets.
+
+    Args:
+        array (np.ndarray): uint8 or float32 image of shape (H, W) or (H, W, C).
+        sigma (float): Standard deviation of the blur in pixels.
+
+    Returns:
+        np.ndarray: The blurred image, same shape and dtype as the input.
+    """
+    if sigma <= 0:
+        return array.copy()
+    if sigma <= MAX_DIRECT_SIGMA:
+        return _separable_blur(array, sigma)
+
+    height, width = array.shape[:2]
+    factor = 2 ** math.ceil(math.log2(sigma / MAX_DIRECT_SIGMA))
+    small_size = (max(1, round(width / factor)), max(1, round(height / factor)))
+    small = cv.resize(array, small_size, interpolation=cv.INTER_AREA)
+    # Area downsampling already blurs by about factor / 2 pixels, remove that from the target
+    residual = math.sqrt(max(sigma ** 2 - (factor / 2) ** 2, 0.0)) / factor
+    if residual > 0:
+        small = _separable_blur(small, residual)
+    return cv.resize(small, (width, height), interpolation=cv.INTER_LINEAR)
+
+
+def unsharp_mask(array: np.ndarray, amount: float, radius: float = 1.0, threshold: float = 0.0,
+                 blurred: np.ndarray = None) -> np.ndarray:
+    """
+    Sharpens a float32 image in place by adding back its high frequencies.
+
+    Negative amounts soften the image instead. An alpha channel is left untouched.
+
+    Args:
+        array (np.ndarray): float32 image of shape (H, W) or (H, W, C), values in 0-255.
+        amount (float): Strength of the sharpening, 0 leaves the image unchanged.
+        radius (float): Sigma of the Gaussian separating detail from the base image.
+        threshold (float): Detail smaller than this (in 0-255 levels) is not sharpened.
+        blurred (np.ndarray): Gaussian of ``array`` at ``radius`` if it was already computed.
+
+    Returns:
+        np.ndarray: The same array, sharpened.
+    """
+    if amount == 0:
+        return array
+    if blurred is None:
+        blurred = gaussian_blur(array, radius)
+
+    has_alpha = array.ndim == 3 and array.shape[2] == 4
+    if threshold <= 0 and not has_alpha:
+        # x + amount * (x - blurred) as a single multi-threaded pass
+        return cv.addWeighted(array, 1 + amount, blurred, -amount, 0, dst=array)
+
+    target = array[..., :3] if has_alpha else array
+    detail = np.subtract(target, blurred[..., :3] if has_alpha else blurred, dtype=np.float32)
+    if threshold > 0:
+        detail[np.abs(detail) < threshold] = 0
+    detail *= np.float32(amount)
+    target += detail
+    return array
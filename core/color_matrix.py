@@ -0,0 +1,123 @@
+from typing import Optional, Sequence
+
+import cv2 as cv
+import numpy as np
+
+# Fractional bits of the fixed-point weights, 16.16 like PIL's own RGB to L conversion.
+FIXED_POINT_BITS = 16
+# Pixels per strip of rows, bounding the int32 accumulators to about 1 MB each.
+STRIP_PIXELS = 1 << 18
+
+
+class ColorMatrix:
+    """
+    A 3x3 colour matrix with offsets, run in fixed-point integer arithmetic on uint8.
+
+    Output channel ``i`` is ``sum_j matrix[i][j] * rgb[j] + offset[i]``. The weights
+    are scaled to 16.16 fixed point and accumulated in int32 over strips of rows,
+    so no float32 copy of the image is ever made. Permutation matrices (channel
+    swaps) are plain channel copies, and identical rows are computed once.
+    """
+
+    def __init__(self, matrix: Sequence[Sequence[float]], offset: Sequence[float] = (0, 0, 0),
+                 rounding: bool = True):
+        """
+        Initialize the matrix.
+
+        Args:
+            matrix: 3x3 weights, one row per output channel (R, G, B), one column per input channel.
+            offset: Value added to each output channel, in 0-255 levels.
+            rounding (bool): Round the result to the nearest level, or truncate it when False.
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.shape != (3, 3) or len(offset) != 3:
+            raise ValueError("Expected a 3x3 matrix and 3 offsets")
+        scale = 1 << FIXED_POINT_BITS
+        self.matrix = matrix
+        self.weights = np.rint(matrix * scale).astype(np.int32)
+        half = (1 << (FIXED_POINT_BITS - 1)) if rounding else 0
+        self.offsets = np.rint(np.asarray(offset, dtype=np.float64) * scale).astype(np.int32) + half
+        self.permutation = self._permutation(matrix) if not any(offset) else None
+
+    @classmethod
+    def channel_mixer(cls, red: Sequence[float] = (1, 0, 0), green: Sequence[float] = (0, 1, 0),
+                      blue: Sequence[float] = (0, 0, 1)) -> "ColorMatrix":
+        """
+        Build a channel mixer, each output channel a weighted sum of the input channels.
+
+        Args:
+            red: Contribution of the input R, G and B to the output red channel.
+            green: Contribution of the input R, G and B to the output green channel.
+            blue: Contribution of the input R, G and B to the output blue channel.
+        """
+        return cls((red, green, blue))
+
+    @staticmethod
+    def _permutation(matrix: np.ndarray) -> Optional[list]:
+        """Returns the source channel of each output channel if the matrix only reorders channels."""
+        if not np.all((matrix == 0) | (matrix == 1)) or not np.all(matrix.sum(axis=1) == 1):
+            return None
+        return [int(np.argmax(row)) for row in matrix]
+
+    def apply(self, array: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Apply the matrix to an RGB or RGBA image. Alpha is copied unchanged.
+
+        Args:
+            array (np.ndarray): uint8 image of shape (H, W, 3) or (H, W, 4).
+            out (np.ndarray): Preallocated output of the same shape, not sharing memory with the input, or None.
+
+        Returns:
+            np.ndarray: ``out``, or a new uint8 array.
+        """
+        if array.ndim != 3 or array.shape[2] not in (3, 4) or array.dtype != np.uint8:
+            raise ValueError(f"Expected a uint8 RGB or RGBA image, got {array.dtype} {array.shape}")
+        if out is None:
+            out = np.empty_like(array)
+
+        if self.permutation is not None:
+            for channel, source in enumerate(self.permutation):
+                out[..., channel] = array[..., source]
+            if array.shape[2] == 4:
+                out[..., 3] = array[..., 3]
+            return out
+
+        # Rows with the same weights (e.g. grayscale) share one accumulation
+        distinct = {}
+        for channel in range(3):
+            key = (tuple(int(weight) for weight in self.weights[channel]), int(self.offsets[channel]))
+            distinct.setdefault(key, []).append(channel)
+
+        height, width = array.shape[:2]
+        strip_rows = max(1, STRIP_PIXELS // max(1, width))
+        total = np.empty((min(strip_rows, height), width), dtype=np.int32)
+        product = np.empty_like(total)
+        for start in range(0, height, strip_rows):
+            stop = min(height, start + strip_rows)
+            # Contiguous planes make the multiply-adds run at full speed
+            planes = list(cv.split(array[start:stop]))
+            results = planes[3:]  # Alpha, copied unchanged
+            mixed = [None, None, None]
+            for (weights, offset), channels in distinct.items():
+                accumulator = total[:stop - start]
+                accumulator.fill(offset)
+                for index, weight in enumerate(weights):
+                    if weight:
+                        np.multiply(planes[index], weight, out=product[:stop - start], dtype=np.int32)
+                        accumulator += product[:stop - start]
+                accumulator >>= FIXED_POINT_BITS  # Arithmetic shift, so negative sums floor correctly
+                np.clip(accumulator, 0, 255, out=accumulator)
+                plane = accumulator.astype(np.uint8)
+                for channel in channels:
+                    mixed[channel] = plane
+            out[start:stop] = cv.merge(mixed + results)
+        return out
+
+
+# The legacy sepia matrix, truncated like the float version it replaces.
+SEPIA = ColorMatrix([[0.272, 0.534, 0.131],
+                     [0.349, 0.686, 0.168],
+                     [0.393, 0.769, 0.189]], rounding=False)
+# ITU-R 601-2 luma, bit-exact with PIL's ``convert("L")``.
+GRAYSCALE = ColorMatrix([[19595 / 65536, 38470 / 65536, 7471 / 65536]] * 3)
+SWAP_RED_BLUE = ColorMatrix.channel_mixer(red=(0, 0, 1), blue=(1, 0, 0))
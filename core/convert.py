@@ -1,19 +1,159 @@
-from PIL import Image
+import sys
+
+import cv2 as cv
+import numpy as np
 from PIL import Image
 from PySide6.QtGui import QPixmap, QImage
 
+# Formats whose memory layout is already Grayscale, RGB or RGBA ordered bytes.
+_VIEW_CHANNELS = {
+    QImage.Format.Format_Grayscale8: 1,
+    QImage.Format.Format_RGB888: 3,
+    QImage.Format.Format_RGBA8888: 4,
+}
+# 32-bit formats stored as one native-endian 0xAARRGGBB word per pixel.
+_ARGB32_FORMATS = (QImage.Format.Format_ARGB32, QImage.Format.Format_RGB32)
+_NUMPY_FORMATS = {1: QImage.Format.Format_Grayscale8, 3: QImage.Format.Format_RGB888,
+                  4: QImage.Format.Format_RGBA8888}
+
+
+class _QImageBuffer:
+    """Exposes the pixels of a QImage through the NumPy array interface and keeps them alive."""
+
+    def __init__(self, image: QImage, channels: int):
+        # A shallow copy shares the pixels, if the caller later paints on their
+        # image Qt detaches it and this view keeps seeing the original data
+        self._image = QImage(image)
+        address = np.frombuffer(self._image.constBits(), np.uint8).ctypes.data
+        shape = (image.height(), image.width()) + ((channels,) if channels > 1 else ())
+        strides = (image.bytesPerLine(),) + ((channels, 1) if channels > 1 else (1,))
+        self.__array_interface__ = {
+            "shape": shape,
+            "typestr": "|u1",
+            "data": (address, True),  # Read only, the pixels may be shared with other QImages
+            "strides": strides,
+            "version": 3,
+        }
+
+
+def normalize_qimage(image: QImage) -> QImage:
+    """
+    Converts a QImage to the format ``qimage_to_numpy`` can view without copying.
+
+    Args:
+        image (QImage): Image in any format.
+
+    Returns:
+        QImage: The same image if it is Grayscale8, RGB888 or RGBA8888 already,
+        otherwise a converted copy (RGBA8888 if it has alpha, RGB888 if not).
+    """
+    if image.format() in _VIEW_CHANNELS:
+        return image
+    if image.isGrayscale() and not image.hasAlphaChannel():
+        return image.convertToFormat(QImage.Format.Format_Grayscale8)
+    return image.convertToFormat(QImage.Format.Format_RGBA8888 if image.hasAlphaChannel()
+                                 else QImage.Format.Format_RGB888)
+
+
+def qimage_view(image: QImage) -> np.ndarray:
+    """
+    Wraps the pixels of a QImage as a read-only NumPy array without copying.
+
+    Row padding is handled through the array strides, so the result is usually
+    not contiguous. The array keeps the pixels alive on its own.
+
+    Args:
+        image (QImage): A Grayscale8, RGB888, RGBA8888, ARGB32 or RGB32 image.
+
+    Returns:
+        np.ndarray: uint8 array of shape (H, W) for grayscale or (H, W, C) otherwise,
+        in memory order, so ARGB32 and RGB32 give BGRA on little-endian machines.
+
+    Raises:
+        ValueError: If the image format has no direct byte layout.
+    """
+    image_format = image.format()
+    if image_format in _VIEW_CHANNELS:
+        channels = _VIEW_CHANNELS[image_format]
+    elif image_format in _ARGB32_FORMATS:
+        channels = 4
+    else:
+        raise ValueError(f"Unsupported QImage format: {image_format}")
+    return np.asarray(_QImageBuffer(image, channels))
+
+
+def qimage_to_numpy(image: QImage) -> np.ndarray:
+    """
+    Returns the pixels of a QImage as a Grayscale, RGB or RGBA NumPy array.
+
+    Grayscale8, RGB888 and RGBA8888 images are viewed without copying. ARGB32
+    and RGB32 are reordered in a single pass, other formats are converted by Qt first.
+
+    Args:
+        image (QImage): The image to read.
+
+    Returns:
+        np.ndarray: uint8 array of shape (H, W), (H, W, 3) or (H, W, 4). Read only
+        when it is a view, copy it before modifying.
+    """
+    image_format = image.format()
+    if image_format in _VIEW_CHANNELS:
+        return qimage_view(image)
+    if image_format in _ARGB32_FORMATS:
+        array = qimage_view(image)
+        if sys.byteorder == "little":
+            code = cv.COLOR_BGRA2RGBA if image_format == QImage.Format.Format_ARGB32 else cv.COLOR_BGRA2RGB
+            return cv.cvtColor(array, code)
+        indices = [1, 2, 3, 0] if image_format == QImage.Format.Format_ARGB32 else [1, 2, 3]
+        return array[..., indices]
+    return qimage_view(normalize_qimage(image))
+
+
+def numpy_to_qimage(array: np.ndarray) -> QImage:
+    """
+    Builds a QImage directly over the memory of a NumPy array.
+
+    The QImage holds a reference to the array for as long as any copy of it
+    shares the pixels, so the array may be dropped by the caller. Read-only or
+    non uint8 arrays, and arrays whose pixels are not packed, are copied first.
+
+    Args:
+        array (np.ndarray): Array of shape (H, W), (H, W, 3) or (H, W, 4), Grayscale, RGB or RGBA.
+
+    Returns:
+        QImage: A Grayscale8, RGB888 or RGBA8888 image sharing the array's memory.
+    """
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    if channels not in _NUMPY_FORMATS:
+        raise ValueError(f"Unsupported array shape: {array.shape}")
+    if array.dtype != np.uint8:
+        array = np.clip(array, 0, 255).astype(np.uint8)
+    pixels_packed = array.strides[1] == channels and (array.ndim == 2 or array.strides[2] == 1)
+    if not array.flags.writeable or not pixels_packed or array.strides[0] < 0:
+        array = np.ascontiguousarray(array) if array.flags.writeable else array.copy()
+    height, width = array.shape[:2]
+    buffer = array
+    if not array.flags.c_contiguous:
+        # Rows cut from a wider image, hand Qt the memory from the first pixel to the last one
+        span = array.strides[0] * (height - 1) + width * channels
+        buffer = np.lib.stride_tricks.as_strided(array, shape=(span,), strides=(1,))
+    return QImage(buffer.data, width, height, array.strides[0], _NUMPY_FORMATS[channels])
+
 
 def convert_pil_to_pixmap(pil_image: Image.Image):
-    return pil_image.toqpixmap()
+    return QPixmap.fromImage(convert_pil_to_qimage(pil_image))
 
 def convert_pil_to_qimage(pil_image: Image.Image):
-    return pil_image.toqimage()
+    if pil_image.mode not in ("L", "RGB", "RGBA"):
+        has_alpha = "A" in pil_image.getbands() or "transparency" in pil_image.info
+        pil_image = pil_image.convert("RGBA" if has_alpha else "RGB")
+    return numpy_to_qimage(np.array(pil_image))
 
 def convert_qimage_to_pil(qimage: QImage):
-    return Image.fromqimage(qimage)
+    return Image.fromarray(qimage_to_numpy(qimage))
 
 def convert_pixmap_to_pil(pixmap: QPixmap):
-    return Image.fromqpixmap(pixmap)
+    return convert_qimage_to_pil(pixmap.toImage())
 
 def convert_numpy_to_pil(numpy_array):
-    return Image.fromarray(numpy_array)
\ No newline at end of file
+    return Image.fromarray(numpy_array)
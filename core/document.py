@@ -0,0 +1,244 @@
+import itertools
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import cv2 as cv
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+from loguru import logger
+
+from core.adjustment import (adjust_hue, adjust_saturation, adjust_temperature, adjust_sharpness,
+                             adjust_blur, adjust_noise, adjust_brightness, adjust_contrast, adjust_exposure,
+                             adjust_shadows, adjust_highlight, adjust_vignette, adjust_gamma, adjust_red,
+                             adjust_green, adjust_blue)
+from core.convert import normalize_qimage, numpy_to_qimage, qimage_to_numpy
+from core.loader import decode_full
+from core.pipeline import active_adjustments
+from core.pyramid import ImagePyramid
+from core.tiled import spill
+from utils.enums import FilterType
+from utils.lru_cache import LRUCache
+
+# Source versions are unique across documents, so render caches never mix two images.
+_versions = itertools.count(1)
+# Default memory cap for the cached filtered images.
+DEFAULT_FILTER_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def default_adjustments() -> Dict[str, dict]:
+    """
+    Returns a fresh adjustment settings dictionary, every value at its default.
+
+    Returns:
+        dict: ``{name: {'default', 'current', 'function'}}`` in the order the adjustments are applied.
+    """
+    return {
+        "hue": {'default': 0, 'current': 0, 'function': adjust_hue},
+        "saturation": {'default': 0, 'current': 0, 'function': adjust_saturation},
+        "temperature": {'default': 0, 'current': 0, 'function': adjust_temperature},
+        "sharpness": {'default': 0, 'current': 0, 'function': adjust_sharpness},
+        "blur": {'default': 0, 'current': 0, 'function': adjust_blur},
+        "noise": {'default': 0, 'current': 0, 'function': adjust_noise},
+        "brightness": {'default': 0, 'current': 0, 'function': adjust_brightness},
+        "contrast": {'default': 0, 'current': 0, 'function': adjust_contrast},
+        "exposure": {'default': 0, 'current': 0, 'function': adjust_exposure},
+        "shadows": {'default': 0, 'current': 0, 'function': adjust_shadows},
+        "highlights": {'default': 0, 'current': 0, 'function': adjust_highlight},
+        "vignette": {'default': 0, 'current': 0, 'function': adjust_vignette},
+        "gamma": {'default': 0, 'current': 0, 'function': adjust_gamma},
+        "red": {'default': 0, 'current': 0, 'function': adjust_red},
+        "green": {'default': 0, 'current': 0, 'function': adjust_green},
+        "blue": {'default': 0, 'current': 0, 'function': adjust_blue}
+    }
+
+
+class ImageDocument:
+    """
+    The image being edited and everything derived from it.
+
+    The source pixels live in a single contiguous, read-only uint8 NumPy buffer
+    (Grayscale, RGB or RGBA), memory-mapped on a scratch file when it is larger
+    than ``core.tiled.MEMMAP_THRESHOLD_BYTES``. The QImage and the preview pyramid
+    are views or reductions of that buffer, and the edit parameters (filter and adjustments)
+    sit next to it. Derived data such as the histogram and thumbnails is built
+    lazily and dropped whenever the source changes, which also gives it a new
+    ``version`` for render caches to key on.
+
+    ``filtered_cache`` holds the filtered base image per (version, preview level,
+    filter, parameter), so adjustments are rendered on top of it without running
+    the filter again. It is only invalidated by a new source; switching back to
+    an earlier filter is served from it as long as the entry has not been evicted.
+    """
+
+    def __init__(self, source: np.ndarray, path: Optional[Union[str, Path]] = None,
+                 filter_cache_bytes: int = DEFAULT_FILTER_CACHE_BYTES):
+        """
+        Initialize the document.
+
+        Args:
+            source (np.ndarray): uint8 array of shape (H, W), (H, W, 3) or (H, W, 4).
+            path (str | Path): File the image was loaded from, if any.
+            filter_cache_bytes (int): Memory cap of the filtered image cache. 0 disables it.
+        """
+        self.path: Optional[Path] = Path(path) if path is not None else None
+        self.filter: Optional[FilterType] = None
+        self.adjustments: Dict[str, dict] = default_adjustments()
+        self._histogram: Optional[np.ndarray] = None
+        self._thumbnails: Dict[int, QImage] = {}
+        self.filtered_cache = LRUCache(filter_cache_bytes)
+        self.set_source(source)
+
+    @classmethod
+    def from_qimage(cls, image: QImage, path: Optional[Union[str, Path]] = None) -> "ImageDocument":
+        """Create a document from a QImage, copying its pixels only if they are not already packed."""
+        return cls(qimage_to_numpy(normalize_qimage(image)), path)
+
+    @classmethod
+    def open(cls, path: Union[str, Path], progress: Optional[Callable[[int], None]] = None,
+             cancelled: Optional[Callable[[], bool]] = None) -> "ImageDocument":
+        """
+        Load an image file into a new document.
+
+        Args:
+            path (str | Path): The image file.
+            progress: Called with the percentage decoded so far, see ``decode_full``.
+            cancelled: Polled during the decode, which stops when it returns True.
+
+        Raises:
+            ValueError: If the file cannot be decoded.
+            LoadCancelled: If ``cancelled`` returned True.
+        """
+        try:
+            source = decode_full(path, progress, cancelled)
+        except OSError as e:
+            raise ValueError(f"Failed to load image: {path}") from e
+        return cls(source, path)
+
+    def set_source(self, source: np.ndarray) -> None:
+        """
+        Replace the source pixels, keeping the edit parameters.
+
+        Args:
+            source (np.ndarray): uint8 array of shape (H, W), (H, W, 3) or (H, W, 4).
+        """
+        if source.dtype != np.uint8 or source.ndim not in (2, 3) or (source.ndim == 3 and source.shape[2] not in (3, 4)):
+            raise ValueError(f"Unsupported source buffer: {source.dtype} {source.shape}")
+        source = spill(np.ascontiguousarray(source))
+        if not source.flags.writeable:
+            source = source.copy()
+        # Wrap the pixels before locking them, read-only arrays are copied by numpy_to_qimage
+        self._qimage = numpy_to_qimage(source)
+        source.flags.writeable = False
+        self._source = source
+        self.pyramid = ImagePyramid(self._qimage)
+        self.version = next(_versions)
+        self.clear_caches()
+        logger.debug(f"Document source set: {source.shape}, {source.nbytes / 2 ** 20:.1f} MiB")
+
+    @property
+    def source(self) -> np.ndarray:
+        """The canonical source buffer. Read only."""
+        return self._source
+
+    @property
+    def qimage(self) -> QImage:
+        """The source as a QImage sharing the canonical buffer."""
+        return self._qimage
+
+    @property
+    def width(self) -> int:
+        return self._source.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._source.shape[0]
+
+    @property
+    def channels(self) -> int:
+        return 1 if self._source.ndim == 2 else self._source.shape[2]
+
+    @property
+    def is_filtered(self) -> bool:
+        return self.filter is not None
+
+    @property
+    def is_adjusted(self) -> bool:
+        return bool(active_adjustments(self.adjustments))
+
+    def render_parameters(self) -> Tuple[Optional[FilterType], List[Tuple[str, float]]]:
+        """Returns the filter and the active ``(name, value)`` adjustments to render."""
+        return self.filter, active_adjustments(self.adjustments)
+
+    def reset_adjustments(self) -> None:
+        for settings in self.adjustments.values():
+            settings["current"] = settings["default"]
+
+    def snapshot(self) -> dict:
+        """Returns a copy of the edit parameters, for the undo history."""
+        return {
+            "filter": self.filter,
+            "adjustments": {name: settings["current"] for name, settings in self.adjustments.items()},
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """Restores edit parameters saved by ``snapshot``."""
+        self.filter = snapshot["filter"]
+        for name, value in snapshot["adjustments"].items():
+            self.adjustments[name]["current"] = value
+
+    def histogram(self) -> np.ndarray:
+        """
+        Returns the per channel histogram of the source.
+
+        Returns:
+            np.ndarray: int64 array of shape (channels, 256).
+        """
+        if self._histogram is None:
+            source = self._source if self._source.ndim == 3 else self._source[:, :, np.newaxis]
+            self._histogram = np.stack([
+                cv.calcHist([source], [channel], None, [256], [0, 256]).ravel().astype(np.int64)
+                for channel in range(source.shape[2])
+            ])
+        return self._histogram
+
+    def thumbnail(self, max_size: int) -> QImage:
+        """
+        Returns the source scaled to fit in a ``max_size`` square, built from the pyramid.
+
+        Args:
+            max_size (int): Longest side of the thumbnail.
+
+        Returns:
+            QImage: The cached thumbnail.
+        """
+        thumbnail = self._thumbnails.get(max_size)
+        if thumbnail is None:
+            scale = max_size / max(self.width, self.height)
+            level = self.pyramid.level(self.pyramid.level_for_scale(scale))
+            thumbnail = level.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio,
+                                     Qt.TransformationMode.SmoothTransformation)
+            self._thumbnails[max_size] = thumbnail
+        return thumbnail
+
+    def clear_caches(self) -> None:
+        """Drop all data derived from the source."""
+        self._histogram = None
+        self._thumbnails.clear()
+        self.filtered_cache.clear()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Reports the bytes held by the document.
+
+        Returns:
+            dict: Bytes used by the ``source``, the reduced pyramid levels (``proxies``),
+            the ``histogram``, the ``thumbnails`` and the ``filtered`` images.
+        """
+        return {
+            "source": self._source.nbytes,
+            "proxies": self.pyramid.nbytes,
+            "histogram": self._histogram.nbytes if self._histogram is not None else 0,
+            "thumbnails": sum(thumbnail.sizeInBytes() for thumbnail in self._thumbnails.values()),
+            "filtered": self.filtered_cache.total_bytes,
+        }
@@ -0,0 +1,301 @@
+import os
+import secrets
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import cv2 as cv
+import numpy as np
+from loguru import logger
+
+from core.tiled import DEFAULT_STRIP_ROWS, Region, allocate, iter_strips
+
+# A right-angle rotation and/or mirror as the 2x2 part of a QTransform, (m11, m12, m21, m22):
+# a source pixel (x, y) lands at (m11 * x + m21 * y, m12 * x + m22 * y), up to a translation.
+Orientation = Tuple[int, int, int, int]
+IDENTITY: Orientation = (1, 0, 0, 1)
+# Share of the progress given to rendering, the rest covers encoding.
+RENDER_PROGRESS = 90
+
+_TO_BGR = {3: cv.COLOR_RGB2BGR, 4: cv.COLOR_RGBA2BGRA}
+
+# Format written for each file extension.
+FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP", ".tif": "TIFF", ".tiff": "TIFF",
+           ".bmp": "BMP"}
+JPEG_SUBSAMPLING = {"4:4:4": cv.IMWRITE_JPEG_SAMPLING_FACTOR_444, "4:2:2": cv.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+                    "4:2:0": cv.IMWRITE_JPEG_SAMPLING_FACTOR_420}
+TIFF_COMPRESSION = {"none": cv.IMWRITE_TIFF_COMPRESSION_NONE, "lzw": cv.IMWRITE_TIFF_COMPRESSION_LZW,
+                    "deflate": cv.IMWRITE_TIFF_COMPRESSION_ADOBE_DEFLATE,
+                    "packbits": cv.IMWRITE_TIFF_COMPRESSION_PACKBITS}
+
+
+def _round_up(value: int, step: int) -> int:
+    return -(-value // step) * step
+
+
+class ExportCancelled(Exception):
+    """Raised inside an export when its cancellation check returns True."""
+
+
+def image_format(path: Union[str, Path]) -> Optional[str]:
+    """The format written for a file name, e.g. "JPEG", or None if the extension is not supported."""
+    return FORMATS.get(Path(path).suffix.lower())
+
+
+class SaveOptions:
+    """
+    Encoder settings of a save, for every format. Only those of the format written are used.
+    """
+
+    def __init__(self, jpeg_quality: int = 95, jpeg_subsampling: str = "4:2:0", jpeg_progressive: bool = False,
+                 png_compress_level: int = 6, webp_lossless: bool = False, webp_quality: int = 90,
+                 tiff_compression: str = "deflate"):
+        """
+        Initialize the options.
+
+        Args:
+            jpeg_quality (int): JPEG quality, 1 to 100.
+            jpeg_subsampling (str): Chroma subsampling, a key of ``JPEG_SUBSAMPLING``.
+            jpeg_progressive (bool): Write a progressive JPEG.
+            png_compress_level (int): zlib level of PNG files, 0 (fastest) to 9 (smallest).
+            webp_lossless (bool): Write lossless WebP, ``webp_quality`` is then ignored.
+            webp_quality (int): Lossy WebP quality, 1 to 100.
+            tiff_compression (str): TIFF compression, a key of ``TIFF_COMPRESSION``.
+        """
+        if not 1 <= jpeg_quality <= 100 or not 1 <= webp_quality <= 100:
+            raise ValueError("Qualities range from 1 to 100")
+        if not 0 <= png_compress_level <= 9:
+            raise ValueError("PNG compression levels range from 0 to 9")
+        if jpeg_subsampling not in JPEG_SUBSAMPLING:
+            raise ValueError(f"Unknown JPEG subsampling {jpeg_subsampling}, expected one of {list(JPEG_SUBSAMPLING)}")
+        if tiff_compression not in TIFF_COMPRESSION:
+            raise ValueError(f"Unknown TIFF compression {tiff_compression}, expected one of {list(TIFF_COMPRESSION)}")
+        self.jpeg_quality = jpeg_quality
+        self.jpeg_subsampling = jpeg_subsampling
+        self.jpeg_progressive = jpeg_progressive
+        self.png_compress_level = png_compress_level
+        self.webp_lossless = webp_lossless
+        self.webp_quality = webp_quality
+        self.tiff_compression = tiff_compression
+
+    def updated(self, **changes) -> "SaveOptions":
+        """Returns a copy with some settings changed."""
+        return SaveOptions(**{**vars(self), **changes})
+
+    def params(self, path: Union[str, Path]) -> List[int]:
+        """
+        The OpenCV ``IMWRITE_*`` flag and value pairs for a file.
+
+        Args:
+            path: The file, its extension picks the format.
+
+        Returns:
+            list: Flags and values alternating, empty for formats without settings.
+        """
+        format_name = image_format(path)
+        if format_name == "JPEG":
+            return [cv.IMWRITE_JPEG_QUALITY, self.jpeg_quality,
+                    cv.IMWRITE_JPEG_SAMPLING_FACTOR, JPEG_SUBSAMPLING[self.jpeg_subsampling],
+                    cv.IMWRITE_JPEG_PROGRESSIVE, int(self.jpeg_progressive)]
+        if format_name == "PNG":
+            return [cv.IMWRITE_PNG_COMPRESSION, self.png_compress_level]
+        if format_name == "WEBP":
+            # Qualities above 100 select the lossless encoder
+            return [cv.IMWRITE_WEBP_QUALITY, 101 if self.webp_lossless else self.webp_quality]
+        if format_name == "TIFF":
+            return [cv.IMWRITE_TIFF_COMPRESSION, TIFF_COMPRESSION[self.tiff_compression]]
+        return []
+
+    def __repr__(self) -> str:
+        settings = ", ".join(f"{key}={value!r}" for key, value in vars(self).items())
+        return f"SaveOptions({settings})"
+
+
+def orientation_from_matrix(m11: float, m12: float, m21: float, m22: float) -> Orientation:
+    """
+    Reduces the linear part of a view transform to the rotation and mirroring it applies.
+
+    Args:
+        m11, m12, m21, m22: The matrix entries, e.g. of ``QGraphicsView.transform()``.
+            Any uniform scale, such as the zoom, is ignored.
+
+    Returns:
+        Orientation: The matrix with entries of -1, 0 or 1.
+
+    Raises:
+        ValueError: If the transform is not a multiple of 90 degrees, possibly mirrored.
+    """
+    matrix = np.array([m11, m12, m21, m22], dtype=np.float64)
+    scale = np.abs(matrix).max()
+    if scale == 0:
+        raise ValueError("The transform is degenerate")
+    rounded = np.rint(matrix / scale)
+    if not np.allclose(matrix / scale, rounded, atol=1e-6) or abs(rounded[0] * rounded[3] - rounded[1] * rounded[2]) != 1:
+        raise ValueError("Only rotations by multiples of 90 degrees and mirroring can be exported")
+    return tuple(int(value) for value in rounded)
+
+
+def oriented_size(width: int, height: int, orientation: Orientation = IDENTITY) -> Tuple[int, int]:
+    """Returns the (width, height) of an image once oriented."""
+    return (height, width) if orientation[0] == 0 else (width, height)
+
+
+def source_view(array: np.ndarray, orientation: Orientation = IDENTITY) -> np.ndarray:
+    """
+    Returns a view of an oriented image indexed in source coordinates.
+
+    Writing source pixel (x, y) to ``view[y, x]`` puts it where the orientation
+    takes it in ``array``, so a renderer working in source order fills the
+    oriented image directly, without a rotated copy.
+
+    Args:
+        array (np.ndarray): Image of shape (H, W) or (H, W, C) in the output orientation.
+        orientation (Orientation): The orientation of ``array`` relative to the source.
+
+    Returns:
+        np.ndarray: A strided view of ``array``.
+    """
+    m11, m12, m21, m22 = orientation
+    if m11 == 0:
+        # Source rows become columns: source y picks the column, source x the row
+        return array.swapaxes(0, 1)[::m21, ::m12]
+    return array[::m22, ::m11]
+
+
+def _clamp_crop(crop: Optional[Tuple[int, int, int, int]], width: int, height: int) -> Tuple[int, int, int, int]:
+    if crop is None:
+        return 0, 0, width, height
+    x, y, crop_width, crop_height = crop
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(width, x + crop_width), min(height, y + crop_height)
+    if right <= left or bottom <= top:
+        raise ValueError(f"Crop {crop} is outside the {width}x{height} image")
+    return left, top, right - left, bottom - top
+
+
+def render_export(source: np.ndarray, render: Callable[[np.ndarray, Region], np.ndarray], halo: int = 0,
+                  alignment: int = 1, full_rows: bool = False, crop: Optional[Tuple[int, int, int, int]] = None,
+                  orientation: Orientation = IDENTITY, strip_rows: int = DEFAULT_STRIP_ROWS,
+                  progress: Optional[Callable[[int], None]] = None,
+                  cancelled: Optional[Callable[[], bool]] = None) -> np.ndarray:
+    """
+    Renders the cropped source strip by strip into an oriented BGR(A) image ready for encoding.
+
+    Each strip of the crop is rendered with ``halo`` pixels of the source around
+    it, so edits reading neighbouring pixels give the same result as on the whole
+    image, including at the crop edges. Strips start on multiples of ``alignment``
+    in the source, for block based filters. The rendered strip is converted to
+    OpenCV's channel order and written through a ``source_view`` of the output,
+    which is memory-mapped when large, so only one strip of temporaries exists.
+
+    Args:
+        source (np.ndarray): Full resolution uint8 L, RGB or RGBA source.
+        render: Called with a part of the source and its ``Region``. Returns it rendered.
+        halo (int): Context pixels each side of a strip.
+        alignment (int): Strips and their context start on multiples of it.
+        full_rows (bool): Render whole rows, for filters wrapping pixels around them.
+        crop (tuple): (x, y, width, height) of the part to export, clamped to the image, or None.
+        orientation (Orientation): Rotation and mirroring of the output.
+        strip_rows (int): Source rows rendered at a time.
+        progress: Called with the percentage of rows done.
+        cancelled: Polled between strips.
+
+    Returns:
+        np.ndarray: The oriented image, BGR or BGRA for colour renders, with the
+        channels of the rendered strips rather than of the source.
+
+    Raises:
+        ExportCancelled: If ``cancelled`` returned True.
+    """
+    height, width = source.shape[:2]
+    x, y, crop_width, crop_height = _clamp_crop(crop, width, height)
+    output_width, output_height = oriented_size(crop_width, crop_height, orientation)
+    # Allocated from the first rendered strip, as edits may drop the alpha channel
+    out = target = None
+
+    alignment = max(1, alignment)
+    halo = _round_up(max(0, halo), alignment)
+    left = 0 if full_rows else max(0, (x - halo) // alignment * alignment)
+    right = width if full_rows else min(width, _round_up(x + crop_width + halo, alignment))
+    for start, stop in iter_strips(crop_height, strip_rows):
+        if cancelled is not None and cancelled():
+            raise ExportCancelled()
+        top = max(0, (y + start - halo) // alignment * alignment)
+        bottom = min(height, _round_up(y + stop + halo, alignment))
+        rendered = render(source[top:bottom, left:right], (top, left, height, width))
+        rendered = rendered[y + start - top:y + stop - top, x - left:x - left + crop_width]
+        if out is None:
+            out = allocate((output_height, output_width) + rendered.shape[2:], rendered.dtype)
+            target = source_view(out, orientation)
+        channels = rendered.shape[2] if rendered.ndim == 3 else 1
+        target[start:stop] = cv.cvtColor(rendered, _TO_BGR[channels]) if channels in _TO_BGR else rendered
+        if progress is not None:
+            progress(stop * 100 // crop_height)
+    return out
+
+
+def encode(array: np.ndarray, path: Union[str, Path], params: Sequence[int] = ()) -> None:
+    """
+    Writes an image to a file, replacing it only once fully written.
+
+    The encoder reads the rows straight from ``array``, so a memory-mapped image
+    is streamed from its scratch file rather than copied. The file is written
+    next to ``path`` under a temporary name first, so a failed write never
+    leaves a truncated image, nor destroys the one being overwritten.
+
+    Args:
+        array (np.ndarray): uint8 grayscale, BGR or BGRA image.
+        path: Destination, its extension picks the format.
+        params: OpenCV ``IMWRITE_*`` flag and value pairs.
+
+    Raises:
+        OSError: If the format is unknown or the file cannot be written.
+    """
+    path = Path(path)
+    # Created by the encoder itself, so it gets the usual permissions rather than mkstemp's private ones
+    temporary = path.with_name(f".imagify-{secrets.token_hex(4)}{path.suffix}")
+    try:
+        try:
+            written = cv.imwrite(str(temporary), array, list(params))
+        except cv.error as e:
+            raise OSError(f"Cannot write {path.suffix or 'files without extension'}: {e.err}") from e
+        if not written:
+            raise OSError(f"Failed to write {path}")
+        if path.exists():
+            shutil.copymode(path, temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def export_image(source: np.ndarray, path: Union[str, Path], render: Callable[[np.ndarray, Region], np.ndarray],
+                 halo: int = 0, alignment: int = 1, full_rows: bool = False,
+                 crop: Optional[Tuple[int, int, int, int]] = None, orientation: Orientation = IDENTITY,
+                 params: Sequence[int] = (), progress: Optional[Callable[[int], None]] = None,
+                 cancelled: Optional[Callable[[], bool]] = None) -> Path:
+    """
+    Renders the source through an edit recipe and encodes it, with bounded memory.
+
+    See ``render_export`` for the arguments describing the edits and ``encode``
+    for the output. Rendering reports up to ``RENDER_PROGRESS`` percent and
+    encoding the rest.
+
+    Returns:
+        Path: The written file.
+
+    Raises:
+        ExportCancelled: If ``cancelled`` returned True, before anything is written.
+        OSError: If the file cannot be written.
+    """
+    path = Path(path)
+    height, width = source.shape[:2]
+    logger.info(f"Exporting {width}x{height} source to {path}, crop {crop}, orientation {orientation}")
+    scaled = (lambda percent: progress(percent * RENDER_PROGRESS // 100)) if progress is not None else None
+    image = render_export(source, render, halo, alignment, full_rows, crop, orientation,
+                          progress=scaled, cancelled=cancelled)
+    encode(image, path, params)
+    if progress is not None:
+        progress(100)
+    logger.info(f"Exported {image.shape[1]}x{image.shape[0]} image to {path}")
+    return path
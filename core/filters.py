@@ -1,7 +1,31 @@
 from loguru import logger
 import cv2 as cv
 import numpy as np
-from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+from PIL import Image, ImageOps
+
+from core import color_matrix, kernels
+from core.bilateral import bilateral_filter, bilateral_halo
+from core.blur import gaussian_blur, unsharp_mask
+from core.color_matrix import ColorMatrix
+from core.glitch import DEFAULT_SEED, glitch
+from core.pixelate import pixelate
+
+# Sigma of the Gaussian the Sharpen filter extracts detail with, in full resolution pixels.
+SHARPEN_RADIUS = 1.0
+# Neighbourhoods of the cartoon filter: the median blur and adaptive threshold finding
+# its outlines, and the bilateral filter flattening its colours.
+CARTOON_MEDIAN_SIZE = 5
+CARTOON_BLOCK_SIZE = 9
+CARTOON_DIAMETER = 9
+# Pixels the cartoon filter reads around each output pixel, in either mode.
+CARTOON_HALO = max(CARTOON_MEDIAN_SIZE // 2 + CARTOON_BLOCK_SIZE // 2, bilateral_halo(CARTOON_DIAMETER, fast=True))
+
+
+def _apply_kernel(image: Image.Image, kernel: kernels.ConvolutionKernel) -> Image.Image:
+    """Runs one of the ``core.kernels`` filters, which match the PIL ImageFilter of the same name."""
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    return Image.fromarray(kernel.apply(np.asarray(image)), mode=image.mode)
 
 def filter_blur(image: Image.Image,  radius: int):
 
@@ -16,7 +40,9 @@ def filter_blur(image: Image.Image,  radius: int):
         PIL.Image.Image: The blurred image.
     """
     logger.info(f"Applying Gaussian blur with radius {radius}")
-    return image.filter(ImageFilter.GaussianBlur(radius=radius))
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    return Image.fromarray(gaussian_blur(np.asarray(image), radius), mode=image.mode)
 
 def filter_contour(image: Image.Image):
     """
@@ -29,7 +55,7 @@ def filter_contour(image: Image.Image):
         PIL.Image.Image: The image with enhanced edges.
     """
     logger.info("Enhancing edges")
-    return image.filter(ImageFilter.CONTOUR)
+    return _apply_kernel(image, kernels.CONTOUR)
 
 def filter_detail(image: Image.Image):
     """
@@ -42,7 +68,7 @@ def filter_detail(image: Image.Image):
         PIL.Image.Image: The image with enhanced details.
     """
     logger.info("Enhancing details")
-    return image.filter(ImageFilter.DETAIL)
+    return _apply_kernel(image, kernels.DETAIL)
 
 def filter_edge_enhance(image: Image.Image):
     """
@@ -55,7 +81,7 @@ def filter_edge_enhance(image: Image.Image):
         PIL.Image.Image: The image with enhanced edges.
     """
     logger.info("Enhancing edges")
-    return image.filter(ImageFilter.EDGE_ENHANCE)
+    return _apply_kernel(image, kernels.EDGE_ENHANCE)
 
 def filter_edge_enhance_more(image: Image.Image):
     """
@@ -68,7 +94,7 @@ def filter_edge_enhance_more(image: Image.Image):
         PIL.Image.Image: The image with enhanced edges.
     """
     logger.info("Enhancing edges more")
-    return image.filter(ImageFilter.EDGE_ENHANCE_MORE)
+    return _apply_kernel(image, kernels.EDGE_ENHANCE_MORE)
 
 def filter_emboss(image: Image.Image):
     """
@@ -81,7 +107,7 @@ def filter_emboss(image: Image.Image):
         PIL.Image.Image: The embossed image.
     """
     logger.info("Embossing image")
-    return image.filter(ImageFilter.EMBOSS)
+    return _apply_kernel(image, kernels.EMBOSS)
 
 def filter_find_edges(image: Image.Image):
     """
@@ -94,22 +120,26 @@ def filter_find_edges(image: Image.Image):
         PIL.Image.Image: The image with found edges.
     """
     logger.info("Finding edges")
-    return image.filter(ImageFilter.FIND_EDGES)
+    return _apply_kernel(image, kernels.FIND_EDGES)
 
-def filter_sharpen(image: Image.Image, factor: float):
+def filter_sharpen(image: Image.Image, factor: float, radius: float = SHARPEN_RADIUS):
     """
     Sharpens the image by enhancing edges.
 
     Args:
         image (PIL.Image.Image): The input image to sharpen.
         factor (float): The sharpening factor.
+        radius (float): Sigma of the detail extracted, scaled down for reduced previews.
 
     Returns:
         PIL.Image.Image: The sharpened image.
     """
     logger.info(f"Sharpening image with factor {factor}")
-    enhancer = ImageEnhance.Sharpness(image)
-    return enhancer.enhance(factor)
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    image_array = unsharp_mask(np.array(image, dtype=np.float32), factor - 1, radius)
+    image_array = np.clip(np.rint(image_array), 0, 255)
+    return Image.fromarray(image_array.astype(np.uint8), mode=image.mode)
 
 def filter_smooth(image: Image.Image):
     """
@@ -122,7 +152,7 @@ def filter_smooth(image: Image.Image):
         PIL.Image.Image: The smoothed image.
     """
     logger.info("Smoothing image")
-    return image.filter(ImageFilter.SMOOTH)
+    return _apply_kernel(image, kernels.SMOOTH)
 
 def filter_smooth_more(image: Image.Image):
     """
@@ -135,49 +165,34 @@ def filter_smooth_more(image: Image.Image):
         PIL.Image.Image: The smoothed image.
     """
     logger.info("Smoothing image more")
-    return image.filter(ImageFilter.SMOOTH_MORE)
+    return _apply_kernel(image, kernels.SMOOTH_MORE)
 
-def filter_pixelation(image, pixel_size=10):
+def filter_pixelation(image: Image.Image, pixel_size: int = 10) -> Image.Image:
     """
     Apply pixelation effect to an image.
 
     Args:
-        image: Input image (numpy array) in BGR format
-        pixel_size: Size of pixelation blocks (default=10)
+        image (PIL.Image.Image): The input image, alpha is pixelated too.
+        pixel_size (int): Size of pixelation blocks (default=10). Blocks larger than
+            the image are clipped to it.
 
     Returns:
-        Pixelated image as numpy array
-
-    Raises:
-        ValueError: If image is None or pixel_size is invalid
+        PIL.Image.Image: The pixelated image.
     """
-    image = np.array(image, np.uint8)
-
-    # Get image dimensions
-    h, w = image.shape[:2]
-
-    # Ensure dimensions are valid for resizing
-    if h < pixel_size or w < pixel_size:
-        raise ValueError("pixel_size must be smaller than image dimensions")
-
-    # Downscale image
-    temp = cv.resize(image,
-            (w // pixel_size, h // pixel_size),
-            interpolation=cv.INTER_LINEAR)
-
-    # Upscale back to original size with nearest neighbor interpolation
-    pixelated = cv.resize(temp,
-            (w, h),
-            interpolation=cv.INTER_NEAREST)
-
-    return Image.fromarray(pixelated)
+    logger.info(f"Pixelating image with block size {pixel_size}")
+    if image.mode not in ("L", "LA", "RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    return Image.fromarray(pixelate(np.asarray(image), pixel_size), mode=image.mode)
 
-def filter_glitch(image: Image.Image) -> Image.Image:
+def filter_glitch(image: Image.Image, seed: int = DEFAULT_SEED, bands: int = 0) -> Image.Image:
     """
     Apply a glitch effect to the image.
 
     Args:
         image (Image.Image): Input image in PIL format.
+        seed (int): Seed of the channel and band offsets, the same seed gives the same glitch.
+        bands (int): Number of horizontal bands to displace.
 
     Returns:
         Image.Image: Glitched image in PIL format.
@@ -188,22 +203,9 @@ def filter_glitch(image: Image.Image) -> Image.Image:
     if image is None:
         raise ValueError("Input image cannot be None")
 
-    # Convert PIL image to NumPy array
-    image_np = np.array(image, dtype=np.uint8)
-
-    # Get image dimensions
-    h, w, c = image_np.shape
-
-    # Create a copy for glitch effect
-    glitched = np.copy(image_np)
-
-    # Randomly shift different color channels
-    for i in range(c):  # Iterate over RGB channels
-        shift = np.random.randint(-w // 10, w // 10)  # Random shift up to 10% of width
-        glitched[:, :, i] = np.roll(image_np[:, :, i], shift, axis=1)
-
-    # Convert back to PIL Image and return
-    return Image.fromarray(glitched)
+    if image.mode not in ("L", "LA", "RGB", "RGBA"):
+        image = image.convert("RGB")
+    return Image.fromarray(glitch(np.asarray(image), seed, bands=bands), mode=image.mode)
 
 def filter_invert(image: Image.Image):
     """
@@ -220,18 +222,34 @@ def filter_invert(image: Image.Image):
         image = image.convert('RGB')
     return ImageOps.invert(image)
 
-def filter_cartoon(image: Image.Image):
+def filter_cartoon(image: Image.Image, fast: bool = False):
+    """
+    Flattens colours and outlines edges for a cartoon look.
+
+    Args:
+        image (PIL.Image.Image): The input image.
+        fast (bool): Use the approximate bilateral filter, for previews and thumbnails.
+
+    Returns:
+        PIL.Image.Image: The cartoon image.
+    """
     if image.mode == 'RGBA':
         image = image.convert('RGB')
     image = np.array(image)
     gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-    blurred = cv.medianBlur(gray, 5)
-    edges = cv.adaptiveThreshold(blurred, 255, cv.ADAPTIVE_THRESH_MEAN_C, cv.THRESH_BINARY, 9, 9)
+    blurred = cv.medianBlur(gray, CARTOON_MEDIAN_SIZE)
+    edges = cv.adaptiveThreshold(blurred, 255, cv.ADAPTIVE_THRESH_MEAN_C, cv.THRESH_BINARY, CARTOON_BLOCK_SIZE, 9)
 
-    color = cv.bilateralFilter(image, 9, 300, 300)
+    color = bilateral_filter(image, CARTOON_DIAMETER, 300, 300, fast)
     cartoon = cv.bitwise_and(color, color, mask=edges)
     return Image.fromarray(cartoon)
 
+def _apply_color_matrix(image: Image.Image, matrix: ColorMatrix) -> Image.Image:
+    """Runs a ``core.color_matrix`` stage on an RGB or RGBA copy of the image."""
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    return Image.fromarray(matrix.apply(np.asarray(image)), mode=image.mode)
+
 def filter_sepia(image: Image.Image):
     """
     Applies a sepia effect to the image.
@@ -243,20 +261,7 @@ def filter_sepia(image: Image.Image):
         PIL.Image.Image: The image with the sepia effect applied.
     """
     logger.info("Applying sepia effect")
-    # Convert image to RGB if it's not already
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-
-    image = np.array(image, dtype=np.float32)
-    # Define sepia matrix
-    sepia_filter = np.array([[0.272, 0.534, 0.131],
-                                [0.349, 0.686, 0.168],
-                                [0.393, 0.769, 0.189]])
-
-    # Apply sepia effect
-    sepia_image = cv.transform(image, sepia_filter)
-    image = np.clip(sepia_image, 0, 255).astype(np.uint8)
-    return Image.fromarray(image)
+    return _apply_color_matrix(image, color_matrix.SEPIA)
 
 def filter_grayscale(image: Image.Image):
     """
@@ -266,10 +271,24 @@ def filter_grayscale(image: Image.Image):
         image (PIL.Image.Image): The input image to convert to grayscale.
 
     Returns:
-        PIL.Image.Image: The grayscale image.
+        PIL.Image.Image: The grayscale image, still with three channels.
     """
     logger.info("Converting image to grayscale")
-    return image.convert("L").convert("RGB") #for 3 channel
+    return _apply_color_matrix(image, color_matrix.GRAYSCALE)
+
+def filter_channel_mix(image: Image.Image, matrix: ColorMatrix):
+    """
+    Mixes the colour channels, e.g. to swap them or with a user channel-mixer preset.
+
+    Args:
+        image (PIL.Image.Image): The input image.
+        matrix (ColorMatrix): The mix, see ``ColorMatrix.channel_mixer``.
+
+    Returns:
+        PIL.Image.Image: The mixed image.
+    """
+    logger.info("Mixing colour channels")
+    return _apply_color_matrix(image, matrix)
 
 if __name__ == "__main__":
     img = Image.open(r"D:\Java\DukeWithHelmet.png")
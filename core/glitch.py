@@ -0,0 +1,85 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Seed used when none is given, so previews and exports glitch the same way.
+DEFAULT_SEED = 0
+# Colour channels drawn for, whatever the image has, so the draws never depend on the mode.
+_COLOUR_CHANNELS = 3
+
+
+def _row_segments(height: int, bands: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """Splits the rows into (start, stop, extra shift) runs, later bands overriding earlier ones."""
+    row_shift = np.zeros(height, dtype=np.int64)
+    for start, stop, shift in bands:
+        row_shift[start:stop] = shift
+    edges = np.flatnonzero(np.diff(row_shift)) + 1
+    starts = np.concatenate(([0], edges))
+    stops = np.concatenate((edges, [height]))
+    return [(int(start), int(stop), int(row_shift[start])) for start, stop in zip(starts, stops)]
+
+
+def _shift_rows(source: np.ndarray, out: np.ndarray, shift: int) -> None:
+    """Writes ``source`` rolled right by ``shift`` columns into ``out`` with two slice copies."""
+    width = source.shape[1]
+    shift %= width
+    if shift == 0:
+        out[...] = source
+        return
+    out[:, shift:] = source[:, :width - shift]
+    out[:, :shift] = source[:, width - shift:]
+
+
+def glitch(array: np.ndarray, seed: int = DEFAULT_SEED, max_shift: float = 0.1, bands: int = 0,
+           max_band_height: float = 0.08, max_band_shift: float = 0.15,
+           out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Offsets the colour channels horizontally, and optionally displaces horizontal bands.
+
+    Every offset is drawn from a generator seeded with ``seed`` as a fraction of
+    the image size, so a reduced preview and the full resolution export glitch
+    identically. Channels are rolled by slice assignment from the input into the
+    output, without temporary arrays. An alpha channel only follows the bands.
+
+    Args:
+        array (np.ndarray): uint8 image of shape (H, W) or (H, W, C).
+        seed (int): Seed of the offsets.
+        max_shift (float): Largest channel offset, as a fraction of the width.
+        bands (int): Number of horizontal bands to displace.
+        max_band_height (float): Largest band height, as a fraction of the height.
+        max_band_shift (float): Largest band displacement, as a fraction of the width.
+        out (np.ndarray): Preallocated output of the same shape and dtype, not sharing
+            memory with ``array``, or None.
+
+    Returns:
+        np.ndarray: ``out``, or a new array, holding the glitched image.
+    """
+    if out is None:
+        out = np.empty_like(array)
+    elif out.shape != array.shape or out.dtype != array.dtype:
+        raise ValueError("out must have the same shape and dtype as the input")
+    elif np.shares_memory(out, array):
+        raise ValueError("out must not share memory with the input")
+
+    source = array[..., np.newaxis] if array.ndim == 2 else array
+    target = out[..., np.newaxis] if out.ndim == 2 else out
+    height, width, channels = source.shape
+
+    rng = np.random.default_rng(seed)
+    channel_shifts = rng.uniform(-max_shift, max_shift, _COLOUR_CHANNELS)
+    band_draws = rng.uniform(0, 1, (max(0, bands), 3))
+
+    band_rows = []
+    for start, size, shift in band_draws:
+        start = int(start * height)
+        stop = min(height, start + max(1, round(size * max_band_height * height)))
+        band_rows.append((start, stop, round((2 * shift - 1) * max_band_shift * width)))
+    segments = _row_segments(height, band_rows)
+
+    colour_channels = channels - 1 if channels in (2, 4) else channels
+    for channel in range(channels):
+        # Alpha is not offset, but moves with the bands
+        channel_shift = round(channel_shifts[channel % _COLOUR_CHANNELS] * width) if channel < colour_channels else 0
+        for start, stop, band_shift in segments:
+            _shift_rows(source[start:stop, :, channel], target[start:stop, :, channel], channel_shift + band_shift)
+    return out
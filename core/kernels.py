@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+import cv2 as cv
+import numpy as np
+
+# Rows per tile. Small enough to spread over the cores, large enough to amortise the halo.
+DEFAULT_TILE_ROWS = 256
+# Largest relative second singular value for a kernel to count as separable.
+SEPARABLE_TOLERANCE = 1e-6
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="kernel")
+        return _executor
+
+
+class ConvolutionKernel:
+    """
+    A square convolution kernel with PIL ``ImageFilter.Kernel`` semantics.
+
+    The result is ``sum(weights * pixels) / scale + offset``, rounded and clipped,
+    and the outermost ``radius`` pixels of the image are copied unfiltered, as PIL does.
+    Separable kernels are split into a column and a row vector once, up front.
+    """
+
+    def __init__(self, size: int, weights: Sequence[float], scale: Optional[float] = None, offset: float = 0):
+        """
+        Initialize the kernel.
+
+        Args:
+            size (int): Width and height of the kernel, odd.
+            weights (sequence): ``size * size`` weights in row-major order, as given to PIL.
+            scale (float): Divisor of the weighted sum, the sum of the weights if None (or 1 if that is 0).
+            offset (float): Added to the result after dividing by ``scale``.
+        """
+        if size % 2 == 0 or len(weights) != size * size:
+            raise ValueError(f"Expected {size}x{size} weights for an odd kernel size")
+        if scale is None:
+            scale = sum(weights) or 1
+        self.size = size
+        self.offset = offset
+        # PIL applies the first kernel row to the row below the pixel, so flip vertically
+        # to express the same filter as an OpenCV correlation
+        self.matrix = (np.array(weights, dtype=np.float32).reshape(size, size) / np.float32(scale))[::-1].copy()
+        self.separable = self._split(self.matrix)
+
+    @property
+    def radius(self) -> int:
+        return self.size // 2
+
+    @staticmethod
+    def _split(matrix: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns the (column, row) vectors of a rank 1 kernel, or None."""
+        u, s, vt = np.linalg.svd(matrix.astype(np.float64))
+        if s[0] == 0 or s[1] > s[0] * SEPARABLE_TOLERANCE:
+            return None
+        root = np.sqrt(s[0])
+        return (u[:, 0] * root).astype(np.float32), (vt[0] * root).astype(np.float32)
+
+    def _convolve(self, block: np.ndarray) -> np.ndarray:
+        if self.separable is not None:
+            column, row = self.separable
+            return cv.sepFilter2D(block, cv.CV_32F, row, column, delta=self.offset, borderType=cv.BORDER_REPLICATE)
+        return cv.filter2D(block, cv.CV_32F, self.matrix, delta=self.offset, borderType=cv.BORDER_REPLICATE)
+
+    def _filter_rows(self, array: np.ndarray, out: np.ndarray, start: int, stop: int) -> None:
+        """Filters rows ``start:stop`` of ``array`` into ``out``, reading a halo above and below."""
+        top = max(0, start - self.radius)
+        bottom = min(array.shape[0], stop + self.radius)
+        result = self._convolve(array[top:bottom])[start - top:stop - top]
+        np.add(result, 0.5, out=result)
+        np.clip(result, 0, 255, out=result)
+        out[start:stop] = result  # Truncation after + 0.5 rounds like PIL
+
+    def apply(self, array: np.ndarray, tile_rows: int = DEFAULT_TILE_ROWS) -> np.ndarray:
+        """
+        Filters an image, tile by tile, across the shared thread pool.
+
+        Args:
+            array (np.ndarray): uint8 image of shape (H, W) or (H, W, C) with up to 4 channels.
+            tile_rows (int): Height of the tiles processed in parallel.
+
+        Returns:
+            np.ndarray: The filtered uint8 image.
+        """
+        height, width = array.shape[:2]
+        radius = self.radius
+        out = array.copy()  # The border keeps the source pixels
+        if height <= 2 * radius or width <= 2 * radius:
+            return out
+
+        tile_rows = max(1, tile_rows)
+        bounds = [(start, min(start + tile_rows, height)) for start in range(0, height, tile_rows)]
+        if len(bounds) == 1:
+            self._filter_rows(array, out, 0, height)
+        else:
+            # OpenCV releases the GIL, so the tiles really run in parallel
+            futures = [_get_executor().submit(self._filter_rows, array, out, start, stop) for start, stop in bounds]
+            for future in futures:
+                future.result()
+
+        out[:radius] = array[:radius]
+        out[-radius:] = array[-radius:]
+        out[:, :radius] = array[:, :radius]
+        out[:, -radius:] = array[:, -radius:]
+        return out
+
+
+# The PIL built-in filters, same weights, scales and offsets as ``PIL.ImageFilter``.
+CONTOUR = ConvolutionKernel(3, (-1, -1, -1, -1, 8, -1, -1, -1, -1), 1, 255)
+DETAIL = ConvolutionKernel(3, (0, -1, 0, -1, 10, -1, 0, -1, 0), 6)
+EDGE_ENHANCE = ConvolutionKernel(3, (-1, -1, -1, -1, 10, -1, -1, -1, -1), 2)
+EDGE_ENHANCE_MORE = ConvolutionKernel(3, (-1, -1, -1, -1, 9, -1, -1, -1, -1), 1)
+EMBOSS = ConvolutionKernel(3, (-1, 0, 0, 0, 1, 0, 0, 0, 0), 1, 128)
+FIND_EDGES = ConvolutionKernel(3, (-1, -1, -1, -1, 8, -1, -1, -1, -1), 1)
+SMOOTH = ConvolutionKernel(3, (1, 1, 1, 1, 5, 1, 1, 1, 1), 13)
+SMOOTH_MORE = ConvolutionKernel(5, (1, 1, 1, 1, 1,
+                                    1, 5, 5, 5, 1,
+                                    1, 5, 44, 5, 1,
+                                    1, 5, 5, 5, 1,
+                                    1, 1, 1, 1, 1), 100)
@@ -0,0 +1,117 @@
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageFile
+from loguru import logger
+
+from core.tiled import allocate, iter_strips
+
+# Bytes fed to the decoder between progress reports and cancellation checks.
+CHUNK_SIZE = 1 << 20
+# Largest image decoded, in pixels. PIL's own decompression bomb limit of about
+# 90 MP is meant for untrusted uploads and would refuse the large images the
+# memory-mapped documents are built for.
+MAX_IMAGE_PIXELS = 4_000_000_000
+Image.MAX_IMAGE_PIXELS = max(Image.MAX_IMAGE_PIXELS or 0, MAX_IMAGE_PIXELS)
+
+
+class LoadCancelled(Exception):
+    """Raised inside a decode when its cancellation check returns True."""
+
+
+def _to_8bit(image: Image.Image) -> Image.Image:
+    """
+    Scales a 16-bit, 32-bit integer or float grayscale image down to L.
+
+    ``convert`` would clip these to 0-255, turning a 16-bit image almost white.
+    Integer images are taken as 16-bit and keep their high byte, float images
+    as 0-1 when their values stay in that range and as 16-bit otherwise.
+    """
+    values = np.asarray(image)
+    if image.mode == "F":
+        scale = 255 if values.size and values.min() >= 0 and values.max() <= 1 else 1 / 256
+        values = np.clip(values * np.float32(scale), 0, 255)
+    else:
+        values = np.clip(values, 0, 65535) >> 8
+    return Image.fromarray(values.astype(np.uint8), "L")
+
+
+def _document_mode(image: Image.Image) -> Image.Image:
+    """Converts to the L, RGB or RGBA modes an ImageDocument stores."""
+    if image.mode in ("L", "RGB", "RGBA"):
+        return image
+    if image.mode in ("I", "F") or image.mode.startswith("I;16"):
+        return _to_8bit(image)
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def decode_preview(path: Union[str, Path], max_width: int, max_height: int) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+    """
+    Decodes a reduced copy of an image cheaply, if the format supports it.
+
+    JPEG files are decoded with DCT scaling through ``Image.draft``, which skips
+    most of the work of a full decode. The result is the smallest power of two
+    reduction that still covers the requested size.
+
+    Args:
+        path: The image file.
+        max_width (int): Width the preview should cover, e.g. the viewport width.
+        max_height (int): Height the preview should cover.
+
+    Returns:
+        tuple: The reduced pixels as an L, RGB or RGBA array and the full (width, height),
+        or None if the format cannot be decoded at reduced size or would not be reduced.
+    """
+    with Image.open(path) as image:
+        full_size = image.size
+        if image.draft(image.mode, (max_width, max_height)) is None or image.size == full_size:
+            return None
+        logger.debug(f"Draft decode of {path}: {full_size} -> {image.size}")
+        return np.asarray(_document_mode(image)), full_size
+
+
+def decode_full(path: Union[str, Path], progress: Optional[Callable[[int], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None) -> np.ndarray:
+    """
+    Decodes an image at full resolution, incrementally.
+
+    The file is fed to PIL's incremental parser in chunks, so progress can be
+    reported and the decode abandoned between chunks. The pixels are then copied
+    out strip by strip into a writable buffer, memory-mapped for large images,
+    rather than through one more full size copy.
+
+    Args:
+        path: The image file.
+        progress: Called with the percentage of the file decoded so far.
+        cancelled: Polled between chunks, the decode stops when it returns True.
+
+    Returns:
+        np.ndarray: Writable uint8 L, RGB or RGBA pixels.
+
+    Raises:
+        LoadCancelled: If ``cancelled`` returned True.
+        OSError: If the file cannot be read or decoded.
+    """
+    total = max(1, os.path.getsize(path))
+    parser = ImageFile.Parser()
+    done = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            if cancelled is not None and cancelled():
+                raise LoadCancelled(str(path))
+            parser.feed(chunk)
+            done += len(chunk)
+            if progress is not None:
+                progress(min(99, done * 100 // total))
+    image = _document_mode(parser.close())
+    width, height = image.size
+    channels = len(image.getbands())
+    array = allocate((height, width) if channels == 1 else (height, width, channels))
+    for start, stop in iter_strips(height):
+        array[start:stop] = np.asarray(image.crop((0, start, width, stop)))
+    if progress is not None:
+        progress(100)
+    return array
@@ -0,0 +1,91 @@
+from typing import Iterable, List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from core.stages import STAGES, to_rgb
+
+# Adjustments that map every channel value independently of its neighbours.
+POINT_ADJUSTMENTS = frozenset({
+    "temperature", "brightness", "contrast", "exposure", "shadows", "highlights", "gamma", "red", "green", "blue",
+})
+
+
+def is_point_adjustment(name: str) -> bool:
+    """
+    Checks whether an adjustment can be folded into a lookup table.
+
+    Args:
+        name (str): Adjustment name, as used in ``ImageScreen.adjustments``.
+
+    Returns:
+        bool: True for per-pixel, per-channel point operations.
+    """
+    return name in POINT_ADJUSTMENTS
+
+
+def compile_lut(adjustments: Iterable[Tuple[str, float]], channels: int) -> np.ndarray:
+    """
+    Composes a run of point adjustments into one 256 entry table per channel.
+
+    The stages are evaluated on the 256 possible input values with the same
+    float32 kernels the pipeline uses, so the table reproduces the chained
+    result exactly.
+
+    Args:
+        adjustments (iterable): ``(name, value)`` pairs of point adjustments, in order.
+        channels (int): Channel count of the image the table is built for (1 for grayscale).
+
+    Returns:
+        np.ndarray: uint8 table of shape (1, 256) or (1, 256, channels). Red, green,
+        blue and temperature turn the table into 3 channels, like the RGB conversion
+        those adjustments do.
+
+    Raises:
+        ValueError: If one of the adjustments is not a point operation.
+    """
+    ramp = np.arange(256, dtype=np.float32)
+    table = ramp[np.newaxis, :] if channels == 1 else np.repeat(ramp[np.newaxis, :, np.newaxis], channels, axis=2)
+    for name, value in adjustments:
+        if not is_point_adjustment(name):
+            raise ValueError(f"{name} is not a point adjustment")
+        table = STAGES[name](table, value)
+    return table.astype(np.uint8)
+
+
+def apply_lut(array: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    Maps a uint8 image through a table built by ``compile_lut`` in a single pass.
+
+    Args:
+        array (np.ndarray): uint8 image of shape (H, W) or (H, W, C).
+        lut (np.ndarray): Table of shape (1, 256) or (1, 256, C).
+
+    Returns:
+        np.ndarray: The mapped uint8 image.
+    """
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    lut_channels = 1 if lut.ndim == 2 else lut.shape[2]
+    if lut_channels != channels:
+        array = to_rgb(array)
+    return cv.LUT(array, lut)
+
+
+def split_point_runs(adjustments: Iterable[Tuple[str, float]]) -> List[Tuple[bool, List[Tuple[str, float]]]]:
+    """
+    Groups consecutive point adjustments so each group can become one table.
+
+    Args:
+        adjustments (iterable): ``(name, value)`` pairs, in order.
+
+    Returns:
+        list: ``(is_point, adjustments)`` groups preserving the original order.
+    """
+    runs: List[Tuple[bool, List[Tuple[str, float]]]] = []
+    for name, value in adjustments:
+        point = is_point_adjustment(name)
+        if runs and runs[-1][0] == point:
+            runs[-1][1].append((name, value))
+        else:
+            runs.append((point, [(name, value)]))
+    return runs
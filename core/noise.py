@@ -0,0 +1,125 @@
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.lru_cache import LRUCache
+
+# Seed used when none is given, so previews and exports share the same grain.
+DEFAULT_SEED = 0
+# Default memory cap for cached whole-image noise fields, a few typical preview levels.
+DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+# Size of the tiles the noise is drawn in, each from its own seeded generator. Short
+# tiles keep the rows drawn beyond a strip of an export, for its context, few. Tiles
+# are no wider than the image.
+NOISE_TILE_ROWS = 64
+NOISE_TILE_COLUMNS = 1024
+
+
+class GrainGenerator:
+    """
+    Adds reproducible Gaussian grain from a cached unit-variance noise field.
+
+    The field depends only on the image shape and seed. It is generated once
+    with ``np.random.Generator`` in float32 and scaled by the noise level on
+    each call, so moving another slider does not change the grain, and an
+    export of the same size reproduces exactly what the preview showed.
+
+    The field is drawn in tiles seeded by their position, so any
+    part of an image, such as one strip of a streamed export, gets exactly the
+    grain the whole image would have there. Fields of whole images are kept
+    in a byte bounded LRU cache. Of fields of parts only the latest is kept, so
+    the strips of an export do not push the preview fields out.
+
+    Positions are pixels of the image the grain is added to. A preview rendered
+    from a reduced pyramid level therefore shows grain of the same strength but
+    not the same pattern as the export; only previews of the full resolution
+    level, e.g. when zoomed in, match it exactly. Grain finer than a preview
+    pixel cannot be shown at that level anyway.
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Initialize the generator.
+
+        Args:
+            cache_bytes (int): Memory cap for cached whole-image fields, least recently used first out.
+        """
+        self._fields = LRUCache(cache_bytes)
+        self._part: Optional[Tuple[tuple, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def field(self, shape: tuple, seed: int = DEFAULT_SEED,
+              region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Returns the cached unit-variance noise field for a shape and seed.
+
+        Args:
+            shape (tuple): Shape of the image buffer.
+            seed (int): Seed of the noise.
+            region (tuple): (top, left, full height, full width) when the buffer is part of a
+                larger image. None for the whole image.
+
+        Returns:
+            np.ndarray: float32 standard normal samples of the given shape. Do not modify.
+        """
+        key = (tuple(shape), seed, region)
+        if region is None:
+            field = self._fields.get(key)
+        else:
+            with self._lock:
+                field = self._part[1] if self._part is not None and self._part[0] == key else None
+        if field is not None:
+            return field
+
+        height, width = shape[:2]
+        top, left, _, full_width = region if region is not None else (0, 0, height, width)
+        field = np.empty(shape, dtype=np.float32)
+        # Narrow images draw narrower tiles. The width depends on the whole image, so its parts still agree
+        rows, columns = NOISE_TILE_ROWS, max(1, min(NOISE_TILE_COLUMNS, full_width))
+        for row in range(top // rows, (top + height - 1) // rows + 1):
+            y0, y1 = max(top, row * rows), min(top + height, (row + 1) * rows)
+            for column in range(left // columns, (left + width - 1) // columns + 1):
+                x0, x1 = max(left, column * columns), min(left + width, (column + 1) * columns)
+                # Only the rows down to the last one needed are drawn, the generator fills row by row
+                tile = np.random.default_rng((seed, row, column)).standard_normal(
+                    (y1 - row * rows, columns) + tuple(shape[2:]), dtype=np.float32)
+                field[y0 - top:y1 - top, x0 - left:x1 - left] = \
+                    tile[y0 - row * rows:, x0 - column * columns:x1 - column * columns]
+        field.flags.writeable = False
+
+        if region is None:
+            self._fields.put(key, field)
+        else:
+            with self._lock:
+                self._part = key, field
+        return field
+
+    def apply(self, buffer: np.ndarray, noise_level: float, seed: int = DEFAULT_SEED,
+              region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Adds grain to a float32 buffer in place.
+
+        Args:
+            buffer (np.ndarray): float32 image of shape (H, W) or (H, W, C).
+            noise_level (float): Standard deviation of noise (>=0, higher for more noise).
+            seed (int): Seed of the noise.
+            region (tuple): (top, left, full height, full width) when the buffer is part of a larger image.
+
+        Returns:
+            np.ndarray: The same buffer with grain added.
+        """
+        if noise_level == 0:
+            return buffer
+        target = buffer[..., :3] if buffer.ndim == 3 and buffer.shape[2] == 4 else buffer  # Leave alpha untouched
+        target += np.multiply(self.field(target.shape, seed, region), np.float32(noise_level))
+        return buffer
+
+    def clear(self) -> None:
+        self._fields.clear()
+        with self._lock:
+            self._part = None
+
+
+# Shared generator used by adjust_noise and the adjustment pipeline.
+grain_generator = GrainGenerator()
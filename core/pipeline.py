@@ -0,0 +1,201 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+from core.adjustment import _ensure_valid_mode
+from core.lut import apply_lut, compile_lut, split_point_runs
+from core.blur import gaussian_blur, gaussian_halo
+from core.stages import FUSED_STAGES, GAUSSIAN_STAGES, POSITIONAL_STAGES, SPATIAL_STAGES, STAGES, to_pil
+from utils.lru_cache import LRUCache
+
+# Default memory cap for the cached intermediate buffers.
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def active_adjustments(adjustments: Dict[str, dict]) -> List[Tuple[str, float]]:
+    """
+    Collects the adjustments whose current value differs from the default.
+
+    Args:
+        adjustments (dict): The ``ImageScreen.adjustments`` settings dictionary.
+
+    Returns:
+        list: ``(name, value)`` pairs in the order they should be applied.
+    """
+    return [(key, settings["current"]) for key, settings in adjustments.items()
+            if settings["current"] != settings["default"]]
+
+
+def _split_steps(adjustments: List[Tuple[str, float]]) -> List[Tuple[bool, List[Tuple[str, float]]]]:
+    """
+    Splits the adjustments into pipeline steps: one per point run, one per other stage,
+    with adjacent stages listed in ``FUSED_STAGES`` sharing a step.
+    """
+    steps = []
+    for is_point, run in split_point_runs(adjustments):
+        if is_point:
+            steps.append((True, run))
+            continue
+        index = 0
+        while index < len(run):
+            for names in FUSED_STAGES:
+                if tuple(name for name, _ in run[index:index + len(names)]) == names:
+                    steps.append((False, run[index:index + len(names)]))
+                    index += len(names)
+                    break
+            else:
+                steps.append((False, [run[index]]))
+                index += 1
+    return steps
+
+
+class AdjustmentPipeline:
+    """
+    Applies a chain of adjustments on a single image buffer.
+
+    Runs of point adjustments are compiled into one lookup table per channel and
+    applied to the uint8 buffer in one pass. The remaining stages work in place on
+    a float32 copy of the buffer. The output is identical to calling the matching
+    ``core.adjustment.adjust_*`` functions one after another, except for the fused
+    hue/saturation stage: it rounds once instead of after each adjustment, so it
+    matches the chained calls only within rounding, a few levels at most.
+
+    When a cache key is given, the output of every step is kept in an LRU cache
+    keyed by the source and all adjustment values up to that step. A later call
+    restarts from the longest cached prefix, so moving one slider only recomputes
+    the steps from that adjustment onwards.
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Initialize the pipeline.
+
+        Args:
+            cache_bytes (int): Memory cap for cached intermediate buffers. 0 disables caching.
+        """
+        self.cache = LRUCache(cache_bytes)
+
+    def set_cache_limit(self, cache_bytes: int) -> None:
+        """Change the memory cap of the intermediate buffer cache."""
+        self.cache.set_max_bytes(cache_bytes)
+
+    def clear_cache(self) -> None:
+        self.cache.clear()
+
+    @staticmethod
+    def halo(adjustments: Iterable[Tuple[str, float]], scale: float = 1.0) -> int:
+        """
+        Returns how far, in pixels, the adjustments read around each output pixel.
+
+        Processing part of an image with this much context on each side gives the
+        same pixels as processing the whole image, see ``core.tiled.map_strips``.
+
+        Args:
+            adjustments (iterable): ``(name, value)`` pairs, as for ``apply``.
+            scale (float): Size of the image relative to the full resolution source.
+        """
+        return sum(gaussian_halo(GAUSSIAN_STAGES[name](value * scale if name in SPATIAL_STAGES else value, scale))
+                   for name, value in adjustments if name in GAUSSIAN_STAGES)
+
+    def apply(self, image: Union[Image.Image, np.ndarray], adjustments: Iterable[Tuple[str, float]],
+              scale: float = 1.0, cache_key: Optional[Hashable] = None,
+              region: Optional[Tuple[int, int, int, int]] = None) -> Union[Image.Image, np.ndarray]:
+        """
+        Applies the given adjustments to an image.
+
+        Args:
+            image (PIL.Image.Image | np.ndarray): Input image, or a uint8 Grayscale, RGB or RGBA
+                array such as a view from ``core.convert.qimage_to_numpy``. It is never modified.
+            adjustments (iterable): ``(name, value)`` pairs, applied in order.
+            scale (float): Size of the image relative to the full resolution source. Spatial
+                values such as the blur radius, and the sharpening radius, are multiplied by it
+                so previews match exports.
+            cache_key (hashable): Identifies the input image. Must change whenever its pixels
+                change. Without it nothing is cached.
+            region (tuple): (top, left, full height, full width) when the image is part of a larger
+                one, so the vignette and grain line up with the whole. The cache key must then
+                identify the part as well.
+
+        Returns:
+            PIL.Image.Image | np.ndarray: Adjusted image, of the same type as the input.
+        """
+        known = []
+        for name, value in adjustments:
+            if name in STAGES:
+                known.append((name, value * scale if name in SPATIAL_STAGES else value))
+            else:
+                logger.warning(f"Unknown adjustment: {name}")
+        adjustments = known
+        if not adjustments:
+            return image
+
+        steps = _split_steps(adjustments)
+        prefix_keys = []
+        if cache_key is not None:
+            prefix = []
+            for _, run in steps:
+                prefix.extend(run)
+                prefix_keys.append((cache_key, scale, tuple(prefix)))
+
+        start, buffer = 0, None
+        for index in range(len(prefix_keys), 0, -1):
+            buffer = self.cache.get(prefix_keys[index - 1])
+            if buffer is not None:
+                start = index
+                break
+        if buffer is None:
+            buffer = image if isinstance(image, np.ndarray) else np.asarray(_ensure_valid_mode(image))
+        else:
+            logger.debug(f"Pipeline resumed after {start} of {len(steps)} steps")
+
+        for index in range(start, len(steps)):
+            is_point, run = steps[index]
+            if is_point:
+                channels = 1 if buffer.ndim == 2 else buffer.shape[2]
+                buffer = apply_lut(buffer.astype(np.uint8, copy=False), compile_lut(run, channels))
+            else:
+                if buffer.dtype != np.float32 or not buffer.flags.writeable:
+                    buffer = buffer.astype(np.float32)
+                if len(run) == 1:
+                    name, value = run[0]
+                    if name in GAUSSIAN_STAGES:
+                        input_key = None
+                        if prefix_keys:
+                            input_key = prefix_keys[index - 1] if index else (cache_key, scale, ())
+                        blurred = self._gaussian(buffer, GAUSSIAN_STAGES[name](value, scale), input_key)
+                        buffer = STAGES[name](buffer, value, blurred=blurred)
+                    elif name in POSITIONAL_STAGES:
+                        buffer = STAGES[name](buffer, value, region=region)
+                    else:
+                        buffer = STAGES[name](buffer, value)
+                else:
+                    buffer = FUSED_STAGES[tuple(name for name, _ in run)](buffer, *(value for _, value in run))
+            if prefix_keys:
+                # Buffers are always whole numbers in range, so the uint8 copy is exact
+                buffer = buffer.astype(np.uint8, copy=False)
+                buffer.flags.writeable = False
+                self.cache.put(prefix_keys[index], buffer)
+
+        logger.info(f"Pipeline applied: {[name for name, _ in adjustments]}")
+        if isinstance(image, np.ndarray):
+            return buffer.astype(np.uint8, copy=False) if buffer.flags.writeable else buffer.copy()
+        return to_pil(buffer if buffer.flags.writeable else buffer.copy())
+
+    def _gaussian(self, buffer: np.ndarray, sigma: float, input_key: Optional[Hashable]) -> np.ndarray:
+        """
+        Returns the Gaussian of a stage input, shared through the cache.
+
+        Sharpening and blur both start from a Gaussian of their input. Keeping it
+        keyed by the input and sigma means scrubbing the sharpening amount, or a
+        blur at the same radius on the same input, skips the convolution.
+        """
+        key = ("gaussian", input_key, sigma) if input_key is not None else None
+        blurred = self.cache.get(key) if key is not None else None
+        if blurred is None:
+            blurred = gaussian_blur(buffer, sigma)
+            if key is not None:
+                blurred.flags.writeable = False
+                self.cache.put(key, blurred)
+        return blurred
@@ -0,0 +1,97 @@
+from typing import Optional
+
+import numpy as np
+
+
+# Block sides up to this are summed slice by slice, NumPy reductions over short axes are slow.
+_MAX_UNROLLED = 32
+
+
+def _sum_axis(array: np.ndarray, axis: int, dtype: type) -> np.ndarray:
+    length = array.shape[axis]
+    if length > _MAX_UNROLLED:
+        return array.sum(axis=axis, dtype=dtype)
+    index = [slice(None)] * array.ndim
+    index[axis] = 0
+    total = array[tuple(index)].astype(dtype)
+    for offset in range(1, length):
+        index[axis] = offset
+        total += array[tuple(index)]
+    return total
+
+
+def _block_means(region: np.ndarray, block_rows: int, block_cols: int) -> np.ndarray:
+    """
+    Averages a (H, W, C) region over blocks of ``block_rows`` x ``block_cols`` pixels.
+
+    H and W must be multiples of the block size. The reshape only splits axes, so
+    it is a view and the region is never copied.
+    """
+    height, width, channels = region.shape
+    blocks = region.reshape(height // block_rows, block_rows, width // block_cols, block_cols, channels)
+    count = block_rows * block_cols
+    # Summing the rows of each block first adds whole contiguous rows at a time,
+    # which is far faster than reducing both block axes at once
+    column_dtype = np.uint16 if block_rows * 255 < 2 ** 16 else np.uint32
+    dtype = np.uint32 if count * 255 < 2 ** 32 else np.uint64
+    sums = _sum_axis(_sum_axis(blocks, 1, column_dtype), 2, dtype)
+    sums += count // 2  # Round to nearest
+    sums //= count
+    return sums.astype(np.uint8)
+
+
+def _fill(out: np.ndarray, means: np.ndarray, block_rows: int, block_cols: int) -> None:
+    """Writes every block mean over its block in ``out``, a (H, W, C) view."""
+    height, width, channels = out.shape
+    # Expand one row of each block row, then copy it down the block as whole rows
+    rows = np.repeat(means, block_cols, axis=1)
+    out.reshape(height // block_rows, block_rows, width, channels)[...] = rows[:, np.newaxis]
+
+
+def pixelate(array: np.ndarray, block_size: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Replaces each block of pixels by its average colour.
+
+    Blocks are aligned to the top left corner. The blocks along the right and
+    bottom edges are averaged over the pixels they actually cover. Every pixel is
+    read and written once, so the cost does not depend on the block size.
+
+    Args:
+        array (np.ndarray): uint8 image of shape (H, W) or (H, W, C), any number of channels.
+        block_size (int): Side of the blocks in pixels. Blocks larger than the image are clipped to it.
+        out (np.ndarray): Preallocated contiguous output of the same shape and dtype, or None.
+
+    Returns:
+        np.ndarray: ``out``, or a new array, holding the pixelated image.
+    """
+    if out is None:
+        out = np.empty_like(array, order="C")
+    elif out.shape != array.shape or out.dtype != array.dtype or not out.flags.c_contiguous:
+        raise ValueError("out must be a contiguous array with the same shape and dtype as the input")
+
+    source = array[..., np.newaxis] if array.ndim == 2 else array
+    target = out[..., np.newaxis] if out.ndim == 2 else out
+    height, width = source.shape[:2]
+    block_size = max(1, int(block_size))
+    if block_size == 1:
+        target[...] = source
+        return out
+
+    full_height = height - height % block_size
+    full_width = width - width % block_size
+    edge_height = height - full_height
+    edge_width = width - full_width
+
+    if full_height and full_width:
+        means = _block_means(source[:full_height, :full_width], block_size, block_size)
+        _fill(target[:full_height, :full_width], means, block_size, block_size)
+    if edge_width and full_height:
+        means = _block_means(source[:full_height, full_width:], block_size, edge_width)
+        _fill(target[:full_height, full_width:], means, block_size, edge_width)
+    if edge_height and full_width:
+        means = _block_means(source[full_height:, :full_width], edge_height, block_size)
+        _fill(target[full_height:, :full_width], means, edge_height, block_size)
+    if edge_height and edge_width:
+        means = _block_means(source[full_height:, full_width:], edge_height, edge_width)
+        _fill(target[full_height:, full_width:], means, edge_height, edge_width)
+    return out
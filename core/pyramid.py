@@ -0,0 +1,88 @@
+from typing import List, Tuple
+
+from PySide6.QtGui import QImage
+
+from core.convert import numpy_to_qimage, qimage_to_numpy
+from core.tiled import downsample
+
+
+class ImagePyramid:
+    """
+    Mip pyramid of an image, each level half the size of the one before.
+
+    Level 0 is the source itself. The smaller levels are built lazily the first
+    time they are requested, by averaging 2x2 blocks of the previous level one
+    strip at a time. A memory-mapped source is therefore read sequentially, and
+    levels too large to keep in RAM are memory-mapped themselves.
+    """
+
+    def __init__(self, image: QImage, min_size: int = 64):
+        """
+        Initialize the pyramid.
+
+        Args:
+            image (QImage): Full resolution source image.
+            min_size (int): Levels stop once either side would drop below this size.
+        """
+        self._levels: List[QImage] = [image]
+        self._level_count = 1
+        width, height = image.width(), image.height()
+        while min(width, height) // 2 >= min_size:
+            width, height = width // 2, height // 2
+            self._level_count += 1
+
+    @property
+    def level_count(self) -> int:
+        return self._level_count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the reduced levels built so far. Level 0 is the source and not counted."""
+        return sum(level.sizeInBytes() for level in self._levels[1:])
+
+    @property
+    def source(self) -> QImage:
+        return self._levels[0]
+
+    def level(self, index: int) -> QImage:
+        """
+        Returns the image at the given level, building missing levels on the way.
+
+        Args:
+            index (int): Pyramid level, 0 being full resolution.
+
+        Returns:
+            QImage: The image at that level.
+        """
+        index = max(0, min(index, self._level_count - 1))
+        while len(self._levels) <= index:
+            self._levels.append(numpy_to_qimage(downsample(qimage_to_numpy(self._levels[-1]))))
+        return self._levels[index]
+
+    def level_scale(self, index: int) -> Tuple[float, float]:
+        """
+        Returns the factors mapping a level back onto full resolution.
+
+        Args:
+            index (int): Pyramid level.
+
+        Returns:
+            tuple: (x, y) scale factors, close to ``2 ** index``.
+        """
+        level = self.level(index)
+        return self.source.width() / level.width(), self.source.height() / level.height()
+
+    def level_for_scale(self, scale: float) -> int:
+        """
+        Picks the smallest level that still has at least one pixel per device pixel.
+
+        Args:
+            scale (float): Device pixels per full resolution image pixel.
+
+        Returns:
+            int: Pyramid level, 0 when the view is at or beyond 100%.
+        """
+        index = 0
+        while index + 1 < self._level_count and scale <= 0.5 ** (index + 1):
+            index += 1
+        return index
@@ -0,0 +1,171 @@
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+from core.adjustment import shift_hue_saturation
+from core.blur import gaussian_blur, unsharp_mask
+from core.noise import grain_generator
+from core.vignette import vignette_engine
+
+
+# Sigma of the Gaussian the sharpness adjustment extracts detail with, in full resolution pixels.
+SHARPEN_RADIUS = 1.0
+
+
+def quantize(buffer: np.ndarray) -> np.ndarray:
+    """
+    Clips and truncates the float buffer in place.
+
+    This mirrors the ``np.clip(...).astype(np.uint8)`` step every ``adjust_*``
+    function ends with, so the fused result stays bit-identical to the chain.
+    Stages of ``FUSED_STAGES`` quantize once for several adjustments, and only
+    match the chain within rounding.
+    """
+    np.clip(buffer, 0, 255, out=buffer)
+    np.trunc(buffer, out=buffer)
+    return buffer
+
+
+def to_rgb(buffer: np.ndarray) -> np.ndarray:
+    """
+    Returns a 3 channel view or copy of the buffer, like ``Image.convert("RGB")``.
+    """
+    if buffer.ndim == 2:
+        return np.repeat(buffer[:, :, np.newaxis], 3, axis=2)
+    if buffer.shape[2] == 4:
+        return np.ascontiguousarray(buffer[:, :, :3])
+    return buffer
+
+
+def to_pil(buffer: np.ndarray) -> Image.Image:
+    return Image.fromarray(buffer.astype(np.uint8, copy=False))
+
+
+def _shift_channels(buffer: np.ndarray, r: float, g: float, b: float) -> np.ndarray:
+    buffer = to_rgb(buffer)
+    for channel, shift in enumerate((r, g, b)):
+        view = buffer[..., channel]
+        view += shift
+        np.clip(view, 0, 255, out=view)
+        np.trunc(view, out=view)
+    return buffer
+
+
+def _stage_hue(buffer: np.ndarray, hue_shift: float) -> np.ndarray:
+    return quantize(shift_hue_saturation(buffer, hue_shift, 1))
+
+
+def _stage_saturation(buffer: np.ndarray, saturation_factor: float) -> np.ndarray:
+    return quantize(shift_hue_saturation(buffer, 0, saturation_factor))
+
+
+def _stage_hue_saturation(buffer: np.ndarray, hue_shift: float, saturation_factor: float) -> np.ndarray:
+    return quantize(shift_hue_saturation(buffer, hue_shift, saturation_factor))
+
+
+def _stage_temperature(buffer: np.ndarray, temperature_shift: float) -> np.ndarray:
+    return _shift_channels(buffer, temperature_shift, 0, -temperature_shift)
+
+
+def _stage_red(buffer: np.ndarray, red_intensity: float) -> np.ndarray:
+    return _shift_channels(buffer, red_intensity, 0, 0)
+
+
+def _stage_green(buffer: np.ndarray, green_intensity: float) -> np.ndarray:
+    return _shift_channels(buffer, 0, green_intensity, 0)
+
+
+def _stage_blue(buffer: np.ndarray, blue_intensity: float) -> np.ndarray:
+    return _shift_channels(buffer, 0, 0, blue_intensity)
+
+
+def _stage_scale(buffer: np.ndarray, factor: float) -> np.ndarray:
+    buffer *= factor
+    return quantize(buffer)
+
+
+def _stage_contrast(buffer: np.ndarray, contrast_factor: float) -> np.ndarray:
+    buffer -= 128
+    buffer *= contrast_factor
+    buffer += 128
+    return quantize(buffer)
+
+
+def _stage_gamma(buffer: np.ndarray, gamma: float) -> np.ndarray:
+    buffer /= 255
+    np.power(buffer, gamma, out=buffer)
+    buffer *= 255
+    return quantize(buffer)
+
+
+def _stage_shadows(buffer: np.ndarray, shadow_intensity: float) -> np.ndarray:
+    buffer *= (1 - shadow_intensity)
+    return quantize(buffer)
+
+
+def _stage_highlights(buffer: np.ndarray, highlight_intensity: float) -> np.ndarray:
+    headroom = np.subtract(255, buffer, dtype=np.float32)
+    headroom *= highlight_intensity
+    buffer += headroom
+    return quantize(buffer)
+
+
+def _stage_vignette(buffer: np.ndarray, vignette_strength: float, region: tuple = None) -> np.ndarray:
+    return quantize(vignette_engine.apply(buffer, vignette_strength, region=region))
+
+
+def _stage_sharpness(buffer: np.ndarray, sharpness_factor: float, blurred: np.ndarray = None) -> np.ndarray:
+    buffer = unsharp_mask(buffer, sharpness_factor - 1, SHARPEN_RADIUS, blurred=blurred)
+    np.rint(buffer, out=buffer)
+    return quantize(buffer)
+
+
+def _stage_blur(buffer: np.ndarray, blur_radius: float, blurred: np.ndarray = None) -> np.ndarray:
+    buffer = blurred.copy() if blurred is not None else gaussian_blur(buffer, blur_radius)
+    np.rint(buffer, out=buffer)
+    return quantize(buffer)
+
+
+def _stage_noise(buffer: np.ndarray, noise_level: float, region: tuple = None) -> np.ndarray:
+    return quantize(grain_generator.apply(buffer, noise_level, region=region))
+
+
+# Adjustments whose value is measured in pixels and must follow the image scale.
+SPATIAL_STAGES = frozenset({"blur"})
+
+# Stages that depend on where a pixel sits in the image. They accept the ``region``
+# of the buffer in the whole image, see ``core.tiled.Region``.
+POSITIONAL_STAGES = frozenset({"vignette", "noise"})
+
+# Stages that start from a Gaussian of their input, mapped to the sigma they need for a value
+# and the image scale. Blur values are already scaled, as a spatial stage. They accept the
+# precomputed Gaussian as ``blurred`` so the pipeline can share it.
+GAUSSIAN_STAGES: Dict[str, Callable[[float, float], float]] = {
+    "sharpness": lambda value, scale: SHARPEN_RADIUS * scale,
+    "blur": lambda value, scale: value,
+}
+
+STAGES: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    "hue": _stage_hue,
+    "saturation": _stage_saturation,
+    "temperature": _stage_temperature,
+    "sharpness": _stage_sharpness,
+    "blur": _stage_blur,
+    "noise": _stage_noise,
+    "brightness": _stage_scale,
+    "contrast": _stage_contrast,
+    "exposure": _stage_scale,
+    "shadows": _stage_shadows,
+    "highlights": _stage_highlights,
+    "vignette": _stage_vignette,
+    "gamma": _stage_gamma,
+    "red": _stage_red,
+    "green": _stage_green,
+    "blue": _stage_blue,
+}
+
+# Adjacent stages that run as one step when both are active, matching the chain within rounding.
+FUSED_STAGES: Dict[Tuple[str, ...], Callable[..., np.ndarray]] = {
+    ("hue", "saturation"): _stage_hue_saturation,
+}
@@ -0,0 +1,162 @@
+import tempfile
+from typing import Callable, Iterator, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+from loguru import logger
+
+# Buffers larger than this are backed by a scratch file instead of RAM.
+MEMMAP_THRESHOLD_BYTES = 512 * 1024 * 1024
+# Rows processed per strip, bounding the temporaries of a strip to a few times its size.
+DEFAULT_STRIP_ROWS = 256
+# Where scratch files are created, None for the system temporary directory.
+scratch_dir: Optional[str] = None
+
+# (top, left, full height, full width): where a buffer sits in the whole image it was cut from.
+Region = Tuple[int, int, int, int]
+
+
+def allocate(shape: Tuple[int, ...], dtype=np.uint8, threshold: Optional[int] = None) -> np.ndarray:
+    """
+    Allocates an uninitialized buffer, in RAM or memory-mapped on a scratch file.
+
+    Buffers above ``threshold`` bytes are ``np.memmap`` views of an anonymous
+    temporary file, removed by the system once the last view is gone. Their
+    pages are loaded on access and, being file backed, can be written out and
+    dropped by the OS under memory pressure, so untouched or long unused parts
+    of the image do not count against the process RSS.
+
+    Args:
+        shape (tuple): Shape of the buffer.
+        dtype: Element type.
+        threshold (int): Size in bytes above which the buffer is memory-mapped,
+            ``MEMMAP_THRESHOLD_BYTES`` if None.
+
+    Returns:
+        np.ndarray: A writable C-contiguous buffer.
+    """
+    threshold = MEMMAP_THRESHOLD_BYTES if threshold is None else threshold
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if nbytes <= threshold or nbytes == 0:
+        return np.empty(shape, dtype=dtype)
+    logger.debug(f"Memory-mapping a {nbytes / 2 ** 20:.0f} MiB scratch buffer of shape {shape}")
+    # The mapping keeps its own handle, the file object can go once it is mapped
+    with tempfile.TemporaryFile(prefix="imagify-", dir=scratch_dir) as file:
+        file.truncate(nbytes)
+        return np.memmap(file, dtype=dtype, mode="r+", shape=shape)
+
+
+def is_mapped(array: np.ndarray) -> bool:
+    """Whether the memory of an array belongs to a scratch file mapping."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base if isinstance(array.base, np.ndarray) else None
+    return False
+
+
+def iter_strips(height: int, strip_rows: int = DEFAULT_STRIP_ROWS, alignment: int = 1) -> Iterator[Tuple[int, int]]:
+    """
+    Yields the (start, stop) rows of consecutive strips covering an image.
+
+    Args:
+        height (int): Rows of the image.
+        strip_rows (int): Rows per strip, rounded up to a multiple of ``alignment``.
+        alignment (int): Every strip but the last starts and ends on a multiple of it.
+    """
+    alignment = max(1, alignment)
+    strip_rows = max(alignment, -(-strip_rows // alignment) * alignment)
+    for start in range(0, height, strip_rows):
+        yield start, min(height, start + strip_rows)
+
+
+def spill(array: np.ndarray, threshold: Optional[int] = None,
+          strip_rows: int = DEFAULT_STRIP_ROWS) -> np.ndarray:
+    """
+    Moves a large array to a scratch file mapping, strip by strip.
+
+    Args:
+        array (np.ndarray): The array. The caller should drop it afterwards.
+        threshold (int): Arrays up to this many bytes are returned as they are, see ``allocate``.
+        strip_rows (int): Rows copied at a time.
+
+    Returns:
+        np.ndarray: ``array``, or a memory-mapped copy of it.
+    """
+    threshold = MEMMAP_THRESHOLD_BYTES if threshold is None else threshold
+    if array.nbytes <= threshold or is_mapped(array):
+        return array
+    out = allocate(array.shape, array.dtype, threshold)
+    for start, stop in iter_strips(array.shape[0], strip_rows):
+        out[start:stop] = array[start:stop]
+    return out
+
+
+def downsample(array: np.ndarray, threshold: Optional[int] = None,
+               strip_rows: int = DEFAULT_STRIP_ROWS) -> np.ndarray:
+    """
+    Halves an image by averaging 2x2 blocks, strip by strip.
+
+    An odd last row or column is dropped, as by ``QImage.scaled`` to half size.
+    Only one strip of the input is touched at a time, so a memory-mapped input
+    is streamed through once, and large outputs are memory-mapped as well.
+
+    Args:
+        array (np.ndarray): uint8 image of shape (H, W) or (H, W, C).
+        threshold (int): Outputs larger than this many bytes are memory-mapped, see ``allocate``.
+        strip_rows (int): Output rows computed at a time.
+
+    Returns:
+        np.ndarray: The image at half size.
+    """
+    height, width = array.shape[0] // 2, array.shape[1] // 2
+    out = allocate((height, width) + array.shape[2:], array.dtype, threshold)
+    for start, stop in iter_strips(height, strip_rows):
+        source = array[2 * start:2 * stop, :2 * width]
+        cv.resize(source, (width, stop - start), dst=out[start:stop], interpolation=cv.INTER_AREA)
+    return out
+
+
+def map_strips(function: Callable[[np.ndarray, Region], np.ndarray], array: np.ndarray, halo: int = 0,
+               strip_rows: int = DEFAULT_STRIP_ROWS, alignment: int = 1, out: Optional[np.ndarray] = None,
+               threshold: Optional[int] = None, progress: Optional[Callable[[int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+    """
+    Runs an image operation over horizontal strips and assembles the result.
+
+    Each strip is passed with ``halo`` extra rows above and below, clipped at the
+    image edges, so operations reading neighbouring pixels see the same input
+    as on the whole image. The halo rows of the result are dropped. With a halo
+    at least as large as the operation's reach the result is the same as the
+    whole image result, while only one strip of temporaries exists at a time.
+
+    Args:
+        function: Called with a strip and its ``Region`` in the whole image. Returns
+            the processed strip, with the same number of rows.
+        array (np.ndarray): The image, e.g. a memory-mapped source.
+        halo (int): Context rows on each side of a strip.
+        strip_rows (int): Rows per strip.
+        alignment (int): Strips start on multiples of it, for block based operations.
+        out (np.ndarray): Preallocated output, or None to allocate one from the first strip result.
+        threshold (int): Allocated outputs larger than this many bytes are memory-mapped, see ``allocate``.
+        progress: Called with the percentage of rows done.
+        cancelled: Polled between strips, processing stops and returns None when it returns True.
+
+    Returns:
+        np.ndarray: ``out`` or the allocated output, None if cancelled.
+    """
+    height, width = array.shape[:2]
+    # Round the halo so strips with their context still start on the alignment
+    alignment = max(1, alignment)
+    halo = -(-max(0, halo) // alignment) * alignment
+    for start, stop in iter_strips(height, strip_rows, alignment):
+        if cancelled is not None and cancelled():
+            return None
+        top = max(0, start - halo)
+        result = function(array[top:min(height, stop + halo)], (top, 0, height, width))
+        if out is None:
+            out = allocate((height,) + result.shape[1:], result.dtype, threshold)
+        out[start:stop] = result[start - top:stop - top]
+        if progress is not None:
+            progress(stop * 100 // height)
+    return out
@@ -0,0 +1,156 @@
+import threading
+from typing import Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from utils.lru_cache import LRUCache
+
+# Default memory cap for cached whole-image distance fields, one of the largest preview level
+# or a few of typical ones.
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class VignetteEngine:
+    """
+    Darkens image edges using a cached radial distance field.
+
+    The normalized distance of every pixel from the vignette centre only depends
+    on the image size, centre and roundness, so it is computed once in float32
+    and reused. Changing the strength or feather then only costs a multiply.
+    Fields of whole images are kept in a byte bounded LRU cache. Of fields of
+    parts only the latest is kept, so the strips of an export do not push the
+    preview fields out.
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES, field_scale: float = 1.0):
+        """
+        Initialize the engine.
+
+        Args:
+            cache_bytes (int): Memory cap for cached distance fields, least recently used first out.
+                Larger fields, such as those of a whole full resolution image, are rebuilt on each call.
+            field_scale (float): Resolution of the cached field relative to the image (0-1].
+                Values below 1 build a smaller field and upsample the mask, trading a little
+                accuracy for memory and build time on large images.
+        """
+        self._fields = LRUCache(cache_bytes)
+        self._part: Optional[Tuple[tuple, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self.field_scale = min(1.0, max(0.01, field_scale))
+
+    def distance_field(self, width: int, height: int, center: Tuple[float, float] = (0.0, 0.0),
+                       roundness: float = 0.0, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Returns the cached distance field for an image size.
+
+        Args:
+            width (int): Field width.
+            height (int): Field height.
+            center (tuple): Vignette centre in normalized coordinates, (-1, -1) top left to (1, 1) bottom right.
+            roundness (float): 0 follows the image aspect ratio, 1 is a perfect circle.
+            region (tuple): (top, left, full height, full width) when the field covers only part of
+                a larger image, e.g. a strip of an export. None for the whole image.
+
+        Returns:
+            np.ndarray: float32 array of shape (height, width), 1.0 at the middle of each edge.
+        """
+        key = (width, height, tuple(center), roundness, region)
+        if region is None:
+            field = self._fields.get(key)
+        else:
+            with self._lock:
+                field = self._part[1] if self._part is not None and self._part[0] == key else None
+        if field is not None:
+            return field
+
+        top, left, full_height, full_width = region if region is not None else (0, 0, height, width)
+        x = np.linspace(-1, 1, full_width, dtype=np.float32)[left:left + width] - np.float32(center[0])
+        y = np.linspace(-1, 1, full_height, dtype=np.float32)[top:top + height] - np.float32(center[1])
+        if roundness and full_width != full_height:
+            # Scale the longer axis so the falloff tends to a circle in pixel space
+            aspect = np.float32((full_width / full_height) ** roundness)
+            if aspect > 1:
+                x *= aspect
+            else:
+                y /= aspect
+        field = np.hypot(x[np.newaxis, :], y[:, np.newaxis])
+        if region is None:
+            self._fields.put(key, field)
+        else:
+            with self._lock:
+                self._part = key, field
+        return field
+
+    def mask(self, width: int, height: int, strength: float, center: Tuple[float, float] = (0.0, 0.0),
+             roundness: float = 0.0, feather: float = 0.0,
+             region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Builds the multiplicative vignette mask.
+
+        Args:
+            width (int): Image width.
+            height (int): Image height.
+            strength (float): Strength of vignette (>=0, higher for stronger effect).
+            center (tuple): Vignette centre in normalized coordinates.
+            roundness (float): 0 follows the image aspect ratio, 1 is a perfect circle.
+            feather (float): 0 for a linear falloff, up to 1 for a smooth S-shaped one.
+            region (tuple): (top, left, full height, full width) of the masked part, see ``distance_field``.
+
+        Returns:
+            np.ndarray: float32 mask of shape (height, width) in 0-1.
+        """
+        if region is not None:
+            # Parts of an image are built at full resolution, a reduced field would not line up across parts
+            field_width, field_height = width, height
+        else:
+            field_width = max(1, round(width * self.field_scale))
+            field_height = max(1, round(height * self.field_scale))
+        field = self.distance_field(field_width, field_height, center, roundness, region)
+
+        mask = field * np.float32(strength)
+        np.clip(mask, 0, 1, out=mask)
+        if feather > 0:
+            smooth = mask * mask * (3 - 2 * mask)
+            mask *= np.float32(1 - feather)
+            smooth *= np.float32(feather)
+            mask += smooth
+        np.subtract(1, mask, out=mask)
+
+        if (field_width, field_height) != (width, height):
+            mask = cv.resize(mask, (width, height), interpolation=cv.INTER_LINEAR)
+        return mask
+
+    def apply(self, buffer: np.ndarray, strength: float, center: Tuple[float, float] = (0.0, 0.0),
+              roundness: float = 0.0, feather: float = 0.0,
+              region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Applies the vignette to a float32 buffer in place.
+
+        Args:
+            buffer (np.ndarray): float32 image of shape (H, W) or (H, W, C).
+            strength (float): Strength of vignette.
+            center (tuple): Vignette centre in normalized coordinates.
+            roundness (float): 0 follows the image aspect ratio, 1 is a perfect circle.
+            feather (float): 0 for a linear falloff, up to 1 for a smooth one.
+            region (tuple): (top, left, full height, full width) when the buffer is part of a larger image.
+
+        Returns:
+            np.ndarray: The same buffer, darkened towards the edges.
+        """
+        height, width = buffer.shape[:2]
+        mask = self.mask(width, height, strength, center, roundness, feather, region)
+        if buffer.ndim == 2:
+            buffer *= mask
+        else:
+            buffer[..., :3] *= mask[:, :, np.newaxis]  # Leave alpha untouched
+        return buffer
+
+    def clear(self) -> None:
+        self._fields.clear()
+        with self._lock:
+            self._part = None
+
+
+# Shared engine used by adjust_vignette and the adjustment pipeline.
+vignette_engine = VignetteEngine()
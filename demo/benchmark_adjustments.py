@@ -0,0 +1,63 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.adjustment import (adjust_temperature, adjust_brightness, adjust_contrast, adjust_exposure,
+                             adjust_shadows, adjust_highlight, adjust_vignette, adjust_gamma, adjust_red)
+from core.lut import is_point_adjustment
+from core.pipeline import AdjustmentPipeline
+
+ADJUSTMENTS = [
+    ("temperature", 15, adjust_temperature),
+    ("brightness", 1.2, adjust_brightness),
+    ("contrast", 1.3, adjust_contrast),
+    ("exposure", 0.9, adjust_exposure),
+    ("shadows", 0.1, adjust_shadows),
+    ("highlights", 0.2, adjust_highlight),
+    ("vignette", 0.4, adjust_vignette),
+    ("gamma", 1.1, adjust_gamma),
+    ("red", 10, adjust_red),
+]
+
+
+def run_chain(image: Image.Image, adjustments: list) -> Image.Image:
+    for _, value, function in adjustments:
+        image = function(image, value)
+    return image
+
+
+def run_pipeline(pipeline: AdjustmentPipeline, image: Image.Image, adjustments: list) -> Image.Image:
+    return pipeline.apply(image, [(name, value) for name, value, _ in adjustments])
+
+
+def timed(function, *args, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    logger.remove()
+    width, height = 6000, 4000  # 24 MP
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8))
+    pipeline = AdjustmentPipeline()
+
+    point_only = [adjustment for adjustment in ADJUSTMENTS if is_point_adjustment(adjustment[0])]
+
+    for label, adjustments in (("all", ADJUSTMENTS), ("point only", point_only)):
+        chain_time, expected = timed(run_chain, image, adjustments)
+        pipeline_time, result = timed(run_pipeline, pipeline, image, adjustments)
+
+        print(f"image: {width}x{height}, adjustments: {len(adjustments)} ({label})")
+        print(f"per-function chain: {chain_time * 1000:8.1f} ms")
+        print(f"fused pipeline:     {pipeline_time * 1000:8.1f} ms  ({chain_time / pipeline_time:.2f}x)")
+        print(f"identical output:   {np.array_equal(np.asarray(expected), np.asarray(result))}")
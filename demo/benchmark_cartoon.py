@@ -0,0 +1,54 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.bilateral import bilateral_filter
+from core.filters import filter_cartoon
+
+SAMPLE = Path(__file__).resolve().parent.parent / "samples" / "image.jpg"
+SIZES = [(1500, 1000), (3000, 2000), (6000, 4000)]  # 1.5, 6 and 24 MP
+SIGMA_COLORS = [30, 300]  # 300 is what filter_cartoon uses
+
+
+def psnr(expected: np.ndarray, result: np.ndarray) -> float:
+    error = np.mean((expected.astype(np.float32) - result.astype(np.float32)) ** 2)
+    return float("inf") if error == 0 else 10 * np.log10(255 ** 2 / error)
+
+
+def timed(function, *args, repeat: int = 3, **kwargs):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    logger.remove()
+    # A photo rather than noise, the approximation is only meaningful on real edges
+    source = np.array(Image.open(SAMPLE).convert("RGB"))
+
+    for width, height in SIZES:
+        image = cv.resize(source, (width, height), interpolation=cv.INTER_CUBIC)
+        print(f"image: {width}x{height}")
+        for sigma_color in SIGMA_COLORS:
+            exact_time, expected = timed(bilateral_filter, image, 9, sigma_color, 300)
+            fast_time, result = timed(bilateral_filter, image, 9, sigma_color, 300, fast=True)
+            print(f"  bilateral sigma_color={sigma_color:<3}  exact {exact_time * 1000:8.1f} ms"
+                  f"  fast {fast_time * 1000:8.1f} ms ({exact_time / fast_time:5.2f}x)"
+                  f"  PSNR {psnr(expected, result):5.2f} dB")
+
+        pil_image = Image.fromarray(image)
+        exact_time, expected = timed(filter_cartoon, pil_image)
+        fast_time, result = timed(filter_cartoon, pil_image, fast=True)
+        print(f"  filter_cartoon              exact {exact_time * 1000:8.1f} ms"
+              f"  fast {fast_time * 1000:8.1f} ms ({exact_time / fast_time:5.2f}x)"
+              f"  PSNR {psnr(np.asarray(expected), np.asarray(result)):5.2f} dB")
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+from PySide6.QtGui import QTransform
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import tiled
+from core.convert import numpy_to_qimage
+from core.export import export_image
+from core.pipeline import AdjustmentPipeline
+from gui.components.image_screen import render_array, render_strips
+from utils.enums import FilterType
+
+SAMPLE = Path(__file__).resolve().parent.parent / "samples" / "image.jpg"
+WIDTH, HEIGHT = 12000, 8000  # 96 MP
+FILTER = FilterType.SHARPEN
+ADJUSTMENTS = [("brightness", 1.1), ("vignette", 0.5)]
+METHODS = ["export", "qimage"]
+
+
+def anonymous_rss() -> int:
+    """Resident memory not backed by a file in KiB, 0 where /proc is not available.
+    Memory-mapped scratch buffers are file backed and left out, as the OS can drop them."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class PeakSampler(threading.Thread):
+    """Samples ``anonymous_rss`` every few milliseconds until stopped."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = anonymous_rss()
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, anonymous_rss())
+            time.sleep(0.005)
+
+
+def run(method: str, suffix: str) -> None:
+    """Exports a memory-mapped source with one method and prints its time and peak RSS."""
+    logger.remove()
+    source = np.array(Image.open(SAMPLE).convert("RGB"))
+    image = tiled.spill(cv.resize(source, (WIDTH, HEIGHT), interpolation=cv.INTER_CUBIC), threshold=0)
+    del source
+    pipeline = AdjustmentPipeline(0)
+    baseline = anonymous_rss()
+    sampler = PeakSampler()
+    sampler.start()
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / f"export{suffix}"
+        start = time.perf_counter()
+        if method == "export":
+            halo = FILTER.halo() + pipeline.halo(ADJUSTMENTS)
+            export_image(image, path, lambda strip, region: render_array(strip, FILTER, ADJUSTMENTS, pipeline, region=region),
+                         halo, orientation=(0, 1, -1, 0))
+        else:
+            # Render to a whole image, then rotate and save it through Qt
+            rendered = numpy_to_qimage(render_strips(image, FILTER, ADJUSTMENTS, pipeline))
+            rendered.transformed(QTransform().rotate(90)).save(str(path))
+        elapsed = time.perf_counter() - start
+        size = path.stat().st_size
+    sampler.running = False
+    sampler.join()
+    peak = sampler.peak
+    print(f"{method:<7} {suffix:<5} {elapsed:6.2f} s  peak anonymous RSS +{(peak - baseline) / 1024:6.0f} MiB  {size / 2 ** 20:6.1f} MiB file")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run(*sys.argv[1:])
+    else:
+        print(f"image: {WIDTH}x{HEIGHT}, memory-mapped, {FILTER.name} + {', '.join(key for key, _ in ADJUSTMENTS)}, rotated")
+        for suffix in (".jpg", ".png"):
+            for method in METHODS:
+                # Separate processes, so each peak is measured on its own
+                subprocess.run([sys.executable, __file__, method, suffix], check=True)
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import kernels
+
+FILTERS = ["CONTOUR", "DETAIL", "EDGE_ENHANCE", "EDGE_ENHANCE_MORE", "EMBOSS", "FIND_EDGES", "SMOOTH", "SMOOTH_MORE"]
+
+
+def timed(function, *args, repeat: int = 3, **kwargs):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    logger.remove()
+    width, height = 6000, 4000  # 24 MP
+    array = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(array)
+
+    print(f"image: {width}x{height}, cores: {os.cpu_count()}")
+    for name in FILTERS:
+        kernel = getattr(kernels, name)
+        pil_time, expected = timed(image.filter, getattr(ImageFilter, name))
+        single_time, _ = timed(kernel.apply, array, tile_rows=height)
+        tiled_time, result = timed(kernel.apply, array)
+        difference = np.abs(np.asarray(expected, dtype=np.int16) - result).max()
+        print(f"{name:<18} PIL {pil_time * 1000:7.1f} ms  one tile {single_time * 1000:7.1f} ms"
+              f"  tiled {tiled_time * 1000:7.1f} ms ({pil_time / tiled_time:5.2f}x)  max diff {difference}")
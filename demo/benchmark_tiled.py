@@ -0,0 +1,53 @@
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import tiled
+from core.pipeline import AdjustmentPipeline
+from gui.components.image_screen import render_array, render_strips
+from utils.enums import FilterType
+
+SAMPLE = Path(__file__).resolve().parent.parent / "samples" / "image.jpg"
+WIDTH, HEIGHT = 12000, 8000  # 96 MP
+CASES = [
+    (None, [("brightness", 1.2), ("contrast", 1.1)]),
+    (None, [("sharpness", 1.8), ("vignette", 0.6), ("noise", 8)]),
+    (FilterType.EMBOSS, [("gamma", 1.2)]),
+    (FilterType.PIXELATE, [("blur", 4)]),
+]
+
+
+def measured(function, *args):
+    """Returns the run time, the peak of NumPy and Python allocations, and the result."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+if __name__ == "__main__":
+    logger.remove()
+    source = np.array(Image.open(SAMPLE).convert("RGB"))
+    # Memory-map the source like a document this size would be
+    image = tiled.spill(cv.resize(source, (WIDTH, HEIGHT), interpolation=cv.INTER_CUBIC), threshold=0)
+    pipeline = AdjustmentPipeline(0)
+
+    print(f"image: {WIDTH}x{HEIGHT}, {image.nbytes / 2 ** 20:.0f} MiB memory-mapped")
+    for filter_type, adjustments in CASES:
+        name = ", ".join(([filter_type.name] if filter_type else []) + [key for key, _ in adjustments])
+        whole_time, whole_peak, expected = measured(render_array, image, filter_type, adjustments, pipeline)
+        strip_time, strip_peak, result = measured(render_strips, image, filter_type, adjustments, pipeline)
+        difference = np.abs(expected.astype(np.int16) - result).max()
+        print(f"{name:<32} whole {whole_time:6.2f} s {whole_peak / 2 ** 20:7.0f} MiB"
+              f"  strips {strip_time:6.2f} s {strip_peak / 2 ** 20:7.0f} MiB  max diff {difference}")
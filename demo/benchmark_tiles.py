@@ -0,0 +1,67 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPainter, QPixmap
+from PySide6.QtWidgets import QApplication, QGraphicsPixmapItem, QGraphicsScene, QGraphicsView
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.convert import numpy_to_qimage
+from core.pyramid import ImagePyramid
+from gui.components.tiled_item import TiledImageItem
+
+SAMPLE = Path(__file__).resolve().parent.parent / "samples" / "image.jpg"
+WIDTH, HEIGHT = 8000, 6000  # 48 MP
+VIEW_SCALES = [2.0, 1.0, 0.5, 0.25, 0.1]
+FRAMES = 20
+
+
+def frame_time(view: QGraphicsView) -> float:
+    """Returns the average time of a full viewport repaint while panning, in milliseconds."""
+    QApplication.processEvents()  # Let the view pick up the scene rect of the item
+    view.viewport().repaint()
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        view.horizontalScrollBar().setValue(view.horizontalScrollBar().value() + (40 if frame % 2 else -40))
+        view.viewport().repaint()
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    source = np.array(Image.open(SAMPLE).convert("RGB"))
+    pyramid = ImagePyramid(numpy_to_qimage(cv.resize(source, (WIDTH, HEIGHT), interpolation=cv.INTER_CUBIC)))
+
+    scene = QGraphicsScene()
+    view = QGraphicsView(scene)
+    view.setRenderHint(QPainter.SmoothPixmapTransform)
+    view.resize(1600, 1000)
+    view.show()
+    app.processEvents()
+
+    pixmap_item = QGraphicsPixmapItem(QPixmap.fromImage(pyramid.source))
+    pixmap_item.setTransformationMode(Qt.SmoothTransformation)
+    tiled_item = TiledImageItem()
+    tiled_item.set_image_size(WIDTH, HEIGHT)
+
+    print(f"image: {WIDTH}x{HEIGHT}, view {view.width()}x{view.height()}")
+    for scale in VIEW_SCALES:
+        view.resetTransform()
+        view.scale(scale, scale)
+        scene.addItem(pixmap_item)
+        pixmap_time = frame_time(view)
+        scene.removeItem(pixmap_item)
+
+        level = pyramid.level_for_scale(scale)
+        tiled_item.set_layer(level, pyramid.level(level), *pyramid.level_scale(level))
+        scene.addItem(tiled_item)
+        frame_time(view)  # Cut the tiles first, as the first frames at a new level would
+        tiled_time = frame_time(view)
+        scene.removeItem(tiled_item)
+        print(f"view {scale:4.0%}  pixmap item {pixmap_time:7.2f} ms/frame  "
+              f"tiled item level {level} {tiled_time:6.2f} ms/frame  {len(tiled_item.tiles)} tiles cached")
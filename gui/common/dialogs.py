@@ -0,0 +1,84 @@
+from PySide6.QtWidgets import QFormLayout
+from qfluentwidgets import BodyLabel, ComboBox, MessageBoxBase, SpinBox, SubtitleLabel, SwitchButton
+
+from core.export import JPEG_SUBSAMPLING, TIFF_COMPRESSION, SaveOptions
+
+
+class SaveOptionsDialog(MessageBoxBase):
+    """
+    Asks for the encoder settings of the format being saved, starting from the given options.
+    """
+
+    def __init__(self, options: SaveOptions, image_format: str, parent=None):
+        """
+        Initialize the dialog.
+
+        Args:
+            options (SaveOptions): Settings shown initially, e.g. those of the last save.
+            image_format (str): Format being saved, see ``core.export.image_format``.
+            parent: Parent widget, the dialog covers it.
+        """
+        super().__init__(parent)
+        self.options = options
+        self.image_format = image_format
+        self.viewLayout.addWidget(SubtitleLabel(f"{image_format} Options", self))
+        form = QFormLayout()
+        self.viewLayout.addLayout(form)
+
+        if image_format == "JPEG":
+            self.quality = self._spin_box(1, 100, options.jpeg_quality)
+            self.subsampling = self._combo_box(JPEG_SUBSAMPLING, options.jpeg_subsampling)
+            self.progressive = self._switch(options.jpeg_progressive)
+            form.addRow(BodyLabel("Quality", self), self.quality)
+            form.addRow(BodyLabel("Chroma subsampling", self), self.subsampling)
+            form.addRow(BodyLabel("Progressive", self), self.progressive)
+        elif image_format == "PNG":
+            self.compress_level = self._spin_box(0, 9, options.png_compress_level)
+            form.addRow(BodyLabel("Compression level", self), self.compress_level)
+        elif image_format == "WEBP":
+            self.lossless = self._switch(options.webp_lossless)
+            self.quality = self._spin_box(1, 100, options.webp_quality)
+            self.quality.setEnabled(not options.webp_lossless)
+            self.lossless.checkedChanged.connect(lambda checked: self.quality.setEnabled(not checked))
+            form.addRow(BodyLabel("Lossless", self), self.lossless)
+            form.addRow(BodyLabel("Quality", self), self.quality)
+        elif image_format == "TIFF":
+            self.compression = self._combo_box(TIFF_COMPRESSION, options.tiff_compression)
+            form.addRow(BodyLabel("Compression", self), self.compression)
+        self.widget.setMinimumWidth(360)
+
+    @staticmethod
+    def has_options(image_format: str) -> bool:
+        """Whether the format has settings to ask for."""
+        return image_format in ("JPEG", "PNG", "WEBP", "TIFF")
+
+    def _spin_box(self, minimum: int, maximum: int, value: int) -> SpinBox:
+        spin_box = SpinBox(self)
+        spin_box.setRange(minimum, maximum)
+        spin_box.setValue(value)
+        return spin_box
+
+    def _combo_box(self, choices: dict, current: str) -> ComboBox:
+        combo_box = ComboBox(self)
+        combo_box.addItems(list(choices))
+        combo_box.setCurrentText(current)
+        return combo_box
+
+    def _switch(self, checked: bool) -> SwitchButton:
+        switch = SwitchButton(self)
+        switch.setChecked(checked)
+        return switch
+
+    def selected_options(self) -> SaveOptions:
+        """The options with the settings chosen in the dialog."""
+        if self.image_format == "JPEG":
+            return self.options.updated(jpeg_quality=self.quality.value(),
+                                        jpeg_subsampling=self.subsampling.currentText(),
+                                        jpeg_progressive=self.progressive.isChecked())
+        if self.image_format == "PNG":
+            return self.options.updated(png_compress_level=self.compress_level.value())
+        if self.image_format == "WEBP":
+            return self.options.updated(webp_lossless=self.lossless.isChecked(), webp_quality=self.quality.value())
+        if self.image_format == "TIFF":
+            return self.options.updated(tiff_compression=self.compression.currentText())
+        return self.options
@@ -1,15 +1,19 @@
 from typing import Callable, Optional, Union, Dict, Any
 
+import cv2 as cv
 from PIL import Image
 from PIL.ImageQt import ImageQt  # Use ImageQt for QImage conversion
-from PySide6.QtCore import Qt, QSize, Signal
+from PySide6.QtCore import Qt, QSize, Signal, QThreadPool
 from PySide6.QtGui import QImage
 from PySide6.QtWidgets import QApplication
 from qfluentwidgets import ImageLabel, StrongBodyLabel
 
+from core.convert import qimage_to_numpy
 from gui.common.myScroll import FlowScrollWidget
 from gui.common.myFrame import VerticalFrame
 from utils.enums import FilterType
+from utils.thumbnail_cache import ThumbnailCache
+from utils.worker import Task
 
 from loguru import logger
 
@@ -95,44 +99,115 @@ class FilterWindow(FlowScrollWidget):
         """
         super().__init__("", parent=parent)
         self.setStyleSheet("background: rgba(25, 33, 42, 0.6); border-radius: 5px;")
-        self.image: Optional[Image.Image] = None
+        self.image: Optional[Union[Image.Image, QImage, str]] = None
+        self.thumbnail_source: Optional[Image.Image] = None
+        self.thumbnail_hash: Optional[str] = None
+        self.thumbnail_cache = ThumbnailCache()
+        self._pool = QThreadPool(self)
+        self._generation = 0
+        self._task_id = 0
+        self._tasks: Dict[int, tuple] = {}  # task id -> (task, generation, filter name)
         self._create_filter_widgets()
 
     def set_image(self, image: Union[Image.Image, ImageQt, str, QImage]) -> None:
         """
         Set the image to apply filters on.
 
+        Thumbnails are generated in the background, so this returns immediately.
+        Renders still pending for a previous image are cancelled.
+
         Args:
             image: A PIL Image, QImage, or file path string.
         """
         logger.info("Setting image for filters.")
-        if isinstance(image, str):
-            image = Image.open(image)
-        elif isinstance(image, ImageQt):
-            image = Image.fromqimage(image)
-        elif isinstance(image, QImage):
-            image = Image.fromqimage(image)
         self.image = image
-        self.update_image()
+        self.thumbnail_source = None
+        self.thumbnail_hash = None
+        self._cancel_pending()
+        self._submit(self._prepare_thumbnail, image, on_result=self._on_thumbnail_source_ready)
 
     def update_image(self) -> None:
         """
-        Update all filter widgets with the filtered thumbnails.
+        Regenerate all filter thumbnails in the worker pool, filling each widget as it finishes.
         """
-        if self.image is None:
+        if self.thumbnail_source is None:
             logger.warning("No image set to update filters.")
             return
 
-        resized_image = self._resize_image(self.image)
         logger.info("Updating filter widgets with new image.")
-
+        self._cancel_pending()
         for i in range(self.count()):
             widget = self.itemAt(i).widget()
             if isinstance(widget, FilterWidget):
                 filter_type = getattr(FilterType, widget.objectName(), None)
                 if filter_type:
-                    filtered_image = filter_type.apply(resized_image)
-                    widget.set_image(ImageQt(filtered_image))
+                    self._submit(self._render_thumbnail, filter_type, self.thumbnail_source,
+                                 self.thumbnail_hash, self.thumbnail_cache, name=filter_type.name)
+
+    def _prepare_thumbnail(self, image: Union[Image.Image, ImageQt, str, QImage]) -> tuple:
+        """Decode the image, shrink it to thumbnail size and hash it. Runs on a pool thread."""
+        if isinstance(image, str):
+            image = Image.open(image)
+        elif isinstance(image, QImage):
+            # Shrink the pixels in place first, the source may be a memory-mapped image far too large to copy
+            image = Image.fromarray(cv.resize(qimage_to_numpy(image), (200, 200), interpolation=cv.INTER_AREA))
+        image = self._resize_image(image)
+        return image, ThumbnailCache.content_hash(image)
+
+    @staticmethod
+    def _render_thumbnail(filter_type: FilterType, image: Image.Image, source_hash: Optional[str] = None,
+                          cache: Optional[ThumbnailCache] = None) -> ImageQt:
+        """Filter a thumbnail, going through the on-disk cache. Runs on a pool thread."""
+        if cache is not None and source_hash is not None:
+            filtered_image = cache.get(source_hash, filter_type.name, filter_type.parameter, fast=True)
+            if filtered_image is None:
+                filtered_image = filter_type.apply(image, fast=True)
+                cache.put(source_hash, filter_type.name, filtered_image, filter_type.parameter, fast=True)
+        else:
+            filtered_image = filter_type.apply(image, fast=True)
+        return ImageQt(filtered_image)
+
+    def _submit(self, function, *args, name: Optional[str] = None, on_result=None) -> None:
+        self._task_id += 1
+        task = Task(self._task_id, function, *args)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(on_result or self._on_thumbnail_ready)
+        task.signals.failed.connect(self._on_task_failed)
+        self._tasks[self._task_id] = (task, self._generation, name)
+        self._pool.start(task)
+
+    def _cancel_pending(self) -> None:
+        """Drop queued renders and ignore the ones still running."""
+        self._generation += 1
+        for task_id, (task, _, _) in list(self._tasks.items()):
+            # Running tasks stay referenced until they report back
+            if self._pool.tryTake(task):
+                del self._tasks[task_id]
+
+    def _take_task(self, task_id: int) -> Optional[tuple]:
+        """Forget a finished task, returning its entry if it belongs to the current image."""
+        entry = self._tasks.pop(task_id, None)
+        if entry is None or entry[1] != self._generation:
+            return None
+        return entry
+
+    def _on_thumbnail_source_ready(self, task_id: int, result: tuple) -> None:
+        if self._take_task(task_id) is not None:
+            self.thumbnail_source, self.thumbnail_hash = result
+            self.update_image()
+
+    def _on_thumbnail_ready(self, task_id: int, thumbnail: ImageQt) -> None:
+        entry = self._take_task(task_id)
+        if entry is None:
+            return
+        widget = self.findChild(FilterWidget, entry[2])
+        if widget is not None:
+            widget.set_image(thumbnail)
+
+    def _on_task_failed(self, task_id: int, message: str) -> None:
+        entry = self._tasks.pop(task_id, None)
+        if entry is not None:
+            logger.error(f"Thumbnail generation failed for {entry[2] or 'source image'}: {message}")
 
     def _resize_image(self, image: Image.Image, size: tuple = (100, 100)) -> Image.Image:
         return image.resize(size, Image.Resampling.LANCZOS)
@@ -159,10 +234,10 @@ class FilterWindow(FlowScrollWidget):
         widget.set_title(filter_type.name)
         widget.setObjectName(filter_type.name)  # Use enum name for reference
 
-        if self.image:
+        if self.thumbnail_source:
             logger.info(f"Applying filter {filter_type.name} to create thumbnail.")
-            filtered_image = filter_type.apply(self.image.resize((100, 100), Image.Resampling.LANCZOS))
-            widget.set_image(ImageQt(filtered_image))
+            self._submit(self._render_thumbnail, filter_type, self.thumbnail_source,
+                         self.thumbnail_hash, self.thumbnail_cache, name=filter_type.name)
 
         widget.clicked.connect(lambda f=filter_type: self.apply_filter(f))
         return widget
@@ -1,21 +1,148 @@
+import math
 from enum import Enum
 from pathlib import Path
-from typing import Union
+from typing import Callable, Optional, Sequence, Tuple, Union
 
+import numpy as np
 from PIL.ImageQt import ImageQt
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QGraphicsRectItem, QGraphicsItem
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsItem
 from PySide6.QtGui import QImage, QPixmap, QPainter, QColor, QCursor, QBrush, QPen, QPainterPath
 from PySide6.QtCore import Qt, Signal, QPoint, QRectF, QPointF, QRect
 from loguru import logger
-from core.adjustment import (adjust_hue, adjust_saturation, adjust_temperature, adjust_sharpness,
-                                            adjust_blur, adjust_noise, adjust_brightness, adjust_contrast, adjust_exposure,
-                                            adjust_shadows, adjust_highlight, adjust_vignette, adjust_gamma, adjust_red,
-                                            adjust_green, adjust_blue)
-
 from gui.components.overlay import CropOverlay, SizeOverlay
-from core.convert import convert_qimage_to_pil, convert_pil_to_qimage
+from gui.components.tiled_item import TiledImageItem
+from core.convert import normalize_qimage, numpy_to_qimage, qimage_to_numpy
+from core.document import ImageDocument
+from core.export import Orientation, export_image, orientation_from_matrix
+from core.pipeline import AdjustmentPipeline
+from core.pyramid import ImagePyramid
+from core.tiled import DEFAULT_STRIP_ROWS, is_mapped, map_strips
 from utils.enums import FilterType
+from utils.lru_cache import LRUCache
 from utils.screen import get_screen_size, get_screen_dpi
+from utils.worker import ImageExporter, ImageLoader, RenderWorker
+
+# Preview levels with more pixels than this are only rendered around the visible part of the image.
+MAX_DISPLAY_PIXELS = 4096 * 4096
+# Windowed renders start and end on multiples of this many level pixels, so small scrolls reuse them.
+WINDOW_ALIGNMENT = 256
+
+
+def render_array(array: np.ndarray, filter_type: Union[FilterType, None], adjustments: list,
+                 pipeline: AdjustmentPipeline, scale: float = 1.0, cache_key=None,
+                 filter_cache: Union[LRUCache, None] = None, fast: bool = False,
+                 region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """
+    Apply a filter and adjustments to an image array, see ``render_image``.
+
+    Args:
+        region: (top, left, full height, full width) when ``array`` is part of a larger image,
+            so the positional adjustments line up with the whole. ``cache_key`` must then
+            identify the part.
+    """
+    if filter_type is not None:
+        filter_key = (filter_type.name, filter_type.scaled_parameter(scale), fast and filter_type.has_fast_mode)
+        filtered = None
+        if filter_cache is not None and cache_key is not None:
+            filtered = filter_cache.get((cache_key, filter_key))
+        if filtered is None:
+            logger.info(f"Applying display filter: {filter_type.name}")
+            filtered = np.asarray(filter_type.apply(array, scale, fast))
+            if filter_cache is not None and cache_key is not None:
+                filtered.flags.writeable = False
+                filter_cache.put((cache_key, filter_key), filtered)
+        array = filtered
+    if adjustments:
+        try:
+            if cache_key is not None:
+                cache_key = (cache_key, filter_key if filter_type is not None else None)
+            array = pipeline.apply(array, adjustments, scale, cache_key, region)
+        except Exception as e:
+            logger.exception(f"Error applying adjustments: {str(e)}")
+        else:
+            logger.info(f"Applied adjustments: {[key for key, _ in adjustments]}")
+    return array
+
+
+def render_image(image: QImage, filter_type: Union[FilterType, None], adjustments: list,
+                 pipeline: AdjustmentPipeline, scale: float = 1.0, cache_key=None,
+                 filter_cache: Union[LRUCache, None] = None, fast: bool = False) -> QImage:
+    """
+    Apply a filter and adjustments to an image.
+
+    Only uses its arguments, so it is safe to call from the render worker.
+
+    Args:
+        image: The source image or one of its pyramid levels.
+        filter_type: The filter to apply, or None.
+        adjustments: ``(name, value)`` pairs from ``active_adjustments``.
+        pipeline: The adjustment pipeline to run them through.
+        scale: Size of the image relative to the source, used to scale spatial parameters.
+        cache_key: Identifies ``image`` for the pipeline's intermediate cache, or None.
+        filter_cache: Keeps the filtered image per ``(cache_key, filter, parameter)``, so
+            changing an adjustment does not run the filter again. Needs ``cache_key``.
+        fast: Use the approximate mode of filters that have one, for previews.
+    """
+    # Stay in NumPy from the source pixels to the displayed QImage
+    return numpy_to_qimage(render_array(qimage_to_numpy(image), filter_type, adjustments, pipeline,
+                                        scale, cache_key, filter_cache, fast))
+
+
+def render_strips(array: np.ndarray, filter_type: Union[FilterType, None], adjustments: list,
+                  pipeline: AdjustmentPipeline, out: Optional[np.ndarray] = None,
+                  progress: Optional[Callable[[int], None]] = None,
+                  cancelled: Optional[Callable[[], bool]] = None,
+                  strip_rows: int = DEFAULT_STRIP_ROWS) -> Optional[np.ndarray]:
+    """
+    Apply a filter and adjustments to a full resolution image, one strip at a time.
+
+    Every strip is rendered with the context rows its filter and adjustments
+    read, so the result matches rendering the whole image, while the
+    temporaries only ever cover one strip. Large outputs are memory-mapped.
+
+    Args:
+        array: The source pixels, e.g. a memory-mapped document source.
+        filter_type: The filter to apply, or None.
+        adjustments: ``(name, value)`` pairs from ``active_adjustments``.
+        pipeline: The adjustment pipeline to run them through. Its cache is not used.
+        out: Preallocated output, or None.
+        progress: Called with the percentage of rows done.
+        cancelled: Polled between strips, rendering stops and returns None when it returns True.
+        strip_rows: Rows rendered at a time.
+
+    Returns:
+        np.ndarray: The rendered image, None if cancelled.
+    """
+    halo = (filter_type.halo() if filter_type is not None else 0) + pipeline.halo(adjustments)
+    alignment = filter_type.alignment() if filter_type is not None else 1
+    return map_strips(lambda strip, region: render_array(strip, filter_type, adjustments, pipeline, region=region),
+                      array, halo, strip_rows, alignment, out=out, progress=progress, cancelled=cancelled)
+
+
+def _render_job(image: QImage, filter_type: Union[FilterType, None], adjustments: list,
+                pipeline: AdjustmentPipeline, scale_x: float, scale_y: float, cache_key=None,
+                filter_cache: Union[LRUCache, None] = None, window: Optional[Tuple[int, int, int, int]] = None,
+                level: int = 0) -> tuple:
+    # Previews use the fast filter modes, full resolution renders for export stay exact
+    scale = 1 / scale_x
+    if window is None:
+        image = render_image(image, filter_type, adjustments, pipeline, scale, cache_key, filter_cache, fast=True)
+        return image, level, scale_x, scale_y, (0, 0)
+
+    # Render the window with the context its filter and adjustments read, then drop the context
+    array = qimage_to_numpy(image)
+    height, width = array.shape[:2]
+    x, y, window_width, window_height = window
+    halo = (filter_type.halo(scale) if filter_type is not None else 0) + pipeline.halo(adjustments, scale)
+    alignment = filter_type.alignment(scale) if filter_type is not None else 1
+    halo = -(-halo // alignment) * alignment  # The window is aligned, keep its context aligned too
+    top, left = max(0, y - halo), max(0, x - halo)
+    bottom, right = min(height, y + window_height + halo), min(width, x + window_width + halo)
+    rendered = render_array(array[top:bottom, left:right], filter_type, adjustments, pipeline, scale,
+                            cache_key, filter_cache, fast=True, region=(top, left, height, width))
+    rendered = rendered[y - top:y - top + window_height, x - left:x - left + window_width]
+    return numpy_to_qimage(rendered), level, scale_x, scale_y, (x, y)
+
 
 class DrawMode(Enum):
     Move = 0
@@ -29,6 +156,11 @@ class ImageScreen(QGraphicsView):
     image_changed = Signal(QImage)
     image_updated = Signal(QImage)
     zoom_value = Signal(float)
+    load_progress = Signal(int)
+    load_failed = Signal(str)
+    export_progress = Signal(int)
+    exported = Signal(object)
+    export_failed = Signal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -39,9 +171,6 @@ class ImageScreen(QGraphicsView):
         self.is_cropping = False
         self.rotate_angle = 0
         self.history = list()
-        self.is_image_adjusted = None
-        self.is_image_filtered = False
-        self.current_filter: FilterType = None
         self.setRenderHint(QPainter.Antialiasing)
         self.setRenderHint(QPainter.SmoothPixmapTransform)
         self.setDragMode(QGraphicsView.ScrollHandDrag)
@@ -52,11 +181,13 @@ class ImageScreen(QGraphicsView):
 
         self.screen_dpi = get_screen_dpi()
 
-        self.image_item = QGraphicsPixmapItem()
+        self.image_item = TiledImageItem()
         self.scene.addItem(self.image_item)
 
-        self.image_path: Union[Path, None] = None
-        self.source_image: Union[QImage, None] = None
+        self.document: Union[ImageDocument, None] = None
+        self.preview_level: int = 0
+        # (level, x, y, width, height) of the windowed render on display, None when the whole level is shown
+        self.display_window: Optional[Tuple[int, int, int, int, int]] = None
         self.zoom_factor: float = 1.0
         self.MIN_ZOOM: float = 0.1
         self.MAX_ZOOM: float = 5.0
@@ -67,24 +198,20 @@ class ImageScreen(QGraphicsView):
         self.overlay_color = QColor(0, 0, 0, 150)
         self.crop_rect_overlay = CropOverlay(self.sceneRect(), self.image_item.boundingRect(), self.overlay_color)
 
-        self.adjustments = {
-            "hue": {'default': 0, 'current': 0, 'function': adjust_hue},
-            "saturation": {'default': 0, 'current': 0, 'function': adjust_saturation},
-            "temperature": {'default': 0, 'current': 0, 'function': adjust_temperature},
-            "sharpness": {'default': 0, 'current': 0, 'function': adjust_sharpness},
-            "blur": {'default': 0, 'current': 0, 'function': adjust_blur},
-            "noise": {'default': 0, 'current': 0, 'function': adjust_noise},
-            "brightness": {'default': 0, 'current': 0, 'function': adjust_brightness},
-            "contrast": {'default': 0, 'current': 0, 'function': adjust_contrast},
-            "exposure": {'default': 0, 'current': 0, 'function': adjust_exposure},
-            "shadows": {'default': 0, 'current': 0, 'function': adjust_shadows},
-            "highlights": {'default': 0, 'current': 0, 'function': adjust_highlight},
-            "vignette": {'default': 0, 'current': 0, 'function': adjust_vignette},
-            "gamma": {'default': 0, 'current': 0, 'function': adjust_gamma},
-            "red": {'default': 0, 'current': 0, 'function': adjust_red},
-            "green": {'default': 0, 'current': 0, 'function': adjust_green},
-            "blue": {'default': 0, 'current': 0, 'function': adjust_blue}
-        }
+        self.pipeline = AdjustmentPipeline()
+        self.render_worker = RenderWorker(self)
+        self.render_worker.finished.connect(self._show_rendered)
+        self.horizontalScrollBar().valueChanged.connect(self._update_display_window)
+        self.verticalScrollBar().valueChanged.connect(self._update_display_window)
+        self.loader = ImageLoader(self)
+        self.loader.preview.connect(self._show_load_preview)
+        self.loader.progress.connect(self.load_progress)
+        self.loader.finished.connect(self._on_image_loaded)
+        self.loader.failed.connect(self._on_load_failed)
+        self.exporter = ImageExporter(self)
+        self.exporter.progress.connect(self.export_progress)
+        self.exporter.finished.connect(self.exported)
+        self.exporter.failed.connect(self.export_failed)
 
         # Explicitly enable drop events
         self.setAcceptDrops(True)
@@ -97,6 +224,27 @@ class ImageScreen(QGraphicsView):
 
 
 
+    @property
+    def source_image(self) -> Union[QImage, None]:
+        return self.document.qimage if self.document is not None else None
+
+    @property
+    def pyramid(self) -> Union[ImagePyramid, None]:
+        return self.document.pyramid if self.document is not None else None
+
+    @property
+    def image_path(self) -> Union[Path, None]:
+        return self.document.path if self.document is not None else None
+
+    @property
+    def current_filter(self) -> Union[FilterType, None]:
+        return self.document.filter if self.document is not None else None
+
+    @property
+    def adjustments(self) -> dict:
+        """The adjustment settings of the document, see ``core.document.default_adjustments``."""
+        return self.document.adjustments if self.document is not None else {}
+
     def dragEnterEvent(self, event):
         """Handle drag enter events for file drops."""
         logger.debug(f"Drag enter event received: {event.mimeData().formats()}")
@@ -144,21 +292,46 @@ class ImageScreen(QGraphicsView):
             event.ignore()
 
     def load_image(self, file_path: Union[str, Path]):
-        """Load an image from a file path."""
-        try:
-            file_path = Path(file_path) if isinstance(file_path, str) else file_path
-            logger.info(f"Loading image from: {file_path}")
-            self.reset_screen_state()
-            self.image_path = file_path
-            image = QImage(str(self.image_path))
-
-            if image.isNull():
-                raise ValueError("Failed to load image: Image is null")
-            self.image_changed.emit(image)
-            self.update_source_image(image)
-            self.scale(1/self.screen_dpi, 1/self.screen_dpi)
-        except Exception as e:
-            logger.exception(f"Error loading image: {e}")
+        """
+        Load an image from a file path, in the background.
+
+        A reduced decode sized to the viewport is shown first when the format
+        allows it, the full resolution document replaces it when decoded.
+        Loading another file cancels this one.
+        """
+        file_path = Path(file_path) if isinstance(file_path, str) else file_path
+        logger.info(f"Loading image from: {file_path}")
+        self.reset_screen_state()
+        self.scale(1/self.screen_dpi, 1/self.screen_dpi)
+        ratio = self.devicePixelRatioF()
+        viewport = self.viewport().size()
+        self.loader.load(file_path, (max(1, round(viewport.width() * ratio)), max(1, round(viewport.height() * ratio))))
+
+    def _show_load_preview(self, array: np.ndarray, full_size: tuple):
+        """Show the reduced decode of a loading image, scaled up to full resolution scene coordinates."""
+        height, width = array.shape[:2]
+        scale_x, scale_y = full_size[0] / width, full_size[1] / height
+        self.image_item.set_image_size(*full_size)
+        # Filed under the pyramid level of about the same size, which replaces it once rendered
+        self.image_item.set_layer(round(math.log2(scale_x)), numpy_to_qimage(array), scale_x, scale_y)
+        self.scene.setSceneRect(self.image_item.sceneBoundingRect())
+
+    def _on_image_loaded(self, document: ImageDocument):
+        self.set_document(document)
+        self.image_changed.emit(self.document.qimage)
+        self._update_preview_level()
+
+    def _on_load_failed(self, message: str):
+        logger.error(f"Error loading image: {message}")
+        self.image_item.clear()
+        self.load_failed.emit(message)
+
+    def set_document(self, document: ImageDocument):
+        """Show a document, replacing the current one."""
+        self.document = document
+        self.pipeline.clear_cache()
+        self.preview_level = self._preview_level_for_view()
+        self._update_display_image()
 
     def update_source_image(self, image: QImage):
         """Update the source image and refresh the display.
@@ -167,8 +340,13 @@ class ImageScreen(QGraphicsView):
             logger.error("Provided image is null. Update aborted.")
             return
 
-        self.source_image = image
-        self._update_display_image(self.source_image)
+        if self.document is None:
+            self.set_document(ImageDocument.from_qimage(image))
+            return
+        self.document.set_source(qimage_to_numpy(normalize_qimage(image)))
+        self.pipeline.clear_cache()
+        self.preview_level = self._preview_level_for_view()
+        self._update_display_image()
 
     def set_image(self, image: QImage):
         """Set the image to be displayed."""
@@ -178,35 +356,198 @@ class ImageScreen(QGraphicsView):
         self._update_display_image(image)
 
     def _update_display_image(self, display_image: Union[QImage, None] = None):
-        """Update the displayed image."""
+        """Update the displayed image and record the state in history."""
+        if self._render_display(display_image):
+            self.save_current_state()
+
+    def _render_display(self, display_image: Union[QImage, None] = None) -> bool:
+        """
+        Render the filter and adjustments onto the image item.
+
+        Without an explicit image the source is rendered at the current preview
+        level, and shown as that level's layer of the item, scaled back up so
+        scene coordinates stay in full resolution pixels. The render itself runs
+        on the render worker; only the latest request is shown. Until it arrives
+        the layers shown before are kept as outdated fallbacks.
+        """
         if self.source_image is None:
-            return
+            return False
 
-        source = display_image if display_image is not None else self.source_image
-        if not source.isNull():
-            if self.is_image_filtered:
-                logger.info(f"Applying display filter: {self.current_filter.name}")
-                source = self.current_filter.apply(source)
-                source = FilterType.pil_to_qimage(source)
-            if self.is_image_adjusted:
-                source = self.create_adjustments_image(source)
-            pixmap = QPixmap.fromImage(source)
-            self.image_item.setPixmap(pixmap)
-            self.image_item.setTransformationMode(Qt.SmoothTransformation)
-            self.scene.setSceneRect(self.image_item.boundingRect())
-            self.image_updated.emit(source)
-            self.save_current_state()
+        level, window, cache_key = 0, None, None
+        if display_image is not None:
+            source, scale_x, scale_y = display_image, 1.0, 1.0
         else:
+            level = self.preview_level
+            source = self.pyramid.level(level)
+            scale_x, scale_y = self.pyramid.level_scale(level)
+        if source.isNull():
             logger.error("Cannot update display: Source image is null")
+            return False
+
+        self.image_item.invalidate()
+        filter_type, adjustments = self._render_parameters()
+        if filter_type is None and not adjustments:
+            # The item cuts tiles from the level as they are painted, however large it is
+            self.render_worker.cancel()
+            self.display_window = None
+            self._show_rendered((source, level, scale_x, scale_y, (0, 0)))
+        else:
+            if display_image is None:
+                window = self._visible_window(level)
+                cache_key = (self.document.version, level, window)
+            self.display_window = (level,) + window if window is not None else None
+            self.render_worker.submit(_render_job, source, filter_type, adjustments, self.pipeline,
+                                      scale_x, scale_y, cache_key, self.document.filtered_cache, window, level)
+        return True
+
+    def _show_rendered(self, result: tuple):
+        """Display a finished render, delivered by the render worker on the GUI thread."""
+        if self.document is None:
+            # The screen was reset after the render was requested
+            return
+        image, level, scale_x, scale_y, origin = result
+        # A windowed render covers part of the image, the item always spans all of it
+        self.image_item.set_image_size(self.document.width, self.document.height)
+        self.image_item.set_layer(level, image, scale_x, scale_y, origin)
+        self.scene.setSceneRect(self.image_item.sceneBoundingRect())
+        self.image_updated.emit(image)
+
+    def _visible_window(self, level: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Returns the part of a pyramid level to render, or None to render all of it.
+
+        Levels up to ``MAX_DISPLAY_PIXELS`` are rendered whole. Larger ones, which
+        only happens when zoomed in on a very large image, are rendered over the
+        visible area plus half a viewport on each side, aligned to
+        ``WINDOW_ALIGNMENT`` and to the blocks of the filter.
+
+        Returns:
+            tuple: (x, y, width, height) in level pixels, or None.
+        """
+        image = self.pyramid.level(level)
+        width, height = image.width(), image.height()
+        if width * height <= MAX_DISPLAY_PIXELS:
+            return None
+        scale_x, scale_y = self.pyramid.level_scale(level)
+        visible = self.mapToScene(self.viewport().rect()).boundingRect()
+        visible.adjust(-visible.width() / 2, -visible.height() / 2, visible.width() / 2, visible.height() / 2)
+        filter_type = self.current_filter
+        step = math.lcm(WINDOW_ALIGNMENT, filter_type.alignment(1 / scale_x) if filter_type is not None else 1)
+        left = max(0, math.floor(visible.left() / scale_x) // step * step)
+        top = max(0, math.floor(visible.top() / scale_y) // step * step)
+        right = min(width, -(-math.ceil(visible.right() / scale_x) // step) * step)
+        bottom = min(height, -(-math.ceil(visible.bottom() / scale_y) // step) * step)
+        if right <= left or bottom <= top:
+            return 0, 0, min(width, step), min(height, step)
+        return left, top, right - left, bottom - top
+
+    def _update_display_window(self):
+        """Re-render a windowed display once the view leaves the rendered window."""
+        if self.display_window is None or self.document is None:
+            return
+        level, x, y, width, height = self.display_window
+        scale_x, scale_y = self.pyramid.level_scale(level)
+        rendered = QRectF(x * scale_x, y * scale_y, width * scale_x, height * scale_y)
+        visible = self.mapToScene(self.viewport().rect()).boundingRect() & self.sceneRect()
+        if not rendered.contains(visible):
+            self._render_display()
+
+    def _render_parameters(self) -> tuple:
+        """Snapshot the filter and active adjustments for a render."""
+        return self.document.render_parameters()
+
+    def render_full_resolution(self) -> Union[QImage, None]:
+        """Render the source at full resolution, e.g. for export."""
+        if self.source_image is None:
+            return None
+        filter_type, adjustments = self._render_parameters()
+        if is_mapped(self.document.source):
+            # Too large for whole image temporaries, stream it through in strips
+            return numpy_to_qimage(render_strips(self.document.source, filter_type, adjustments, self.pipeline))
+        return render_image(self.source_image, filter_type, adjustments, self.pipeline,
+                            cache_key=(self.document.version, 0), filter_cache=self.document.filtered_cache)
+
+    def export_orientation(self) -> Orientation:
+        """The rotation and mirroring the view applies to the image, see ``core.export.Orientation``."""
+        transform = self.transform()
+        return orientation_from_matrix(transform.m11(), transform.m12(), transform.m21(), transform.m22())
+
+    def export(self, file_path: Union[str, Path], params: Sequence[int] = ()) -> bool:
+        """
+        Export the document at full resolution, in the background.
+
+        The source is re-rendered through the filter and adjustments, cropped to
+        the crop rectangle and turned like the view, strip by strip, then encoded
+        to ``file_path``. Progress is reported by ``export_progress`` and the
+        outcome by ``exported`` with the path, or ``export_failed``.
+
+        Args:
+            file_path: Destination, its extension picks the format.
+            params: OpenCV ``IMWRITE_*`` flag and value pairs for the encoder.
+
+        Returns:
+            bool: Whether the export was started.
+        """
+        if self.document is None:
+            return False
+        try:
+            orientation = self.export_orientation()
+        except ValueError as e:
+            self.export_failed.emit(str(e))
+            return False
+        filter_type, adjustments = self._render_parameters()
+        pipeline = self.pipeline
+        halo = (filter_type.halo() if filter_type is not None else 0) + pipeline.halo(adjustments)
+        alignment = filter_type.alignment() if filter_type is not None else 1
+        full_rows = filter_type is not None and filter_type.needs_full_rows
+        crop_rect = self.get_crop_rect()
+        crop = (crop_rect.x(), crop_rect.y(), crop_rect.width(), crop_rect.height()) if crop_rect else None
+        self.exporter.export(export_image, self.document.source, Path(file_path),
+                             lambda strip, region: render_array(strip, filter_type, adjustments, pipeline, region=region),
+                             halo, alignment, full_rows, crop, orientation, params)
+        return True
+
+    def _view_scale(self) -> float:
+        """Device pixels covered by one source pixel at the current view transform."""
+        transform = self.transform()
+        return math.hypot(transform.m11(), transform.m12()) * self.devicePixelRatioF()
+
+    def _preview_level_for_view(self) -> int:
+        """
+        The pyramid level to display at the current view transform.
+
+        Filters that need whole rows cannot be rendered in a window, so for them
+        levels too large to render whole are skipped in favour of a smaller one.
+        """
+        level = self.pyramid.level_for_scale(self._view_scale())
+        filter_type = self.current_filter
+        if filter_type is not None and filter_type.needs_full_rows:
+            while level + 1 < self.pyramid.level_count:
+                image = self.pyramid.level(level)
+                if image.width() * image.height() <= MAX_DISPLAY_PIXELS:
+                    break
+                level += 1
+        return level
+
+    def _update_preview_level(self):
+        """Switch to the pyramid level matching the view, re-rendering if it changed."""
+        if self.pyramid is None:
+            return
+        level = self._preview_level_for_view()
+        if level != self.preview_level:
+            logger.debug(f"Preview level changed: {self.preview_level} -> {level}")
+            self.preview_level = level
+            self._render_display()
+        else:
+            self._update_display_window()
 
     def get_source_image(self) -> Union[QImage, None]:
         """Return the source image."""
         return self.source_image
 
     def get_current_image(self) -> Union[QImage, None]:
-        """Return the current image from the pixmap item."""
-        pixmap = self.image_item.pixmap()
-        return pixmap.toImage() if not pixmap.isNull() else None
+        """Return the image most recently shown by the image item."""
+        return self.image_item.image()
 
     def apply_filter(self, filter_type: FilterType):
         """
@@ -215,59 +556,28 @@ class ImageScreen(QGraphicsView):
         Args:
             filter_type: A enum of filter type.
         """
-        if self.source_image.isNull():
+        if self.document is None:
             return  # Skip if no image is loaded
 
         try:
             logger.info(f"Applying filter: {filter_type.name}")
             if filter_type.name == "ORIGINAL":
-                self.is_image_filtered = False
-                self.current_filter = None
+                self.document.filter = None
                 logger.info("Resetting to original image")
-                self.update_source_image(self.source_image)
             else:
-                self.is_image_filtered = True
-                self.current_filter = filter_type
-                filter_image = filter_type.apply(self.source_image)
-                filter_qimage = FilterType.pil_to_qimage(filter_image)
-                self._update_display_image(filter_qimage)
+                self.document.filter = filter_type
+            self.preview_level = self._preview_level_for_view()
+            self._update_display_image()
         except Exception as e:
             logger.exception("Error applying filter: %s", e)
 
 
     def apply_adjustments(self):
         """
-        Checks all adjustments and applies the associated function if current value differs from default.
+        Re-render the image with the adjustments whose current value differs from the default.
         Assumes self.adjustments is the dictionary containing adjustment settings.
         """
-        adjusted_image = self.create_adjustments_image(self.source_image)
-        if adjusted_image:
-            self._update_display_image(adjusted_image)
-
-    def create_adjustments_image(self, image: QImage):
-        adjusted_image = convert_qimage_to_pil(image)
-        apply = list()
-        for key, settings in self.adjustments.items():
-            default_value = settings["default"]
-            current_value = settings["current"]
-            adjustment_function = settings["function"]
-
-            if current_value != default_value:
-                try:
-                    # Apply the adjustment function with the current value
-                    apply.append(key)
-                    adjusted_image = adjustment_function(adjusted_image, current_value)
-                except Exception as e:
-                    print(f"Error applying {key} adjustment: {str(e)}")
-
-        if adjusted_image:
-            if len(apply) > 0:
-                self.is_image_adjusted = True
-            logger.info(f"Applied adjustments: {apply}")
-            return convert_pil_to_qimage(adjusted_image)
-        else:
-
-            logger.info("No adjustments to apply")
+        self._update_display_image()
 
     def set_red(self, red: int):
         if self.source_image is None:
@@ -431,9 +741,9 @@ class ImageScreen(QGraphicsView):
 
     def reset_adjustments(self):
         """Reset all adjustments to their default values."""
-        for key, settings in self.adjustments.items():
-            settings["current"] = settings["default"]
-        self.is_image_adjusted = False
+        if self.document is None:
+            return
+        self.document.reset_adjustments()
         self._update_display_image()
         logger.info("Adjustments reset to default values.")
 
@@ -449,23 +759,25 @@ class ImageScreen(QGraphicsView):
 
     def zoom_in(self):
         """Increase zoom level."""
-        if self.zoom_factor < self.MAX_ZOOM and  not self.image_item.pixmap().isNull():
+        if self.zoom_factor < self.MAX_ZOOM and  self.image_item.has_image():
             self.zoom_factor = min(self.MAX_ZOOM, self.zoom_factor * 1.1)
             self.scale(1.1, 1.1)
             self.zoom_value.emit(self.zoom_factor * 100)
+            self._update_preview_level()
             # image_size = self.image_item.pixmap().size()
             # logger.info(f"Image size: {image_size * self.zoom_factor}")
 
     def zoom_out(self):
         """Decrease zoom level."""
-        if self.zoom_factor > self.MIN_ZOOM and  not self.image_item.pixmap().isNull():
+        if self.zoom_factor > self.MIN_ZOOM and  self.image_item.has_image():
             self.zoom_factor = max(self.MIN_ZOOM, self.zoom_factor * 0.9)
             self.scale(0.9, 0.9)
             self.zoom_value.emit(self.zoom_factor * 100)
+            self._update_preview_level()
 
     def rotate_flip(self, angle):
         """Rotate the scene by the given angle."""
-        self.rotate_angle = angle
+        self.rotate_angle = (self.rotate_angle + angle) % 360
         self.rotate(angle)
 
     def get_rotation_angle(self):
@@ -487,10 +799,7 @@ class ImageScreen(QGraphicsView):
 
     def save_current_state(self):
         state = {
-            "filter": self.current_filter,
-            "adjustments": self.adjustments,
-            "is_image_filtered": self.is_image_filtered,
-            "is_image_adjusted": self.is_image_adjusted,
+            "document": self.document.snapshot(),
             "zoom_factor": self.zoom_factor
         }
         self.history.append(state)
@@ -500,11 +809,9 @@ class ImageScreen(QGraphicsView):
         if len(self.history) > 1:
             self.history.pop()  # Remove the current state
             previous_state = self.history.pop()  # Get the previous state
-            self.current_filter = previous_state["filter"]
-            self.adjustments = previous_state["adjustments"]
-            self.is_image_filtered = previous_state["is_image_filtered"]
-            self.is_image_adjusted = previous_state["is_image_adjusted"]
+            self.document.restore(previous_state["document"])
             self.zoom_factor = previous_state["zoom_factor"]
+            self.preview_level = self._preview_level_for_view()
             self._update_display_image()
             logger.info("Undo performed")
 
@@ -525,7 +832,7 @@ class ImageScreen(QGraphicsView):
                 if self.crop_rect_overlay:
                     self.scene.removeItem(self.crop_rect_overlay)
 
-                self.crop_rect_overlay = CropOverlay(self.sceneRect(), self.image_item.sceneBoundingRect())
+                self.crop_rect_overlay = CropOverlay(self.sceneRect(), self.sceneRect())
                 self.crop_rect_item = QGraphicsRectItem()
                 self.crop_rect_item.setPen(QPen(Qt.GlobalColor.red, 2, Qt.DashLine))
                 self.crop_rect_item.setBrush(QColor(0, 0, 0, 10))
@@ -587,34 +894,36 @@ class ImageScreen(QGraphicsView):
     #
 
     def reset_screen_state(self):
-        self.reset_adjustments()
+        self.loader.cancel()
+        if self.document is not None:
+            # Reset without rendering, the document is dropped below
+            self.document.reset_adjustments()
         self.reset_transformation()
         self.set_cropping(False)
         self.scene.removeItem(self.crop_rect_item)
         self.scene.removeItem(self.crop_rect_overlay)
-        self.image_item.setPixmap(QPixmap())
+        self.image_item.clear()
+        self.image_item.set_image_size(0, 0)
         self.rotate_angle = 0
         self.orientation = None
-        self.is_image_filtered = False
-        self.is_image_adjusted = False
-        self.current_filter = None
         self.crop_rect_item = None
         self.crop_rect_overlay = None
         self.history = []
-        self.source_image = None
-        self.image_path  = None
+        self.document = None
+        self.preview_level = 0
+        self.display_window = None
         self.move_offset = None
         self.dragging = False
         self.moving = False
         self.zoom_factor= 1.0
         self.zoom_value.emit(self.zoom_factor * 100)
+        # Last, so no render of the previous image submitted above is shown
+        self.render_worker.cancel()
 
     def screen_overlay(self):
-        pixmap = self.image_item.pixmap()
-        if pixmap.isNull():
+        if self.source_image is None:
             return
-        pixmap_size = pixmap.size()
-        return pixmap_size * self.zoom_factor
+        return self.source_image.size() * self.zoom_factor
 
     def resizeEvent(self, event, /):
         super().resizeEvent(event)
@@ -623,14 +932,24 @@ class ImageScreen(QGraphicsView):
         # self.size_overlay.move()
 
     def get_image(self):
-        pixmap = self.image_item.pixmap()
-        if pixmap.isNull():
+        image = self.image_item.image()
+        if image is None or self.document is None:
             return None
-        return pixmap
+        filter_type = self.current_filter
+        if (self.preview_level == 0 and self.display_window is None and not self.render_worker.is_busy()
+                and not (filter_type and filter_type.has_fast_mode)):
+            return QPixmap.fromImage(image)
+        # The display holds a reduced, approximate or outdated preview, render the source at full resolution instead
+        return QPixmap.fromImage(self.render_full_resolution())
 
     def get_image_path(self):
         return self.image_path
 
+    def set_image_path(self, file_path: Union[str, Path]):
+        """Attach the document to another file, e.g. after saving it there."""
+        if self.document is not None:
+            self.document.path = Path(file_path)
+
 if __name__ == "__main__":
     import sys
     from PySide6.QtWidgets import QApplication
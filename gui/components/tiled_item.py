@@ -0,0 +1,206 @@
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QRect, QRectF, Qt
+from PySide6.QtGui import QImage, QPainter, QPixmap, QRegion
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+
+from utils.lru_cache import LRUCache
+
+# Side of a pixmap tile, in pixels of the level it is cut from.
+TILE_SIZE = 256
+# Default limit on the pixmap tiles kept for painting, about 500 full tiles.
+DEFAULT_TILE_CACHE_BYTES = 128 * 1024 * 1024
+# Layers kept for painting, counting the one of each level most recently shown.
+MAX_LAYERS = 4
+
+_layer_ids = itertools.count()
+
+
+def _pixmap_bytes(tile: tuple) -> int:
+    pixmap = tile[0]
+    return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+class _Layer:
+    """A rendered image of one pyramid level, placed in full resolution coordinates."""
+
+    def __init__(self, level: int, image: QImage, scale_x: float, scale_y: float, origin: Tuple[int, int]):
+        self.id = next(_layer_ids)
+        self.level = level
+        self.image = image
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.x, self.y = origin
+        self.stale = False
+        self.columns = -(-image.width() // TILE_SIZE)
+        self.rows = -(-image.height() // TILE_SIZE)
+        self.rect = QRectF(self.x * scale_x, self.y * scale_y, image.width() * scale_x, image.height() * scale_y)
+
+
+class TiledImageItem(QGraphicsItem):
+    """
+    Graphics item painting an image from 256x256 pixmap tiles of its pyramid levels.
+
+    Each level shown is kept as a layer: the rendered image of that level, or of
+    a window of it, with the scale mapping it onto full resolution coordinates.
+    Painting picks the layer whose resolution fits the view transform and draws
+    only the tiles intersecting the exposed area, so a repaint costs a few tiles
+    at screen resolution whatever the size of the image. Tiles are converted to
+    pixmaps the first time they are painted and kept in an LRU cache.
+
+    Layers marked stale by ``invalidate`` are only painted where no current layer
+    covers the view, e.g. a coarser level while the next level is being rendered.
+    """
+
+    def __init__(self, tile_cache_bytes: int = DEFAULT_TILE_CACHE_BYTES, parent=None):
+        """
+        Initialize the item.
+
+        Args:
+            tile_cache_bytes (int): Maximum total size of the cached pixmap tiles.
+            parent: Parent item.
+        """
+        super().__init__(parent)
+        self._width = 0
+        self._height = 0
+        self._layers: Dict[int, _Layer] = {}
+        self._latest: Optional[_Layer] = None
+        self.tiles = LRUCache(tile_cache_bytes, size_of=_pixmap_bytes)
+        # Paint is called with the exposed area in option.exposedRect
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self._width, self._height)
+
+    def has_image(self) -> bool:
+        return self._latest is not None
+
+    def image(self) -> Optional[QImage]:
+        """The image most recently set with ``set_layer``, None if there is none."""
+        return self._latest.image if self._latest is not None else None
+
+    def set_image_size(self, width: int, height: int):
+        """
+        Set the full resolution size the layers are placed in.
+        Changing it drops all layers, as they no longer line up with the image.
+        """
+        if (width, height) == (self._width, self._height):
+            return
+        self.clear()
+        self.prepareGeometryChange()
+        self._width, self._height = width, height
+
+    def set_layer(self, level: int, image: QImage, scale_x: float = 1.0, scale_y: float = 1.0,
+                  origin: Tuple[int, int] = (0, 0)):
+        """
+        Show a rendered level, replacing the previous layer of that level.
+
+        Args:
+            level (int): Pyramid level of the image.
+            image (QImage): The rendered level, or a window of it.
+            scale_x (float): Full resolution pixels per level pixel, horizontally.
+            scale_y (float): Full resolution pixels per level pixel, vertically.
+            origin (tuple): (x, y) of the image in the level, for windows.
+        """
+        self._drop_layer(level)
+        layer = _Layer(level, image, scale_x, scale_y, origin)
+        self._layers[level] = layer
+        self._latest = layer
+        while len(self._layers) > MAX_LAYERS:
+            oldest = min(self._layers.values(), key=lambda other: (not other.stale, other.id))
+            self._drop_layer(oldest.level)
+        self.update()
+
+    def invalidate(self):
+        """Mark the layers shown so far as outdated, e.g. because the edits changed."""
+        for layer in self._layers.values():
+            layer.stale = True
+
+    def clear(self):
+        """Drop all layers and their tiles."""
+        self._layers.clear()
+        self._latest = None
+        self.tiles.clear()
+        self.update()
+
+    def _drop_layer(self, level: int):
+        layer = self._layers.pop(level, None)
+        if layer is not None:
+            self.tiles.discard(lambda key: key[0] == layer.id)
+
+    def _layers_for_scale(self, device_scale: float) -> List[_Layer]:
+        """
+        Orders the layers by how well they suit the view.
+
+        Current layers come before stale ones. Among them, layers with at least
+        one pixel per device pixel come first, smallest first, like
+        ``ImagePyramid.level_for_scale``, then the others, largest first.
+        """
+        def preference(layer: _Layer):
+            sufficient = layer.scale_x * device_scale <= 1.0001
+            return layer.stale, not sufficient, -layer.scale_x if sufficient else layer.scale_x
+        return sorted(self._layers.values(), key=preference)
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        if not self._layers:
+            return
+        exposed = option.exposedRect & self.boundingRect()
+        if exposed.isEmpty():
+            return
+        device_scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if widget is not None:
+            device_scale *= widget.devicePixelRatioF()
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        # Antialiased edges would leave hairline seams between the tiles
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        exposed_region = QRegion(exposed.toAlignedRect())
+        remaining = QRegion(exposed_region)
+        for layer in self._layers_for_scale(device_scale):
+            covered = remaining.intersected(layer.rect.toRect())
+            if covered.isEmpty():
+                continue
+            if covered == exposed_region:
+                # The best layer covers everything exposed, no clipping needed
+                self._paint_tiles(painter, layer, exposed)
+                return
+            painter.save()
+            painter.setClipRegion(covered, Qt.IntersectClip)
+            self._paint_tiles(painter, layer, QRectF(covered.boundingRect()))
+            painter.restore()
+            remaining -= covered
+            if remaining.isEmpty():
+                return
+
+    def _paint_tiles(self, painter: QPainter, layer: _Layer, rect: QRectF):
+        """Draw the tiles of a layer intersecting a rectangle in full resolution coordinates."""
+        first_column = max(0, int((rect.left() / layer.scale_x - layer.x) // TILE_SIZE))
+        last_column = min(layer.columns - 1, int((rect.right() / layer.scale_x - layer.x) // TILE_SIZE))
+        first_row = max(0, int((rect.top() / layer.scale_y - layer.y) // TILE_SIZE))
+        last_row = min(layer.rows - 1, int((rect.bottom() / layer.scale_y - layer.y) // TILE_SIZE))
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                pixmap, source = self._tile(layer, column, row)
+                x, y = layer.x + column * TILE_SIZE, layer.y + row * TILE_SIZE
+                target = QRectF(x * layer.scale_x, y * layer.scale_y,
+                                source.width() * layer.scale_x, source.height() * layer.scale_y)
+                painter.drawPixmap(target, pixmap, source)
+
+    def _tile(self, layer: _Layer, column: int, row: int) -> Tuple[QPixmap, QRectF]:
+        """
+        Returns the pixmap of a tile and the part of it to draw.
+
+        Tiles are cut with a one pixel margin of their neighbours, so smooth
+        scaling blends across tile edges instead of clamping at them.
+        """
+        key = (layer.id, column, row)
+        tile = self.tiles.get(key)
+        if tile is None:
+            x, y = column * TILE_SIZE, row * TILE_SIZE
+            cut = QRect(x - 1, y - 1, TILE_SIZE + 2, TILE_SIZE + 2) & layer.image.rect()
+            source = QRectF(x - cut.x(), y - cut.y(),
+                            min(TILE_SIZE, layer.image.width() - x), min(TILE_SIZE, layer.image.height() - y))
+            tile = QPixmap.fromImage(layer.image.copy(cut)), source
+            self.tiles.put(key, tile)
+        return tile
@@ -5,12 +5,15 @@ from PySide6.QtGui import QPixmap, QImage, QWheelEvent
 from PySide6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QSlider, QFileDialog, QMessageBox
 from qfluentwidgets import (setTheme, Theme, FluentWindow, ScrollArea, ImageLabel, TransparentToolButton, FluentIcon,
                             BodyLabel, TransparentPushButton, VerticalSeparator, PushButton, TitleLabel,
-                            FluentIconBase, StrongBodyLabel, PrimaryDropDownPushButton)
+                            FluentIconBase, StrongBodyLabel, PrimaryDropDownPushButton, ProgressBar)
 from pathlib import Path
+from typing import Optional
 from loguru import logger
 
 from core.basic_operations import flip_qimage, rotate_qimage, rotate_image
 from core.convert import convert_qimage_to_pil
+from core.export import SaveOptions, image_format
+from gui.common.dialogs import SaveOptionsDialog
 from gui.common.myFrame import HorizontalFrame, VerticalFrame
 from gui.components.crop import CropWidget
 from gui.components.filter import FilterWindow
@@ -36,6 +39,10 @@ class MainWindow(FluentWindow):
         self.adjustment = AdjustmentWindow(self)
         self.draw_widget = DrawWidget(self)
         self.crop_widget = CropWidget(self)
+        self.progress_bar = ProgressBar(self)
+        self.save_options = SaveOptions()
+        # (mode, document) of the save in progress
+        self.saving = None
         self.init_ui()
         self.navigationInterface.hide()
         self._signal_handler()
@@ -53,6 +60,8 @@ class MainWindow(FluentWindow):
         h_container.addWidget(self.adjustment, stretch=3)
 
         main_container.addWidget(self.options, alignment=Qt.AlignmentFlag.AlignTop)
+        main_container.addWidget(self.progress_bar)
+        self.progress_bar.hide()
         main_container.addWidget(h_container, stretch=1)
 
         self.stackedWidget.addWidget(main_container)
@@ -63,6 +72,11 @@ class MainWindow(FluentWindow):
         self.display.image_changed.connect(self.filters.set_image)
         self.display.image_updated.connect(self.on_image_changed)
         self.display.zoom_value.connect(self.options.set_zoom_label)
+        self.display.load_progress.connect(self.on_progress)
+        self.display.load_failed.connect(self.on_load_failed)
+        self.display.export_progress.connect(self.on_progress)
+        self.display.exported.connect(self.on_exported)
+        self.display.export_failed.connect(self.on_export_failed)
         self._option_signal_handler()
         self._adjustment_signal_handler()
         self._crop_widget_signal_handler()
@@ -92,16 +106,12 @@ class MainWindow(FluentWindow):
     from PySide6.QtWidgets import QFileDialog, QMessageBox
 
     def save_image(self, mode: str = "save_copy"):
-        image = self.display.get_image()
         file_path = None
-        if image is None:
+        if self.display.get_source_image() is None:
             logger.warning("No image to save.")
-            self.info_bar.error_msg("No image to save.")
+            self.info_bar.error_msg("Failed to Save", "No image to save.")
             return
-        crop_rect = self.display.get_crop_rect()
-        if crop_rect:
-            image = image.copy(crop_rect)
-        logger.info(f"Saving image, mode: {mode}, size: {image.size()}")
+        logger.info(f"Saving image, mode: {mode}")
 
 
         if mode == "save":
@@ -114,7 +124,7 @@ class MainWindow(FluentWindow):
 
         elif mode == "save_as":
             file_path, _ = QFileDialog.getSaveFileName(self, "Save Image Copy", "",
-            "Images (*.png *.jpg *.jpeg *.bmp *.tiff)")
+            "Images (*.png *.jpg *.jpeg *.webp *.bmp *.tif *.tiff)")
 
         elif mode == "save_copy":
             image_path =  self.display.get_image_path()
@@ -122,28 +132,54 @@ class MainWindow(FluentWindow):
             if image_path:
                 file_name = Path(image_path).name
             file_path, _ = QFileDialog.getSaveFileName(self, "Save Image Copy", file_name,
-            "Images (*.png *.jpg *.jpeg *.bmp *.tiff)")
+            "Images (*.png *.jpg *.jpeg *.webp *.bmp *.tif *.tiff)")
 
         else:
             logger.warning(f"Unknown save mode: {mode}")
             self.info_bar.error_msg("Save Error", f"Unknown save mode: {mode}")
 
         if  file_path:
-            if self.save_file(image, file_path):
-                self.display.reset_screen_state()
-                self.display.load_image(file_path)
+            if image_format(file_path) is None:
+                self.info_bar.error_msg("Failed to Save", f"Unsupported image format: {Path(file_path).suffix}")
+                return
+            options = self.save_options
+            if mode != "save":
+                options = self.ask_save_options(file_path)
+                if options is None:
+                    logger.warning("Save operation cancelled by user.")
+                    self.info_bar.error_msg("Save Cancelled", "Save operation cancelled by user.")
+                    return
+                self.save_options = options
+            # Rendered from the full resolution source with every edit and encoded in the background
+            if self.display.export(file_path, options.params(file_path)):
+                self.saving = (mode, self.display.document)
+                self.on_progress(0)
         else :
             logger.warning("Save operation cancelled by user.")
             self.info_bar.error_msg("Save Cancelled", "Save operation cancelled by user.")
 
-    def save_file(self, image: QPixmap, file_path):
-        if not image.save(file_path):
-            self.info_bar.error_msg(self, "Save Copy Error", f"Failed to save copy to {file_path}")
-            return False
-        else:
-            logger.info(f"Image copy saved to {file_path}")
-            self.info_bar.success_msg( "Save Copy Success", f"Image copy saved to {file_path}")
-            return True
+    def ask_save_options(self, file_path) -> Optional[SaveOptions]:
+        """Ask for the encoder settings of the file's format. Returns None if the dialog is cancelled."""
+        format_name = image_format(file_path)
+        if not SaveOptionsDialog.has_options(format_name):
+            return self.save_options
+        dialog = SaveOptionsDialog(self.save_options, format_name, self)
+        return dialog.selected_options() if dialog.exec() else None
+
+    def on_exported(self, file_path: Path):
+        self.progress_bar.hide()
+        logger.info(f"Image saved to {file_path}")
+        self.info_bar.success_msg("Save Success", f"Image saved to {file_path}")
+        mode, document = self.saving
+        self.saving = None
+        # The edits stay live on the document in memory, it now belongs to the saved file unless that is a copy
+        if mode != "save_copy" and document is self.display.document:
+            self.display.set_image_path(file_path)
+
+    def on_export_failed(self, message: str):
+        self.progress_bar.hide()
+        self.saving = None
+        self.info_bar.error_msg("Failed to Save", message)
 
     def _adjustment_signal_handler(self):
         # self.adjustment.reset_signal.connect(self.display.reset_adjustment)
@@ -186,6 +222,14 @@ class MainWindow(FluentWindow):
         # logger.info(f"Image pushed to stack: {image.size()}")
         # self.image_stack.push(image)
 
+    def on_progress(self, percent: int):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setVisible(percent < 100)
+
+    def on_load_failed(self, message: str):
+        self.progress_bar.hide()
+        self.info_bar.error_msg("Failed to Load", message)
+
     def undo(self):
         self.display.undo()
 
@@ -204,7 +248,7 @@ class MainWindow(FluentWindow):
 
     def rotate_image(self, angle):
         logger.info(f"Rotate at ange: {angle}")
-        self.display.rotate(angle)
+        self.display.rotate_flip(angle)
         # image = self.display.get_source_image()
         # if image is None:
         #     return
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import kernels
+
+FILTERS = ["CONTOUR", "DETAIL", "EDGE_ENHANCE", "EDGE_ENHANCE_MORE", "EMBOSS", "FIND_EDGES", "SMOOTH", "SMOOTH_MORE"]
+# PIL rounds the float sums of some kernels differently, never by more than this.
+MAX_DIFFERENCE = 1
+SHAPES = {"L": (157, 203), "RGB": (157, 203, 3), "RGBA": (157, 203, 4)}
+
+
+def sample(mode: str) -> np.ndarray:
+    """A noisy gradient, so the kernels see both flat areas and edges."""
+    rng = np.random.default_rng(0)
+    height, width = SHAPES[mode][:2]
+    gradient = np.add.outer(np.linspace(0, 180, height), np.linspace(0, 60, width))
+    if len(SHAPES[mode]) == 3:
+        gradient = gradient[:, :, np.newaxis]
+    noisy = gradient + rng.normal(0, 25, SHAPES[mode])
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("mode", list(SHAPES))
+@pytest.mark.parametrize("name", FILTERS)
+@pytest.mark.parametrize("tile_rows", [kernels.DEFAULT_TILE_ROWS, 16, 7, 1])
+def test_matches_pil(name: str, mode: str, tile_rows: int):
+    array = sample(mode)
+    expected = np.asarray(Image.fromarray(array, mode).filter(getattr(ImageFilter, name)), dtype=np.int16)
+    result = getattr(kernels, name).apply(array, tile_rows=tile_rows)
+    assert result.shape == array.shape and result.dtype == np.uint8
+    assert np.abs(expected - result).max() <= MAX_DIFFERENCE
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_tiles_match_whole_image(name: str):
+    array = sample("RGB")
+    kernel = getattr(kernels, name)
+    whole = kernel.apply(array, tile_rows=array.shape[0])
+    for tile_rows in (64, 16, 5, 1):
+        np.testing.assert_array_equal(kernel.apply(array, tile_rows=tile_rows), whole)
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_small_images_are_copied(name: str):
+    kernel = getattr(kernels, name)
+    array = sample("RGB")[:2 * kernel.radius, :2 * kernel.radius]
+    result = kernel.apply(array)
+    np.testing.assert_array_equal(result, array)
+    assert result is not array
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.loader import decode_full
+
+GRADIENT = np.tile(np.linspace(0, 65535, 256).round().astype(np.uint16), (16, 1))
+
+
+def test_16_bit_png_keeps_its_detail(tmp_path: Path):
+    path = tmp_path / "gradient.png"
+    Image.fromarray(GRADIENT).save(path)
+    assert Image.open(path).mode.startswith("I")
+
+    array = decode_full(path)
+    assert array.shape == GRADIENT.shape and array.dtype == np.uint8
+    np.testing.assert_array_equal(array, GRADIENT >> 8)
+
+
+@pytest.mark.parametrize("values", [GRADIENT.astype(np.int32), GRADIENT / np.float32(65535)])
+def test_32_bit_tiff_is_scaled(tmp_path: Path, values: np.ndarray):
+    path = tmp_path / "gradient.tif"
+    Image.fromarray(values.astype(np.float32) if values.dtype.kind == "f" else values).save(path)
+
+    array = decode_full(path)
+    assert array.dtype == np.uint8
+    # The whole range is kept, rather than clipped to white
+    assert array.min() == 0 and array.max() == 255
+    assert len(np.unique(array)) > 200
@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import adjustment
+from core.pipeline import AdjustmentPipeline
+
+logger.remove()
+
+# Every adjustment with a value that changes the image, and the function the pipeline must match.
+ADJUSTMENTS = {
+    "red": (12, adjustment.adjust_red),
+    "green": (-9, adjustment.adjust_green),
+    "blue": (7, adjustment.adjust_blue),
+    "temperature": (15, adjustment.adjust_temperature),
+    "brightness": (1.2, adjustment.adjust_brightness),
+    "contrast": (1.3, adjustment.adjust_contrast),
+    "hue": (25, adjustment.adjust_hue),
+    "saturation": (1.4, adjustment.adjust_saturation),
+    "sharpness": (2.0, adjustment.adjust_sharpness),
+    "exposure": (0.9, adjustment.adjust_exposure),
+    "gamma": (1.1, adjustment.adjust_gamma),
+    "vignette": (0.5, adjustment.adjust_vignette),
+    "blur": (2.5, adjustment.adjust_blur),
+    "noise": (10, adjustment.adjust_noise),
+    "shadows": (0.1, adjustment.adjust_shadows),
+    "highlights": (0.2, adjustment.adjust_highlight),
+}
+SHAPES = {"L": (96, 128), "RGB": (96, 128, 3), "RGBA": (96, 128, 4)}
+# The fused hue/saturation stage rounds once for both adjustments.
+FUSED_TOLERANCE = 3
+
+
+def sample(mode: str) -> Image.Image:
+    return Image.fromarray(np.random.default_rng(0).integers(0, 256, SHAPES[mode], dtype=np.uint8), mode)
+
+
+def run_chain(image: Image.Image, names) -> np.ndarray:
+    for name in names:
+        value, function = ADJUSTMENTS[name]
+        image = function(image, value)
+    return np.asarray(image)
+
+
+def run_pipeline(pipeline: AdjustmentPipeline, image, names, **kwargs) -> np.ndarray:
+    return np.asarray(pipeline.apply(image, [(name, ADJUSTMENTS[name][0]) for name in names], **kwargs))
+
+
+@pytest.mark.parametrize("mode", list(SHAPES))
+@pytest.mark.parametrize("name", list(ADJUSTMENTS))
+def test_each_adjustment_matches_its_function(name: str, mode: str):
+    image = sample(mode)
+    np.testing.assert_array_equal(run_pipeline(AdjustmentPipeline(0), image, [name]), run_chain(image, [name]))
+
+
+@pytest.mark.parametrize("mode", list(SHAPES))
+def test_chain_matches_functions(mode: str):
+    # Point adjustments compiled into lookup tables, around the float stages
+    names = ["temperature", "brightness", "contrast", "sharpness", "exposure", "shadows", "vignette",
+             "highlights", "gamma", "blur", "red", "noise"]
+    image = sample(mode)
+    np.testing.assert_array_equal(run_pipeline(AdjustmentPipeline(0), image, names), run_chain(image, names))
+
+
+def test_fused_hue_saturation_within_rounding():
+    image = sample("RGB")
+    expected = run_chain(image, ["hue", "saturation"]).astype(np.int16)
+    result = run_pipeline(AdjustmentPipeline(0), image, ["hue", "saturation"])
+    assert np.abs(expected - result).max() <= FUSED_TOLERANCE
+
+
+def test_cached_prefixes_give_the_same_result():
+    image = np.asarray(sample("RGB"))
+    names = ["brightness", "sharpness", "contrast", "vignette", "noise"]
+    pipeline = AdjustmentPipeline()
+    run_pipeline(pipeline, image, names, cache_key="source")
+    # Changing the last value resumes from the cached prefix
+    changed = [(name, ADJUSTMENTS[name][0]) for name in names[:-1]] + [("noise", 20)]
+    cached = pipeline.apply(image, changed, cache_key="source")
+    np.testing.assert_array_equal(cached, AdjustmentPipeline(0).apply(image, changed))
+
+
+def test_input_is_not_modified():
+    image = np.asarray(sample("RGB")).copy()
+    original = image.copy()
+    run_pipeline(AdjustmentPipeline(0), image, list(ADJUSTMENTS))
+    np.testing.assert_array_equal(image, original)
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.pipeline import AdjustmentPipeline
+from gui.components.image_screen import render_array, render_strips
+from utils.enums import FilterType
+
+logger.remove()
+
+FILTERS = [None] + [filter_type for filter_type in FilterType if filter_type is not FilterType.ORIGINAL]
+# Adjustments reading neighbouring pixels or depending on their position, around point adjustments
+ADJUSTMENTS = [("brightness", 1.1), ("sharpness", 1.8), ("vignette", 0.5), ("blur", 1.5), ("noise", 8)]
+
+
+def sample(channels: int) -> np.ndarray:
+    """A noisy gradient of odd size, so strips and blocks do not divide it evenly."""
+    rng = np.random.default_rng(0)
+    gradient = np.add.outer(np.linspace(0, 160, 181), np.linspace(0, 80, 243))[:, :, np.newaxis]
+    noisy = gradient + rng.normal(0, 30, (181, 243, channels))
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("adjustments", [[], ADJUSTMENTS], ids=["filter", "filter+adjustments"])
+@pytest.mark.parametrize("filter_type", FILTERS, ids=lambda filter_type: getattr(filter_type, "name", "none"))
+def test_strips_match_whole_image(filter_type, adjustments):
+    if filter_type is None and not adjustments:
+        pytest.skip("Nothing to render")
+    array = sample(3)
+    pipeline = AdjustmentPipeline(0)
+    whole = render_array(array, filter_type, adjustments, pipeline)
+    strips = render_strips(array, filter_type, adjustments, pipeline, strip_rows=32)
+    np.testing.assert_array_equal(strips, whole)
+
+
+@pytest.mark.parametrize("filter_type", [None, FilterType.SHARPEN, FilterType.PIXELATE, FilterType.INVERT])
+def test_rgba_strips_match_whole_image(filter_type):
+    array = sample(4)
+    pipeline = AdjustmentPipeline(0)
+    whole = render_array(array, filter_type, ADJUSTMENTS, pipeline)
+    strips = render_strips(array, filter_type, ADJUSTMENTS, pipeline, strip_rows=32)
+    np.testing.assert_array_equal(strips, whole)
@@ -1,10 +1,16 @@
 from enum import Enum
 from typing import Callable, Any, Optional, Union
 
+import numpy as np
 from PIL import Image
-from PIL import ImageQt
 from PySide6.QtGui import QImage
 
+from core import kernels
+from core.bilateral import FAST_FACTOR
+from core.blur import gaussian_halo
+from core.convert import convert_pil_to_qimage, convert_qimage_to_pil
+from core.filters import CARTOON_HALO, SHARPEN_RADIUS
+
 from core.filters import (
     filter_blur, filter_contour, filter_detail, filter_edge_enhance,
     filter_edge_enhance_more, filter_emboss, filter_find_edges, filter_sharpen,
@@ -12,6 +18,32 @@ from core.filters import (
     filter_invert, filter_cartoon, filter_sepia, filter_grayscale
 )
 
+# Filters whose parameter is measured in pixels and must follow the image scale.
+_SPATIAL_FILTERS = frozenset({"BLUR", "PIXELATE"})
+# Filters with a fixed radius in full resolution pixels besides their parameter. They accept
+# it as ``radius``, scaled to the image.
+_FILTER_RADII = {"SHARPEN": SHARPEN_RADIUS}
+# Filters accepting ``fast=True`` for an approximate, quicker result.
+_FAST_FILTERS = frozenset({"CARTOON"})
+# Pixels a filter reads around each output pixel, from its scaled parameter, or its scaled
+# radius for the filters of ``_FILTER_RADII``. Others read none.
+_FILTER_HALOS = {
+    "BLUR": gaussian_halo,
+    "CONTOUR": lambda _: kernels.CONTOUR.radius,
+    "DETAIL": lambda _: kernels.DETAIL.radius,
+    "EDGE_ENHANCE": lambda _: kernels.EDGE_ENHANCE.radius,
+    "EDGE_ENHANCE_MORE": lambda _: kernels.EDGE_ENHANCE_MORE.radius,
+    "EMBOSS": lambda _: kernels.EMBOSS.radius,
+    "FIND_EDGES": lambda _: kernels.FIND_EDGES.radius,
+    "SHARPEN": gaussian_halo,
+    "SMOOTH": lambda _: kernels.SMOOTH.radius,
+    "SMOOTH_MORE": lambda _: kernels.SMOOTH_MORE.radius,
+    "CARTOON": lambda _: CARTOON_HALO,
+}
+# Filters that wrap pixels around whole rows, so parts of an image must span its full width.
+_ROW_FILTERS = frozenset({"GLITCH"})
+
+
 class FilterType(Enum):
     ORIGINAL = ("Original", None, None)
     BLUR = ("Blur", filter_blur, 5)
@@ -36,24 +68,74 @@ class FilterType(Enum):
         self.func = func
         self.parameter = parameter
 
-    def apply(self, img: Union[QImage, Image.Image]):
+    def apply(self, img: Union[QImage, Image.Image, np.ndarray], scale: float = 1.0, fast: bool = False):
+        """
+        Apply the filter to an image.
+
+        Args:
+            img: The image to filter. QImages and NumPy arrays are converted to a PIL Image.
+            scale: Size of the image relative to the full resolution source, used to
+                scale pixel based parameters when filtering a reduced preview.
+            fast: Trade accuracy for speed where the filter supports it (see ``has_fast_mode``).
+                Meant for previews and thumbnails, exports should leave it off.
+        """
         if self.func:
             if isinstance(img, QImage):
                 img = self.qimage_to_pil(img)
+            elif isinstance(img, np.ndarray):
+                img = Image.fromarray(img)
+            kwargs = {"fast": True} if fast and self.has_fast_mode else {}
+            if self.name in _FILTER_RADII:
+                kwargs["radius"] = self.scaled_radius(scale)
             if self.parameter is not None:
-                return self.func(img, self.parameter)
-            return self.func(img)
+                return self.func(img, self.scaled_parameter(scale), **kwargs)
+            return self.func(img, **kwargs)
         return img  # No processing for "Original"
 
+    @property
+    def has_fast_mode(self) -> bool:
+        """Whether ``apply(..., fast=True)`` gives a different, approximate result."""
+        return self.name in _FAST_FILTERS
+
+    def halo(self, scale: float = 1.0) -> int:
+        """Pixels of context the filter needs around a part of the image to filter it like the whole."""
+        halo = _FILTER_HALOS.get(self.name)
+        if halo is None:
+            return 0
+        return halo(self.scaled_radius(scale) if self.name in _FILTER_RADII else self.scaled_parameter(scale))
+
+    def alignment(self, scale: float = 1.0) -> int:
+        """Parts of the image must start on multiples of this, for filters working on fixed blocks."""
+        if self.name == "PIXELATE":
+            return self.scaled_parameter(scale)
+        return FAST_FACTOR if self.name in _FAST_FILTERS else 1
+
+    @property
+    def needs_full_rows(self) -> bool:
+        """Whether the filter can only run on parts spanning the whole image width."""
+        return self.name in _ROW_FILTERS
+
+    def scaled_parameter(self, scale: float = 1.0) -> Optional[Any]:
+        """Return the filter parameter adjusted for an image ``scale`` times the source size."""
+        if scale == 1.0 or self.name not in _SPATIAL_FILTERS:
+            return self.parameter
+        scaled = self.parameter * scale
+        return max(1, round(scaled)) if self.name == "PIXELATE" else scaled
+
+    def scaled_radius(self, scale: float = 1.0) -> Optional[float]:
+        """Return the fixed radius of the filter for an image ``scale`` times the source size, if it has one."""
+        radius = _FILTER_RADII.get(self.name)
+        return radius * scale if radius is not None else None
+
     @staticmethod
     def qimage_to_pil(qimage: QImage) -> Image.Image:
         """Convert QImage to PIL Image."""
-        return ImageQt.fromqimage(qimage)
+        return convert_qimage_to_pil(qimage)
 
     @staticmethod
     def pil_to_qimage(pil_image: Image.Image) -> QImage:
         """Convert PIL Image to QImage."""
-        return ImageQt.toqimage(pil_image)
+        return convert_pil_to_qimage(pil_image)
 
 if __name__ == "__main__":
     image = Image.open("D:/Downloads/Images/nature-images.jpg")
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def _nbytes(value: Any) -> int:
+    return getattr(value, "nbytes", 0)
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache bounded by the total size of its values."""
+
+    def __init__(self, max_bytes: int, size_of: Callable[[Any], int] = _nbytes):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes (int): Maximum total size of the cached values. 0 disables caching.
+            size_of: Returns the size of a value in bytes, ``nbytes`` by default.
+        """
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes = {}
+        self._max_bytes = max(0, max_bytes)
+        self._size_of = size_of
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a value and mark it as most recently used.
+
+        Returns:
+            The cached value, or None if the key is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries to stay under the limit.
+        Values larger than the whole limit are not stored.
+        """
+        size = self._size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Remove every entry whose key matches the predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Change the size limit, evicting entries if the cache is now over it."""
+        with self._lock:
+            self._max_bytes = max(0, max_bytes)
+            while self._entries and self._total > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        del self._entries[key]
+        self._total -= self._sizes.pop(key)
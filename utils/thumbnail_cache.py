@@ -0,0 +1,164 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from PIL import Image
+from PySide6.QtCore import QStandardPaths
+from loguru import logger
+
+# Default size cap of the on-disk cache.
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Part of every file name. Bump it whenever the filters render thumbnails differently,
+# so the thumbnails cached before are no longer served; they are evicted over time.
+CACHE_VERSION = 3
+
+
+def default_cache_dir() -> Path:
+    """Return the thumbnail directory inside the user cache dir."""
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)
+    base = Path(base) if base else Path.home() / ".cache"
+    return base / "Imagify" / "thumbnails"
+
+
+class ThumbnailCache:
+    """
+    A persistent on-disk cache of filter thumbnails with LRU eviction.
+
+    Entries are keyed by a content hash of the downsampled source, the filter
+    name, its parameter, whether the fast path rendered it and ``CACHE_VERSION``,
+    and stored as PNG files. The size and use order of the files are tracked in
+    memory; a file's modification time records when it was last used, so the
+    eviction order survives restarts. Safe to use from several worker threads.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Initialize the cache, creating the directory if needed.
+
+        Args:
+            directory: Where to store the thumbnails, ``default_cache_dir()`` if None.
+            max_bytes: Size cap of the cache directory.
+        """
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # File sizes by name, least recently used first
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for entry in self.directory.glob("*.png"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+            for _, name, size in sorted(entries):
+                self._sizes[name] = size
+                self._total += size
+        except OSError as e:
+            logger.warning(f"Thumbnail cache unavailable at {self.directory}: {e}")
+            self.directory = None
+
+    @staticmethod
+    def content_hash(image: Image.Image) -> str:
+        """
+        Hash the pixels of a (downsampled) image.
+
+        Args:
+            image: The image to hash, ideally already at thumbnail size.
+
+        Returns:
+            A hex digest that changes whenever the pixels, size or mode change.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, source_hash: str, filter_name: str, parameter: Any = None,
+            fast: bool = False) -> Optional[Image.Image]:
+        """
+        Load a cached thumbnail and mark it as recently used.
+
+        Args:
+            source_hash: ``content_hash`` of the source thumbnail.
+            filter_name: Name of the filter.
+            parameter: Parameter of the filter.
+            fast: Whether the thumbnail was rendered with the fast path of the filter.
+
+        Returns:
+            The thumbnail, or None if it is not cached.
+        """
+        if self.directory is None:
+            return None
+        name = self._file_name(source_hash, filter_name, parameter, fast)
+        path = self.directory / name
+        with self._lock:
+            if name not in self._sizes:
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                self._forget(name)
+                return None
+            self._sizes.move_to_end(name)
+        try:
+            image = Image.open(path)
+            image.load()  # Reads the pixels and closes the file
+            return image
+        except OSError as e:
+            logger.warning(f"Dropping unreadable thumbnail {path}: {e}")
+            with self._lock:
+                self._forget(name)
+            return None
+
+    def put(self, source_hash: str, filter_name: str, image: Image.Image, parameter: Any = None,
+            fast: bool = False) -> None:
+        """Store a thumbnail, evicting the least recently used ones to stay under the cap. See ``get``."""
+        if self.directory is None:
+            return
+        name = self._file_name(source_hash, filter_name, parameter, fast)
+        path = self.directory / name
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            image.save(temp_path, format="PNG")
+            os.replace(temp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Failed to cache thumbnail {path}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._forget(name)
+            self._sizes[name] = size
+            self._total += size
+            self._evict()
+
+    def clear(self) -> None:
+        """Delete every cached thumbnail."""
+        with self._lock:
+            for name in list(self._sizes):
+                (self.directory / name).unlink(missing_ok=True)
+                self._forget(name)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    @staticmethod
+    def _file_name(source_hash: str, filter_name: str, parameter: Any, fast: bool) -> str:
+        parameter = re.sub(r"[^0-9A-Za-z.-]", "_", str(parameter))
+        mode = "fast" if fast else "full"
+        return f"v{CACHE_VERSION}_{source_hash}_{filter_name}_{parameter}_{mode}.png"
+
+    def _forget(self, name: str) -> None:
+        self._total -= self._sizes.pop(name, 0)
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._sizes:
+            name = next(iter(self._sizes))
+            (self.directory / name).unlink(missing_ok=True)
+            self._forget(name)
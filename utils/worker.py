@@ -0,0 +1,323 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple, Type, Union
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from loguru import logger
+
+from core.document import ImageDocument
+from core.export import ExportCancelled
+from core.loader import LoadCancelled, decode_preview
+
+
+class TaskSignals(QObject):
+    """Signals emitted by a Task, delivered on the thread that owns this object."""
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+
+class Task(QRunnable):
+    """
+    A QRunnable that calls a function on a pool thread and reports the result by signal.
+    """
+    signals_type = TaskSignals
+    # Exceptions meaning the task was cancelled, which report nothing.
+    cancelled_errors: Tuple[type, ...] = ()
+
+    def __init__(self, task_id: int, function: Callable[..., Any], *args, **kwargs):
+        """
+        Initialize the task.
+
+        Args:
+            task_id: Identifier passed back with the result.
+            function: The function to run on the pool thread.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+        """
+        super().__init__()
+        self.task_id = task_id
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = self.signals_type()
+
+    def run(self) -> None:
+        try:
+            result = self.execute()
+        except self.cancelled_errors:
+            logger.info(f"Task {self.task_id} cancelled")
+        except Exception as e:
+            logger.exception(f"Task {self.task_id} failed: {e}")
+            self.signals.failed.emit(self.task_id, str(e))
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+    def execute(self) -> Any:
+        """Runs the function, on the pool thread."""
+        return self.function(*self.args, **self.kwargs)
+
+
+class RenderWorker(QObject):
+    """
+    Runs renders off the GUI thread, keeping only the latest request.
+
+    At most one render runs at a time and at most one more waits behind it.
+    Submitting while a render is queued replaces the queued one, so a burst of
+    requests costs one in-flight render plus one queued render. Results older
+    than the last delivered one, or submitted before ``cancel``, are dropped.
+    """
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._generation = 0
+        self._delivered = 0
+        self._running: Optional[Task] = None
+        self._pending: Optional[Task] = None
+
+    def submit(self, function: Callable[..., Any], *args, **kwargs) -> int:
+        """
+        Request a render. The function must only use the arguments it is given.
+
+        Args:
+            function: The render function, called on the worker thread.
+            *args: Snapshot of everything the render needs.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The generation number of the request.
+        """
+        self._generation += 1
+        task = Task(self._generation, function, *args, **kwargs)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        if self._running is None:
+            self._start(task)
+        else:
+            self._pending = task  # Replaces, and so drops, any older queued render
+        return self._generation
+
+    def cancel(self) -> None:
+        """Drop the queued render and ignore the result of the running one."""
+        self._pending = None
+        self._delivered = self._generation
+
+    def is_busy(self) -> bool:
+        return self._running is not None or self._pending is not None
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until the pool is idle. Queued results are still delivered by signal."""
+        return self._pool.waitForDone(msecs)
+
+    def _start(self, task: Task) -> None:
+        self._running = task
+        self._pool.start(task)
+
+    def _on_finished(self, generation: int, result: Any) -> None:
+        self._advance()
+        if generation > self._delivered:
+            self._delivered = generation
+            self.finished.emit(result)
+
+    def _on_failed(self, generation: int, message: str) -> None:
+        self._advance()
+        if generation > self._delivered:
+            self._delivered = generation
+            self.failed.emit(message)
+
+    def _advance(self) -> None:
+        self._running = None
+        if self._pending is not None:
+            task, self._pending = self._pending, None
+            self._start(task)
+
+
+class CancellableSignals(TaskSignals):
+    """Signals emitted by a CancellableTask, delivered on the thread that owns this object."""
+    progress = Signal(int, int)
+
+
+class CancellableTask(Task):
+    """
+    A Task whose function reports its progress and can be cancelled.
+
+    The function is called with ``progress`` and ``cancelled`` keyword arguments
+    besides the ones given, and stops by raising ``LoadCancelled`` or
+    ``ExportCancelled`` once ``cancel_event`` is set.
+    """
+    signals_type = CancellableSignals
+    cancelled_errors = (LoadCancelled, ExportCancelled)
+
+    def __init__(self, task_id: int, function: Callable[..., Any], *args, **kwargs):
+        super().__init__(task_id, function, *args, **kwargs)
+        self.cancel_event = threading.Event()
+
+    def execute(self) -> Any:
+        return self.function(*self.args, progress=self._progress, cancelled=self.cancel_event.is_set, **self.kwargs)
+
+    def _progress(self, percent: int) -> None:
+        self.signals.progress.emit(self.task_id, percent)
+
+
+class LatestTaskRunner(QObject):
+    """
+    Runs cancellable tasks off the GUI thread, keeping only the latest request.
+
+    Starting a task cancels the running one, which stops at its next check;
+    signals of cancelled tasks are dropped.
+    """
+    progress = Signal(int)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        # A cancelled task may still be finishing its current step while the next one starts
+        self._pool.setMaxThreadCount(2)
+        self._request = 0
+        self._running: Optional[CancellableTask] = None
+
+    def _start(self, task_type: Type[CancellableTask], *args, **kwargs) -> int:
+        """Cancel the running task and start a new one. Returns its request number."""
+        self.cancel()
+        self._request += 1
+        task = task_type(self._request, *args, **kwargs)
+        task.setAutoDelete(False)
+        self._connect(task)
+        self._running = task
+        self._pool.start(task)
+        return self._request
+
+    def _connect(self, task: CancellableTask) -> None:
+        task.signals.progress.connect(self._on_progress)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+
+    def cancel(self) -> None:
+        """Stop the running task and drop anything it still delivers."""
+        if self._running is not None:
+            self._running.cancel_event.set()
+            self._running = None
+
+    def is_busy(self) -> bool:
+        return self._running is not None
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until the pool is idle. Queued results are still delivered by signal."""
+        return self._pool.waitForDone(msecs)
+
+    def _is_current(self, request: int) -> bool:
+        return self._running is not None and request == self._running.task_id
+
+    def _on_progress(self, request: int, percent: int) -> None:
+        if self._is_current(request):
+            self.progress.emit(percent)
+
+    def _on_finished(self, request: int, result: Any) -> None:
+        if self._is_current(request):
+            self._running = None
+            self.finished.emit(result)
+
+    def _on_failed(self, request: int, message: str) -> None:
+        if self._is_current(request):
+            self._running = None
+            self.failed.emit(message)
+
+
+class LoadSignals(CancellableSignals):
+    """Signals emitted by a LoadTask, delivered on the thread that owns this object."""
+    preview = Signal(int, object)
+
+
+class LoadTask(CancellableTask):
+    """
+    A CancellableTask that decodes an image file into a document, a reduced preview first.
+    """
+    signals_type = LoadSignals
+
+    def __init__(self, task_id: int, path: Path, preview_size: Tuple[int, int]):
+        """
+        Initialize the task.
+
+        Args:
+            task_id: Identifier passed back with every signal.
+            path: The image file.
+            preview_size: (width, height) the preview decode should cover.
+        """
+        super().__init__(task_id, ImageDocument.open, path)
+        self.path = path
+        self.preview_size = preview_size
+
+    def execute(self) -> ImageDocument:
+        try:
+            preview = decode_preview(self.path, *self.preview_size)
+        except Exception as e:
+            # The full decode reports anything that is really wrong with the file
+            logger.warning(f"Preview decode of {self.path} failed: {e}")
+            preview = None
+        if preview is not None and not self.cancel_event.is_set():
+            self.signals.preview.emit(self.task_id, preview)
+        return super().execute()
+
+
+class ImageLoader(LatestTaskRunner):
+    """
+    Loads image files off the GUI thread.
+
+    JPEG files are first decoded at a reduced size covering the viewport, which
+    takes a fraction of the full decode, and delivered by ``preview``. The full
+    resolution document follows through ``finished``. Starting a new load cancels
+    the previous one, which stops at its next decode chunk.
+    """
+    preview = Signal(object, tuple)
+
+    def load(self, path: Union[str, Path], preview_size: Tuple[int, int]) -> int:
+        """
+        Start loading a file, cancelling any load in progress.
+
+        Args:
+            path: The image file.
+            preview_size: (width, height) in device pixels the preview should cover, usually the viewport.
+
+        Returns:
+            The request number of the load.
+        """
+        return self._start(LoadTask, Path(path), preview_size)
+
+    def _connect(self, task: LoadTask) -> None:
+        super()._connect(task)
+        task.signals.preview.connect(self._on_preview)
+
+    def _on_preview(self, request: int, preview: tuple) -> None:
+        if self._is_current(request):
+            array, full_size = preview
+            self.preview.emit(array, full_size)
+
+
+class ImageExporter(LatestTaskRunner):
+    """
+    Runs exports off the GUI thread, one at a time.
+
+    Starting an export cancels the running one, which stops at its next strip
+    without touching the destination file. The result is delivered by ``finished``.
+    """
+
+    def export(self, function: Callable[..., Any], *args, **kwargs) -> int:
+        """
+        Start an export, cancelling any export in progress.
+
+        Args:
+            function: The export, e.g. ``core.export.export_image``. It must only use the
+                arguments it is given, and accept ``progress`` and ``cancelled`` callbacks.
+            *args: Snapshot of everything the export needs.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The request number of the export.
+        """
+        return self._start(CancellableTask, function, *args, **kwargs)